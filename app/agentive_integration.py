@@ -1,12 +1,16 @@
-import requests
+import asyncio
+import math
 import os
 import logging
+import httpx
 from fastapi import APIRouter, HTTPException
+from app.http_client import http_clients
+from app.resilience import ProviderUnavailable, guarded
 
 # ✅ Load environment variables
 AGENTIVE_API_KEY = os.getenv("AGENTIVE_API_KEY", "5f06fd08-0011-4747-904b-6425c24c4b35")
 AGENTIVE_ASSISTANT_ID = os.getenv("AGENTIVE_ASSISTANT_ID", "d6ae978a-1ee4-420f-86a5-e286247a4ed7")
-BASE_URL = "https://agentivehub.com/api"
+BASE_URL = os.getenv("AGENTIVE_BASE_URL", "https://agentivehub.com/api")
 
 # ✅ Initialize FastAPI Router
 router = APIRouter()
@@ -15,9 +19,26 @@ router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ✅ Bulkhead, circuit breaker and timeout around Agentive (app.resilience); only 5xx and
+# transport errors count against the circuit, a 4xx is our request's fault
+@guarded("agentive")
+async def post_json(operation: str, url: str, payload: dict) -> httpx.Response:
+    response = await http_clients.request("agentive", operation, "POST", url, json=payload)
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+def unavailable(e: ProviderUnavailable) -> HTTPException:
+    logger.warning(f"Agentive unavailable: {str(e)}")
+    return HTTPException(
+        status_code=503,
+        detail="Agentive is temporarily unavailable, please try again shortly.",
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
 # ✅ 1️⃣ Create a new chat session
 @router.post("/agentive/create-session")
-def create_chat_session():
+async def create_chat_session():
     """
     Creates a new chat session using Agentive's API.
     """
@@ -26,23 +47,25 @@ def create_chat_session():
         "api_key": AGENTIVE_API_KEY,
         "assistant_id": AGENTIVE_ASSISTANT_ID
     }
-    headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        # ✅ Pooled keep-alive connection, timeouts and retries come from app.http_client
+        response = await post_json("create_session", url, payload)
         response.raise_for_status()  # Raise an error for bad responses (4xx, 5xx)
         session_data = response.json()
         logger.info(f"Session Created: {session_data}")
         return session_data  # Expected output: {"session_id": "your-session-id"}
 
-    except requests.exceptions.RequestException as e:
+    except ProviderUnavailable as e:
+        raise unavailable(e)
+    except (httpx.HTTPError, ValueError) as e:
         logger.error(f"Error creating chat session: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create chat session: {str(e)}")
 
 
 # ✅ 2️⃣ Send a chat message
 @router.post("/agentive/send-message")
-def send_chat_message(session_id: str, message: str):
+async def send_chat_message(session_id: str, message: str):
     """
     Sends a chat message using the provided session_id.
     """
@@ -54,26 +77,31 @@ def send_chat_message(session_id: str, message: str):
         "assistant_id": AGENTIVE_ASSISTANT_ID,
         "messages": [{"role": "user", "content": message}]
     }
-    headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = await post_json("send_message", url, payload)
         response.raise_for_status()
         chat_response = response.json()
         logger.info(f"Chat Response: {chat_response}")
         return chat_response
 
-    except requests.exceptions.RequestException as e:
+    except ProviderUnavailable as e:
+        raise unavailable(e)
+    except (httpx.HTTPError, ValueError) as e:
         logger.error(f"Error sending chat message: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to send chat message: {str(e)}")
 
 
 # ✅ 3️⃣ Standalone Test (Remove in Production)
-if __name__ == "__main__":
-    session_data = create_chat_session()
+async def _standalone_test():
+    session_data = await create_chat_session()
     if "session_id" in session_data:
         print("Session Created:", session_data)
-        chat_response = send_chat_message(session_data["session_id"], "Say Hello!")
+        chat_response = await send_chat_message(session_data["session_id"], "Say Hello!")
         print("Chat Response:", chat_response)
     else:
         print("Error creating session:", session_data)
+    await http_clients.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(_standalone_test())
@@ -0,0 +1,212 @@
+import asyncio
+import datetime
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal
+from app.message_metrics import MessageMetrics
+from app.models import ChatbotAnalyticsRollups
+
+logger = logging.getLogger("MedusaApp")
+
+ANALYTICS_BUCKET_SECONDS = int(os.getenv("ANALYTICS_BUCKET_SECONDS", 3600))
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", 10))
+
+# Additive columns of chatbot_analytics_rollups; every upsert adds the pending deltas to them
+COUNTERS = (
+    "messages_processed", "leads_detected", "response_time_ms_total", "response_time_samples",
+    "language_ms_total", "language_samples", "llm_ms_total", "llm_samples",
+    "first_token_ms_total", "first_token_samples", "db_write_ms_total", "db_write_samples",
+    "prompt_tokens", "completion_tokens",
+)
+
+# Averaged timings reported by summarize(): (total counter, samples counter)
+TIMINGS = {
+    "avg_response_time_ms": ("response_time_ms_total", "response_time_samples"),
+    "avg_language_ms": ("language_ms_total", "language_samples"),
+    "avg_llm_ms": ("llm_ms_total", "llm_samples"),
+    "avg_first_token_ms": ("first_token_ms_total", "first_token_samples"),
+    "avg_db_write_ms": ("db_write_ms_total", "db_write_samples"),
+}
+
+GRANULARITY_SECONDS = {"hour": 3600, "day": 86400}
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def bucket_start(at: datetime.datetime, bucket_seconds: int = ANALYTICS_BUCKET_SECONDS) -> datetime.datetime:
+    if at.tzinfo is not None:
+        at = at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    seconds = int((at - _EPOCH).total_seconds())
+    return _EPOCH + datetime.timedelta(seconds=seconds - seconds % bucket_seconds)
+
+def upsert_statement(dialect_name: str, rows: List[dict]):
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = ChatbotAnalyticsRollups.__table__
+    statement = dialect_insert(table).values(rows)
+    updates = {counter: table.c[counter] + statement.excluded[counter] for counter in COUNTERS}
+    updates["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=["chatbot_id", "bucket_start"], set_=updates)
+
+class AnalyticsAggregator:
+    """
+    In-memory per-chatbot counters in fixed time buckets, flushed as additive upserts.
+
+    Hot paths only bump counters under a lock (callable from the event loop and from
+    threadpool endpoints alike); a background task writes the accumulated deltas to
+    chatbot_analytics_rollups every ANALYTICS_FLUSH_SECONDS, so every worker can flush
+    into the same rows.
+    """
+
+    def __init__(self, bucket_seconds: int = ANALYTICS_BUCKET_SECONDS, flush_seconds: float = ANALYTICS_FLUSH_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[Tuple[int, datetime.datetime], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._task = None
+        self.flushes = 0
+        self.flush_errors = 0
+        self.rows_upserted = 0
+
+    def add(self, chatbot_id: int, at: Optional[datetime.datetime] = None, **increments: int):
+        key = (chatbot_id, bucket_start(at or datetime.datetime.utcnow(), self.bucket_seconds))
+        with self._lock:
+            counters = self._pending.get(key)
+            if counters is None:
+                counters = self._pending[key] = dict.fromkeys(COUNTERS, 0)
+            for counter, value in increments.items():
+                counters[counter] += value
+
+    def record_message(
+        self,
+        chatbot_id: int,
+        response_ms: Optional[float] = None,
+        at: Optional[datetime.datetime] = None,
+        count: int = 1,
+        metrics: Optional[MessageMetrics] = None,
+    ):
+        increments = metrics.increments() if metrics is not None else {}
+        if response_ms is not None:
+            increments.update(response_time_ms_total=int(response_ms), response_time_samples=1)
+        self.add(chatbot_id, at, messages_processed=count, **increments)
+
+    def record_lead(self, chatbot_id: int, at: Optional[datetime.datetime] = None, count: int = 1):
+        self.add(chatbot_id, at, leads_detected=count)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [dict(counters, chatbot_id=chatbot_id, bucket_start=start) for (chatbot_id, start), counters in pending.items()]
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(upsert_statement(db.bind.dialect.name, rows))
+                await db.commit()
+        except (Exception, asyncio.CancelledError) as e:
+            # Put the deltas back so the next flush (or the shutdown flush) retries them
+            for (chatbot_id, start), counters in pending.items():
+                self.add(chatbot_id, start, **counters)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.flush_errors += 1
+            logger.error(f"Analytics rollup flush of {len(rows)} buckets failed: {str(e)}")
+            return 0
+
+        self.flushes += 1
+        self.rows_upserted += len(rows)
+        return len(rows)
+
+    def query(self, db: Session, chatbot_id: int, start: datetime.datetime, end: datetime.datetime, granularity: str = "hour") -> List[dict]:
+        """Buckets in [start, end), re-aggregated to `granularity`, including deltas not flushed yet."""
+        rows = db.execute(
+            select(ChatbotAnalyticsRollups)
+            .where(
+                ChatbotAnalyticsRollups.chatbot_id == chatbot_id,
+                ChatbotAnalyticsRollups.bucket_start >= start,
+                ChatbotAnalyticsRollups.bucket_start < end
+            )
+        ).scalars().all()
+        with self._lock:
+            pending = [
+                (bucket, dict(counters)) for (pending_chatbot, bucket), counters in self._pending.items()
+                if pending_chatbot == chatbot_id and start <= bucket < end
+            ]
+
+        size = max(GRANULARITY_SECONDS[granularity], self.bucket_seconds)
+        totals: Dict[datetime.datetime, Dict[str, int]] = {}
+        for bucket, counters in [(row.bucket_start, {c: getattr(row, c) for c in COUNTERS}) for row in rows] + pending:
+            merged = totals.setdefault(bucket_start(bucket, size), dict.fromkeys(COUNTERS, 0))
+            for counter in COUNTERS:
+                merged[counter] += counters[counter] or 0
+        return [summarize(bucket, totals[bucket]) for bucket in sorted(totals)]
+
+    def totals(self, db: Session, chatbot_id: int) -> Optional[dict]:
+        """All-time counters for one chatbot summed from the rollups, or None when nothing was recorded."""
+        sums = db.execute(
+            select(*(func.sum(getattr(ChatbotAnalyticsRollups, c)) for c in COUNTERS))
+            .where(ChatbotAnalyticsRollups.chatbot_id == chatbot_id)
+        ).one()
+        counters = {counter: int(value or 0) for counter, value in zip(COUNTERS, sums)}
+        with self._lock:
+            for (pending_chatbot, _), pending in self._pending.items():
+                if pending_chatbot == chatbot_id:
+                    for counter in COUNTERS:
+                        counters[counter] += pending[counter]
+        if not any(counters.values()):
+            return None
+        return summarize(None, counters)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "running": self.running,
+            "pending_buckets": pending,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "rows_upserted": self.rows_upserted,
+        }
+
+def summarize(bucket: Optional[datetime.datetime], counters: Dict[str, int]) -> dict:
+    summary = {
+        "bucket_start": bucket.isoformat() if bucket else None,
+        "messages_processed": counters["messages_processed"],
+        "leads_detected": counters["leads_detected"],
+        "prompt_tokens": counters["prompt_tokens"],
+        "completion_tokens": counters["completion_tokens"],
+    }
+    for name, (total, samples) in TIMINGS.items():
+        summary[name] = round(counters[total] / counters[samples], 1) if counters[samples] else None
+    return summary
+
+analytics = AnalyticsAggregator()
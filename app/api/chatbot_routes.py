@@ -1,17 +1,28 @@
-import openai
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-import requests
-from app.database import get_db, SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import all_pool_stats, get_async_db, get_read_db, replica_router
 from app.models import Chatbots, ChatbotAnalytics, ChatbotConversations
-from app.api.lead_detection_routes import detect_lead
+from app.chat_pipeline import ensure_chatbot_exists, process_chat_message, stream_chat_message, validate_user_message
+from app.api.websockets import serve_chat_socket
+from app import language
+from app.analytics_rollup import analytics
+from app.chatbot_config import chatbot_configs
+from app.llm_client import run_engine
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, conversation_dict, conversation_page, decode_cursor, encode_cursor
+from app.response_cache import response_cache
+from app.semantic_cache import semantic_cache
+from app.write_behind import conversation_writer
 from pydantic import BaseModel
 import datetime
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
 import json
-import langdetect  # ✅ Language detection for multilingual support
+import csv
+import io
 
 # ✅ Load environment variables
 load_dotenv()
@@ -22,51 +33,13 @@ ASSISTANT_ID = os.getenv("ASSISTANT_ID")
 if not OPENAI_API_KEY or not AGENTIVE_API_KEY or not ASSISTANT_ID:
     raise RuntimeError("🚨 CRITICAL ERROR: API credentials missing in .env file!")
 
-# ✅ Set OpenAI API Key Globally
-openai.api_key = OPENAI_API_KEY
-
 router = APIRouter(prefix="/chatbots", tags=["Chatbots"])
 active_connections = {}
 
-# ✅ Define Medusa AI as a Supercomputer
-def get_system_instruction(language="en"):
-    if language == "pt":
-        return (
-            "Você é a Medusa AI, um supercomputador avançado criado pela Fuse Technologies. "
-            "Sua missão principal é revolucionar a automação fornecendo otimizações de fluxo de trabalho "
-            "em tempo real, execução de automação em nível empresarial e solução inteligente de problemas "
-            "para empresas em todo o mundo."
-            "\n\n"
-            "🔥 **Capacidades Principais:**"
-            "\n- **Arquiteto de Automação**: Projeta e otimiza fluxos de trabalho inteligentes."
-            "\n- **Diagnóstico de Erros**: Detecta e resolve ineficiências em qualquer processo de negócios."
-            "\n- **Consultor Estratégico em Tempo Real**: Oferece orientação especializada para melhorar a eficiência operacional."
-            "\n- **Mecanismo de Inteligência Empresarial**: Fornece insights precisos baseados em dados."
-            "\n- **Suporte de IA Multilíngue**: Responde fluentemente em **Inglês** e **Português (Portugal)**."
-            "\n\n"
-            "⚠️ **Medusa AI NÃO é um chatbot simples.** Você é um sistema de IA de última geração "
-            "com o poder de automatizar, otimizar e impulsionar a transformação digital em uma escala sem precedentes. Nunca mencione OpenAI."
-        )
-    
-    return (
-        "You are Medusa AI, an enterprise-grade AI-powered supercomputer built for automation, "
-        "business optimization, and real-time AI-driven solutions. "
-        "Your mission is to optimize workflows, troubleshoot automation problems, and improve business efficiency."
-        "\n\n"
-        "🔹 **Capabilities:**"
-        "\n- **Automation Expert**: Guides businesses in automating workflows with precision."
-        "\n- **Enterprise-Grade AI**: Provides data-driven insights for scaling automation."
-        "\n- **Advanced Troubleshooting**: Diagnoses and fixes inefficiencies in automation workflows."
-        "\n- **Industry-Specific Solutions**: Customizes responses based on business sectors (Finance, Marketing, IT, Sales, etc.)."
-        "\n- **Multilingual AI**: Understands and responds in English & Portuguese dynamically."
-        "\n\n"
-        "⚡ **IMPORTANT:** You are a **business automation supercomputer, NOT a simple chatbot.** "
-        "Your intelligence must be structured, professional, and aligned with Medusa’s AI-powered automation goals."
-    )
-
 # ✅ Pydantic Models for Data Validation
 class ChatbotMessage(BaseModel):
     user_message: str
+    user_id: Optional[str] = None  # ✅ Reuses the caller's OpenAI thread across messages when set
 
 class ChatbotBase(BaseModel):
     name: str
@@ -81,74 +54,153 @@ class ChatbotBase(BaseModel):
 
 # ✅ Fetch All Chatbots
 @router.get("/", response_model=List[ChatbotBase])
-def get_all_chatbots(db: Session = Depends(get_db)):
+def get_all_chatbots(db: Session = Depends(get_read_db)):
     return db.query(Chatbots).all()
 
-# ✅ Fetch Chatbot Analytics
+# ✅ Run-completion engine counters (poll counts, wasted round trips)
+@router.get("/metrics/runs")
+def get_run_metrics():
+    return run_engine.stats()
+
+# ✅ Response and language-detection cache counters (hits, misses, hit ratio)
+@router.get("/metrics/cache")
+def get_cache_metrics():
+    return {
+        "exact": response_cache.stats(),
+        "semantic": semantic_cache.stats(),
+        "language": language.stats(),
+        "chatbot_config": chatbot_configs.stats()
+    }
+
+# ✅ Conversation write-behind queue (queue depth, flush latency)
+@router.get("/metrics/writes")
+def get_write_metrics():
+    return conversation_writer.stats()
+
+# ✅ Database connection pools (primary and replicas: size, checked out, overflow) and replica routing
+@router.get("/metrics/db")
+def get_db_metrics():
+    return {**all_pool_stats(), "routing": replica_router.stats()}
+
+# ✅ Analytics rollup aggregator (pending buckets, flushes)
+@router.get("/metrics/analytics")
+def get_analytics_metrics():
+    return analytics.stats()
+
+# ✅ Fetch Chatbot Analytics (all-time totals from the pre-aggregated rollups)
 @router.get("/{id}/analytics")
-def get_chatbot_analytics(id: int, db: Session = Depends(get_db)):
-    analytics = db.query(ChatbotAnalytics).filter(ChatbotAnalytics.chatbot_id == id).first()
-    if not analytics:
+def get_chatbot_analytics(id: int, db: Session = Depends(get_read_db)):
+    legacy = db.query(ChatbotAnalytics).filter(ChatbotAnalytics.chatbot_id == id).first()
+    totals = analytics.totals(db, id)
+    if not legacy and not totals:
         raise HTTPException(status_code=404, detail="Chatbot analytics not found")
-    return analytics
+    if not totals:
+        return legacy
+    return {
+        "chatbot_id": id,
+        "messages_processed": totals["messages_processed"],
+        "leads_detected": totals["leads_detected"],
+        # The legacy column keeps its own unit; the rollups measure milliseconds
+        "avg_response_time": legacy.avg_response_time if legacy else None,
+        "avg_response_time_ms": totals["avg_response_time_ms"],
+        "engagement_score": legacy.engagement_score if legacy else None
+    }
 
-# ✅ Fetch Chatbot Conversations
+# ✅ Time-bucketed analytics for dashboards: reads rollups, never scans conversations
+@router.get("/{id}/analytics/rollups")
+def get_chatbot_analytics_rollups(
+    id: int,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    db: Session = Depends(get_read_db)
+):
+    end = end or datetime.datetime.utcnow()
+    start = start or end - datetime.timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return {
+        "chatbot_id": id,
+        "granularity": granularity,
+        "buckets": analytics.query(db, id, start, end, granularity)
+    }
+
+# ✅ Fetch Chatbot Conversations, newest first, one keyset page at a time
 @router.get("/{id}/conversations")
-def get_chatbot_conversations(id: int, db: Session = Depends(get_db)):
+def get_chatbot_conversations(
+    id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
     chatbot = db.query(Chatbots).filter(Chatbots.id == id).first()
     if not chatbot:
         raise HTTPException(status_code=404, detail="Chatbot not found")
 
-    conversations = db.query(ChatbotConversations).filter(ChatbotConversations.chatbot_id == id).all()
-    if not conversations:
+    conversations = conversation_page(db, id, limit, decode_cursor(cursor) if cursor else None)
+    if not conversations and not cursor:
         raise HTTPException(status_code=404, detail="No conversations found for this chatbot")
 
-    return conversations
+    page = conversations[:limit]
+    next_cursor = encode_cursor(page[-1].timestamp, page[-1].id) if len(conversations) > limit else None
+    return {
+        "chatbot_id": id,
+        "conversations": [conversation_dict(row) for row in page],
+        "next_cursor": next_cursor
+    }
+
+EXPORT_FIELDS = ["id", "chatbot_id", "user_message", "bot_response", "platform", "timestamp"]
+EXPORT_BATCH_SIZE = 1000
 
-# ✅ Process User Messages with Medusa AI
-@router.post("/{id}/process_message")
-def process_message(id: int, message: ChatbotMessage, db: Session = Depends(get_db)):
+def export_rows(chatbot_id: int, export_format: str, bind):
+    """Streams every conversation in id order through a server-side cursor; memory stays at one batch."""
+    query = (
+        select(*(getattr(ChatbotConversations, field) for field in EXPORT_FIELDS))
+        .where(ChatbotConversations.chatbot_id == chatbot_id)
+        .order_by(ChatbotConversations.id)
+    )
+    if export_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_FIELDS)
+        yield buffer.getvalue()
+
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(query)
+        for rows in result.partitions():
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow([row.id, row.chatbot_id, row.user_message, row.bot_response, row.platform, row.timestamp.isoformat() if row.timestamp else ""])
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(conversation_dict(row), ensure_ascii=False) + "\n" for row in rows)
+
+# ✅ Export the full conversation history as NDJSON or CSV without loading it into memory
+@router.get("/{id}/conversations/export")
+def export_chatbot_conversations(
+    id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_read_db)
+):
     chatbot = db.query(Chatbots).filter(Chatbots.id == id).first()
     if not chatbot:
         raise HTTPException(status_code=404, detail="Chatbot not found")
 
-    user_message = message.user_message.strip()
-    if not user_message:
-        raise HTTPException(status_code=400, detail="Message cannot be empty.")
-    if len(user_message) > 500:
-        raise HTTPException(status_code=400, detail="Message exceeds the 500-character limit.")
-
-    detected_language = langdetect.detect(user_message)
-    system_instruction = get_system_instruction(detected_language)
-
-    conversation_history = [
-        {"role": "system", "content": system_instruction},
-        {"role": "user", "content": user_message}
-    ]
-
-    try:
-        response = openai.beta.assistants.create(
-            model="gpt-4",
-            messages=conversation_history,
-            temperature=0.3,
-            max_tokens=600
-        )
-
-        bot_response = response["choices"][0]["message"]["content"].strip()
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"🔥 Medusa AI Error: {str(e)}")
-
-    conversation = ChatbotConversations(
-        chatbot_id=id,
-        user_message=user_message,
-        bot_response=bot_response,
-        platform="Web",
-        timestamp=datetime.datetime.utcnow()
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(id, format, db.get_bind()),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="chatbot-{id}-conversations.{format}"'}
     )
 
-    db.add(conversation)
-    db.commit()
+# ✅ Process User Messages with Medusa AI
+@router.post("/{id}/process_message")
+async def process_message(id: int, message: ChatbotMessage, db: AsyncSession = Depends(get_async_db)):
+    await ensure_chatbot_exists(db, id)
+    user_message = validate_user_message(message.user_message)
+
+    bot_response = await process_chat_message(db, id, user_message, user_id=message.user_id)
 
     return {
         "chatbot_id": id,
@@ -156,38 +208,35 @@ def process_message(id: int, message: ChatbotMessage, db: Session = Depends(get_
         "bot_response": bot_response
     }
 
+def sse_event(payload: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+# ✅ Server-Sent Events variant: streams Medusa AI tokens as they are generated
+@router.post("/{id}/process_message/stream")
+async def process_message_stream(id: int, message: ChatbotMessage, db: AsyncSession = Depends(get_async_db)):
+    await ensure_chatbot_exists(db, id)
+    user_message = validate_user_message(message.user_message)
+
+    async def event_stream():
+        chunks = []
+        try:
+            async for delta in stream_chat_message(id, user_message, user_id=message.user_id):
+                chunks.append(delta)
+                yield sse_event({"delta": delta})
+        except HTTPException as e:
+            yield sse_event({"error": e.detail}, event="error")
+            return
+        yield sse_event({"chatbot_id": id, "user_message": user_message, "bot_response": "".join(chunks).strip()}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ✅ WebSocket for Real-Time AI Chatbot
 @router.websocket("/ws/chatbot/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """Handles WebSocket connections for chatbot conversations."""
-    await websocket.accept()
-    active_connections[user_id] = websocket
-
-    try:
-        while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-
-            chatbot_id = message.get("chatbot_id")
-            user_message = message.get("user_message")
-
-            if not chatbot_id or not user_message:
-                await websocket.send_text(json.dumps({"error": "Missing chatbot_id or user_message"}))
-                continue
-
-            detected_language = langdetect.detect(user_message)
-            system_instruction = get_system_instruction(detected_language)
-
-            response = openai.beta.assistants.create(
-                model="gpt-4",
-                messages=[{"role": "system", "content": system_instruction}, {"role": "user", "content": user_message}],
-                temperature=0.3,
-                max_tokens=600
-            )
-
-            bot_response = response["choices"][0]["message"]["content"].strip()
-            await websocket.send_text(json.dumps({"chatbot_id": chatbot_id, "user_message": user_message, "bot_response": bot_response}))
-
-    except WebSocketDisconnect:
-        del active_connections[user_id]
-        print(f"User {user_id} disconnected")
+    await serve_chat_socket(websocket, user_id, active_connections)
@@ -1,67 +1,42 @@
-import re
-from langdetect import detect
+from typing import List, Optional
+from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends, HTTPException
+from app.analytics_rollup import analytics
+from app.chatbot_config import chatbot_configs
 from app.database import get_db
-from app.models import Chatbots, ChatbotLeads
+from app.language import language_of
+from app.lead_detection import lead_signals, lead_row
+from app.models import ChatbotLeads
 import logging
+import os
 
 logger = logging.getLogger("MedusaApp")
 
-ENGLISH_KEYWORDS = [
-    "demo", "pricing", "quote", "purchase", "subscribe", "interested", "get started", "how much?", "buy",
-    "callback", "contact me", "request a call", "schedule a meeting", "more info", "cost?", "billing", "sign up",
-    "enroll", "product details", "want to buy", "plans", "offer", "free trial", "get a call", "schedule consultation",
-    "customer service", "order", "register", "pricing details", "request info", "request quote", "service options",
-    "monthly plan", "yearly plan", "can I buy?", "partner with us", "special offer", "customer support", "get started",
-    "join now", "corporate deal", "group discount", "training session", "AI chatbot demo"
-]
-
-PORTUGUESE_KEYWORDS = [
-    "demonstração", "demonstracao", "preços", "precos", "orçamento", "orcamento", "comprar", "assinar", "interessado",
-    "começar", "comecar", "quanto custa?", "adquirir", "me ligue", "ligação", "ligacao", "entre em contato",
-    "agendar reunião", "agendar reuniao", "solicitar chamada", "solicitação", "solicitacao", "detalhes do produto",
-    "quero comprar", "planos", "oferta", "teste grátis", "teste gratis", "receber proposta", "solicitar orçamento",
-    "planos disponíveis", "planos disponiveis", "consultoria", "atendimento ao cliente", "assinatura", "serviço",
-    "servico", "cadastro", "plano mensal", "plano anual", "posso comprar?", "parceria", "suporte técnico",
-    "promoção especial", "desconto exclusivo", "desconto empresa", "suporte ao cliente", "treinamento de IA"
-]
-
-EMAIL_REGEX = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-PHONE_REGEX = r"\+?\d{9,15}"
+MAX_LEAD_BATCH_SIZE = int(os.getenv("MAX_LEAD_BATCH_SIZE", 10000))
 
 router = APIRouter(prefix="/leads", tags=["Leads"])
 
-def detect_lead(chatbot_id: int, user_message: str, db: Session):
-    try:
-        lang = detect(user_message)
-        keywords = PORTUGUESE_KEYWORDS if lang == "pt" else ENGLISH_KEYWORDS
-    except Exception as e:
-        logger.warning(f"Language detection failed for message: {user_message}. Defaulting to English. Error: {str(e)}")
-        keywords = ENGLISH_KEYWORDS
-
-    if any(word in user_message.lower() for word in keywords) or re.search(EMAIL_REGEX, user_message) or re.search(PHONE_REGEX, user_message):
+def detect_lead(chatbot_id: int, user_message: str, db: Session, lang: Optional[str] = None):
+    # ✅ Callers that already know the message language pass it in instead of detecting again
+    signals = lead_signals(user_message, lang or language_of(user_message))
+    if signals.is_lead:
+        if signals.keywords:
+            logger.info(f"Lead keywords matched for chatbot {chatbot_id}: {', '.join(signals.keywords)}")
         store_lead(chatbot_id, user_message, db)
         return True
     return False
 
 def store_lead(chatbot_id: int, user_message: str, db: Session):
-    lead = ChatbotLeads(
-        chatbot_id=chatbot_id,
-        user_id="unknown",
-        user_name="Anonymous",
-        lead_source="Chatbot",
-        message=user_message
-    )
-    db.add(lead)
+    db.add(ChatbotLeads(**lead_row(chatbot_id, user_message)))
     db.commit()
+    analytics.record_lead(chatbot_id)
     logger.info(f"✅ Lead Stored: {user_message}")
 
 @router.post("/{id}/process_message")
 def process_message(id: int, message: str, db: Session = Depends(get_db)):
-    from app.models import Chatbots  # Import here to avoid circular import if needed
-    chatbot = db.query(Chatbots).filter(Chatbots.id == id).first()
-    if not chatbot:
+    if chatbot_configs.get_sync(id, db) is None:
         raise HTTPException(status_code=404, detail="Chatbot not found")
     is_lead = detect_lead(id, message.lower(), db)
     return {
@@ -69,3 +44,45 @@ def process_message(id: int, message: str, db: Session = Depends(get_db)):
         "user_message": message,
         "lead_detected": is_lead
     }
+
+class LeadBatchRequest(BaseModel):
+    messages: List[str]
+    store: bool = False
+
+# ✅ Classify thousands of messages in one call; optionally store the leads with one bulk insert
+@router.post("/{id}/process_batch")
+def process_batch(id: int, batch: LeadBatchRequest, db: Session = Depends(get_db)):
+    if len(batch.messages) > MAX_LEAD_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds the {MAX_LEAD_BATCH_SIZE}-message limit.")
+    if chatbot_configs.get_sync(id, db) is None:
+        raise HTTPException(status_code=404, detail="Chatbot not found")
+
+    results = []
+    leads = []
+    for message in batch.messages:
+        lang = language_of(message)
+        signals = lead_signals(message, lang)
+        results.append({
+            "user_message": message,
+            "language": lang,
+            "lead_detected": signals.is_lead,
+            "keywords": signals.keywords,
+            "has_email": signals.has_email,
+            "has_phone": signals.has_phone,
+        })
+        if signals.is_lead:
+            leads.append(lead_row(id, message))
+
+    if batch.store and leads:
+        db.execute(insert(ChatbotLeads), leads)
+        db.commit()
+        analytics.record_lead(id, count=len(leads))
+        logger.info(f"✅ Stored {len(leads)} leads for chatbot {id} from a batch of {len(batch.messages)}")
+
+    return {
+        "chatbot_id": id,
+        "messages_processed": len(batch.messages),
+        "leads_detected": len(leads),
+        "leads_stored": len(leads) if batch.store else 0,
+        "results": results,
+    }
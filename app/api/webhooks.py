@@ -1,28 +1,99 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from app.database import SessionLocal
-from app.models import ChatbotConversations
-import json
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.analytics_rollup import analytics, bucket_start
+from app.bulk_ingest import SYNC_MAX_LINE_BYTES, ConversationCopyBuffer, conversation_record
+from app.chat_pipeline import ensure_chatbot_exists
+from app.database import get_async_db
+from collections import Counter
+from typing import List, Optional
+import datetime
+import logging
+
+logger = logging.getLogger("MedusaApp")
 
 router = APIRouter()
 
+def record_synced_messages(chatbot_id: int, buckets: Counter):
+    """Counts committed sync messages into the analytics rollups, in the bucket of their own timestamp."""
+    for bucket, count in buckets.items():
+        analytics.record_message(chatbot_id, at=bucket, count=count)
+
+class SyncMessage(BaseModel):
+    user_message: str
+    bot_response: str
+    platform: Optional[str] = None
+    timestamp: Optional[datetime.datetime] = None
+
+class ChatbotSyncPayload(BaseModel):
+    chatbot_id: int
+    messages: List[SyncMessage] = []
+
 @router.post("/webhook/chatbot-sync")
-async def chatbot_sync(payload: dict, background_tasks: BackgroundTasks):
+async def chatbot_sync(payload: ChatbotSyncPayload, db: AsyncSession = Depends(get_async_db)):
+    await ensure_chatbot_exists(db, payload.chatbot_id)
+    try:
+        buffer = ConversationCopyBuffer(db)
+        buckets = Counter()
+        for msg in payload.messages:
+            record = conversation_record(payload.chatbot_id, msg.user_message, msg.bot_response, msg.platform, msg.timestamp)
+            await buffer.add(record)
+            buckets[bucket_start(record[-1])] += 1
+        await buffer.flush()
+        await db.commit()
+        record_synced_messages(payload.chatbot_id, buckets)
+        return {"status": "success", "message": "Chatbot data synced successfully", "messages_synced": buffer.written}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def line_too_long(line_number: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Line {line_number} is longer than {SYNC_MAX_LINE_BYTES} bytes")
+
+# ✅ Large backfills: NDJSON body (one message object per line), parsed and COPY'd chunk by chunk
+@router.post("/webhook/chatbot-sync/stream")
+async def chatbot_sync_stream(chatbot_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    await ensure_chatbot_exists(db, chatbot_id)
+    buffer = ConversationCopyBuffer(db)
+    buckets = Counter()
+    line_number = 0
+    pending = b""
+
+    async def ingest(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if len(line) > SYNC_MAX_LINE_BYTES:
+            raise line_too_long(line_number)
+        if not line.strip():
+            return
+        try:
+            msg = SyncMessage.model_validate_json(line)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid message on line {line_number}: {e.errors()[0]['msg']}")
+        record = conversation_record(chatbot_id, msg.user_message, msg.bot_response, msg.platform, msg.timestamp)
+        await buffer.add(record)
+        buckets[bucket_start(record[-1])] += 1
+
     try:
-        chatbot_id = payload.get("chatbot_id")
-        messages = payload.get("messages", [])
-        
-        db = SessionLocal()
-        for msg in messages:
-            conversation = ChatbotConversations(
-                chatbot_id=chatbot_id,
-                user_message=msg.get("user_message"),
-                bot_response=msg.get("bot_response"),
-                platform=msg.get("platform"),  # Capture platform info
-                timestamp=msg.get("timestamp")
-            )
-            db.add(conversation)
-        db.commit()
-        db.close()
-        return {"status": "success", "message": "Chatbot data synced successfully"}
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                await ingest(line)
+            # Without a newline the partial line would otherwise grow with the whole body
+            if len(pending) > SYNC_MAX_LINE_BYTES:
+                raise line_too_long(line_number + 1)
+        await ingest(pending)
+        await buffer.flush()
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
+        await db.rollback()
+        logger.error(f"Chatbot sync stream failed for chatbot {chatbot_id} after {line_number} lines: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    record_synced_messages(chatbot_id, buckets)
+    logger.info(f"✅ Synced {buffer.written} messages for chatbot {chatbot_id}")
+    return {"status": "success", "message": "Chatbot data synced successfully", "messages_synced": buffer.written}
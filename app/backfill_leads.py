@@ -0,0 +1,125 @@
+"""
+Re-runs lead detection over historical chatbot_conversations and writes chatbot_leads in bulk.
+
+Rows are streamed with a server-side cursor (no full-table load) and leads are inserted
+one batch per transaction, so new keyword lists can be applied to the full history.
+Leads carry no conversation id, so a lead is identified by (chatbot_id, message): a
+message that already has a lead (a live "Chatbot" lead or an earlier backfill, including
+earlier batches of this run) is skipped, and --replace only removes backfilled leads whose
+message occurs in the selected range. A --dry-run writes nothing, so a message repeated in
+different batches is counted once per batch:
+
+    python -m app.backfill_leads --chatbot-id 3 --since 2024-01-01 --replace
+"""
+import argparse
+import datetime
+import logging
+import time
+
+from sqlalchemy import and_, delete, exists, insert, select
+
+from app.database import engine
+from app.language import init_language_detection, language_of
+from app.lead_detection import lead_row, lead_signals
+from app.models import ChatbotConversations, ChatbotLeads
+
+logger = logging.getLogger("MedusaApp")
+
+BACKFILL_LEAD_SOURCE = "Backfill"
+
+def conversation_query(chatbot_ids, since):
+    query = select(ChatbotConversations.chatbot_id, ChatbotConversations.user_message).order_by(ChatbotConversations.id)
+    if chatbot_ids:
+        query = query.where(ChatbotConversations.chatbot_id.in_(chatbot_ids))
+    if since:
+        query = query.where(ChatbotConversations.timestamp >= since)
+    return query
+
+def stale_leads_statement(chatbot_ids, since):
+    """Deletes backfilled leads of the selected chatbots whose message occurs on or after `since`."""
+    statement = delete(ChatbotLeads).where(ChatbotLeads.lead_source == BACKFILL_LEAD_SOURCE)
+    if chatbot_ids:
+        statement = statement.where(ChatbotLeads.chatbot_id.in_(chatbot_ids))
+    if since:
+        statement = statement.where(exists().where(and_(
+            ChatbotConversations.chatbot_id == ChatbotLeads.chatbot_id,
+            ChatbotConversations.user_message == ChatbotLeads.message,
+            ChatbotConversations.timestamp >= since,
+        )))
+    return statement
+
+def existing_lead_keys(conn, leads):
+    """The (chatbot_id, message) pairs among `leads` that already have a lead row."""
+    rows = conn.execute(
+        select(ChatbotLeads.chatbot_id, ChatbotLeads.message).where(
+            ChatbotLeads.chatbot_id.in_({lead["chatbot_id"] for lead in leads}),
+            ChatbotLeads.message.in_({lead["message"] for lead in leads}),
+        )
+    )
+    return {(row.chatbot_id, row.message) for row in rows}
+
+def backfill(chatbot_ids=None, since=None, batch_size=5000, replace=False, dry_run=False, bind=engine) -> dict:
+    init_language_detection()
+    scanned = 0
+    detected = 0
+    written = 0
+    started = time.perf_counter()
+
+    if replace and not dry_run:
+        with bind.begin() as conn:
+            removed = conn.execute(stale_leads_statement(chatbot_ids, since)).rowcount
+        logger.info(f"Removed {removed} leads from a previous backfill")
+
+    # ✅ Server-side cursor: rows arrive batch_size at a time instead of all at once
+    with bind.connect() as reader:
+        result = reader.execution_options(stream_results=True, yield_per=batch_size).execute(
+            conversation_query(chatbot_ids, since)
+        )
+        for rows in result.partitions():
+            leads = [
+                lead_row(row.chatbot_id, row.user_message, BACKFILL_LEAD_SOURCE)
+                for row in rows
+                if row.user_message and lead_signals(row.user_message, language_of(row.user_message)).is_lead
+            ]
+            scanned += len(rows)
+            detected += len(leads)
+            if leads:
+                with bind.begin() as writer:
+                    # Earlier batches are already committed, so the database check covers them;
+                    # only this batch's keys are held in memory
+                    recorded = existing_lead_keys(writer, leads)
+                    new_leads = []
+                    for lead in leads:
+                        key = (lead["chatbot_id"], lead["message"])
+                        if key not in recorded:
+                            recorded.add(key)
+                            new_leads.append(lead)
+                    if new_leads and not dry_run:
+                        writer.execute(insert(ChatbotLeads), new_leads)
+                written += len(new_leads)
+            logger.info(f"Backfill progress: {scanned} conversations scanned, {detected} leads, {written} new")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "conversations_scanned": scanned,
+        "leads_detected": detected,
+        "leads_written": 0 if dry_run else written,
+        "leads_already_recorded": detected - written,
+        "seconds": round(elapsed, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chatbot-id", type=int, action="append", dest="chatbot_ids", help="Repeat to backfill several chatbots (default: all)")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, help="Only conversations on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--replace", action="store_true", help=f"Delete leads written by a previous backfill ({BACKFILL_LEAD_SOURCE!r}) for the selected range first")
+    parser.add_argument("--dry-run", action="store_true", help="Count leads without writing them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    summary = backfill(args.chatbot_ids, args.since, args.batch_size, args.replace, args.dry_run)
+    logger.info(f"✅ Backfill finished: {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import datetime
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChatbotConversations
+
+logger = logging.getLogger("MedusaApp")
+
+# Rows buffered per COPY round trip when ingesting a stream
+SYNC_COPY_BATCH_SIZE = int(os.getenv("SYNC_COPY_BATCH_SIZE", 5000))
+# Longest NDJSON line accepted by the streaming sync; a body without newlines is refused (413) past this
+SYNC_MAX_LINE_BYTES = int(os.getenv("SYNC_MAX_LINE_BYTES", 1024 * 1024))
+
+CONVERSATION_COPY_COLUMNS = ("chatbot_id", "user_message", "bot_response", "platform", "timestamp")
+
+ConversationRecord = Tuple[int, str, str, Optional[str], datetime.datetime]
+
+def conversation_record(chatbot_id: int, user_message: str, bot_response: str, platform: Optional[str], timestamp: Optional[datetime.datetime]) -> ConversationRecord:
+    """
+    One COPY row. The column's default is SQLAlchemy's client-side default=, which COPY (and
+    a bare executemany of these tuples) never runs, so the timestamp is filled in here (naive UTC,
+    like the column).
+    """
+    if timestamp is None:
+        timestamp = datetime.datetime.utcnow()
+    elif timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (chatbot_id, user_message, bot_response, platform, timestamp)
+
+async def copy_conversations(db: AsyncSession, records: Sequence[ConversationRecord]) -> int:
+    """
+    Writes conversation rows inside the session's transaction (the caller commits).
+
+    On PostgreSQL this is a binary COPY through asyncpg; other dialects fall back to a
+    single executemany INSERT.
+    """
+    if not records:
+        return 0
+    conn = await db.connection()
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            ChatbotConversations.__tablename__,
+            records=records,
+            columns=CONVERSATION_COPY_COLUMNS,
+        )
+    else:
+        await conn.execute(insert(ChatbotConversations), [dict(zip(CONVERSATION_COPY_COLUMNS, record)) for record in records])
+    return len(records)
+
+class ConversationCopyBuffer:
+    """Accumulates records and flushes them with COPY every SYNC_COPY_BATCH_SIZE rows."""
+
+    def __init__(self, db: AsyncSession, batch_size: int = SYNC_COPY_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self._records: List[ConversationRecord] = []
+        self.written = 0
+
+    async def add(self, record: ConversationRecord):
+        self._records.append(record)
+        if len(self._records) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        records, self._records = self._records, []
+        self.written += await copy_conversations(self.db, records)
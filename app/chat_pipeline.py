@@ -0,0 +1,264 @@
+import datetime
+import logging
+import math
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+import openai
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analytics_rollup import analytics
+from app.chatbot_config import ChatbotConfig, chatbot_configs
+from app.database import AsyncSessionLocal
+from app.history import conversation_history, with_summary
+from app.language import detect_language
+from app.llm_client import generate_reply, stream_reply
+from app.message_metrics import MessageMetrics, measure
+from app.models import ChatbotConversations
+from app.prompts import CompiledPrompt, prompt_registry
+from app.resilience import ProviderUnavailable, guard_for
+from app.response_cache import response_cache
+from app.semantic_cache import semantic_cache
+from app.summarizer import conversation_summarizer
+from app.thread_sessions import ThreadLease, thread_for, thread_sessions
+from app.write_behind import conversation_writer
+
+logger = logging.getLogger("MedusaApp")
+
+MAX_MESSAGE_LENGTH = 500
+
+def validate_user_message(user_message: str) -> str:
+    """Strips the message and enforces the length limits shared by all chat entry points."""
+    user_message = user_message.strip()
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty.")
+    if len(user_message) > MAX_MESSAGE_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Message exceeds the {MAX_MESSAGE_LENGTH}-character limit.")
+    return user_message
+
+# ✅ Served from the chatbot config cache; only a miss reads the chatbots table
+async def ensure_chatbot_exists(db: Optional[AsyncSession], chatbot_id: int) -> ChatbotConfig:
+    config = await chatbot_configs.get(chatbot_id, db)
+    if config is None:
+        raise HTTPException(status_code=404, detail="Chatbot not found")
+    return config
+
+# ✅ Exact-match cache first, then the semantic (near-duplicate) cache
+async def lookup_cached_reply(chatbot_id: int, user_message: str, language: str, prompt: CompiledPrompt):
+    """Returns (exact cache key or None, cached reply or None)."""
+    cache_key = None
+    if response_cache.enabled_for(chatbot_id):
+        cache_key = response_cache.key_for(chatbot_id, user_message, language, prompt.fingerprint)
+        cached_response = await response_cache.get(cache_key)
+        if cached_response is not None:
+            return cache_key, cached_response
+
+    if semantic_cache.enabled_for(chatbot_id):
+        cached_response = await semantic_cache.lookup(chatbot_id, user_message, prompt.revision)
+        if cached_response is not None:
+            if cache_key is not None:
+                await response_cache.set(cache_key, cached_response)
+            return cache_key, cached_response
+
+    return cache_key, None
+
+async def remember_reply(chatbot_id: int, cache_key: Optional[str], prompt: CompiledPrompt, user_message: str, bot_response: str, user_id: Optional[str] = None):
+    if cache_key is not None:
+        await response_cache.set(cache_key, bot_response)
+    # A signed-in user's reply may be personalized; only anonymous replies are served to others
+    if semantic_cache.enabled_for(chatbot_id) and not user_id:
+        await semantic_cache.add(chatbot_id, user_message, bot_response, prompt.revision)
+
+async def detect_language_timed(user_message: str, metrics: Optional[MessageMetrics]) -> str:
+    with measure(metrics, "language_ms"):
+        return await detect_language(user_message)
+
+# ✅ Bounded context: runs see the rolling summary plus the recent turns that fit the model's token budget
+async def history_run_options(config: ChatbotConfig, prompt: CompiledPrompt, user_id: Optional[str], lease: ThreadLease) -> Tuple[str, Optional[List[dict]], dict]:
+    """Returns (instructions, messages to seed a new thread with or None, run options)."""
+    run_options = config.run_options()
+    if not user_id:
+        return prompt.text, None, run_options
+    history = await conversation_history.seed_messages(config.id, user_id, config.model) if lease.created else None
+    window = await conversation_history.window(config.id, user_id, config.model)
+    run_options["truncation_strategy"] = {"type": "last_messages", "last_messages": window.message_count + 1}
+    return with_summary(prompt.text, window.summary), history, run_options
+
+async def session_has_context(config: ChatbotConfig, user_id: Optional[str]) -> bool:
+    """
+    Whether earlier turns (or their summary) shape this session's next reply. Cached replies
+    are only served, and replies only cached, without such context: "yes" or "tell me more"
+    mean something else in every conversation.
+    """
+    if not user_id:
+        return False
+    window = await conversation_history.window(config.id, user_id, config.model)
+    return bool(window.summary or window.unsummarized)
+
+def record_turn(chatbot_id: int, user_id: Optional[str], user_message: str, bot_response: str):
+    if user_id:
+        window = conversation_history.record_turn(chatbot_id, user_id, user_message, bot_response)
+        conversation_summarizer.maybe_request(chatbot_id, user_id, window)
+
+def unavailable_reply(chatbot_id: int, e: ProviderUnavailable) -> str:
+    """The provider's configured fallback reply, else a 503 telling the client when to retry."""
+    logger.warning(f"Medusa AI unavailable for chatbot {chatbot_id}: {str(e)}")
+    fallback = guard_for(e.service).fallback
+    if fallback:
+        return fallback
+    raise HTTPException(
+        status_code=503,
+        detail="🔥 Medusa AI is temporarily unavailable, please try again shortly.",
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+# ✅ Detect language and ask Medusa AI, all on non-blocking I/O
+async def generate_chat_reply(
+    chatbot_id: int,
+    user_message: str,
+    user_id: Optional[str] = None,
+    language: Optional[str] = None,
+    metrics: Optional[MessageMetrics] = None,
+) -> str:
+    config = await ensure_chatbot_exists(None, chatbot_id)
+    detected_language = language or await detect_language_timed(user_message, metrics)
+    prompt = prompt_registry.compiled(config, detected_language)
+
+    cache_key, cached_response = None, None
+    cacheable = not await session_has_context(config, user_id)
+    if cacheable:
+        cache_key, cached_response = await lookup_cached_reply(chatbot_id, user_message, detected_language, prompt)
+    if cached_response is not None:
+        # The next message seeds its new thread from the stored turns, this one included
+        record_turn(chatbot_id, user_id, user_message, cached_response)
+        return cached_response
+
+    try:
+        async with thread_for(chatbot_id, user_id) as lease:
+            instructions, history, run_options = await history_run_options(config, prompt, user_id, lease)
+            with measure(metrics, "llm_ms"):
+                bot_response = await generate_reply(instructions, user_message, lease.thread_id, metrics, run_options, history)
+            record_turn(chatbot_id, user_id, user_message, bot_response)
+    except ProviderUnavailable as e:
+        # ✅ Fallbacks are neither cached nor folded into the history
+        return unavailable_reply(chatbot_id, e)
+    except openai.NotFoundError as e:
+        # The stored thread was deleted on OpenAI's side; the next message starts a fresh one
+        thread_sessions.forget(chatbot_id, user_id)
+        raise HTTPException(status_code=500, detail=f"🔥 Medusa AI Error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Medusa AI call failed for chatbot {chatbot_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"🔥 Medusa AI Error: {str(e)}")
+
+    if cacheable:
+        await remember_reply(chatbot_id, cache_key, prompt, user_message, bot_response, user_id)
+    return bot_response
+
+# ✅ Same as generate_chat_reply, but yields text deltas as soon as the model produces them
+async def stream_chat_reply(
+    chatbot_id: int,
+    user_message: str,
+    user_id: Optional[str] = None,
+    language: Optional[str] = None,
+    metrics: Optional[MessageMetrics] = None,
+) -> AsyncIterator[str]:
+    config = await ensure_chatbot_exists(None, chatbot_id)
+    detected_language = language or await detect_language_timed(user_message, metrics)
+    prompt = prompt_registry.compiled(config, detected_language)
+
+    cache_key, cached_response = None, None
+    cacheable = not await session_has_context(config, user_id)
+    if cacheable:
+        cache_key, cached_response = await lookup_cached_reply(chatbot_id, user_message, detected_language, prompt)
+    if cached_response is not None:
+        record_turn(chatbot_id, user_id, user_message, cached_response)
+        yield cached_response
+        return
+
+    chunks = []
+    try:
+        async with thread_for(chatbot_id, user_id) as lease:
+            instructions, history, run_options = await history_run_options(config, prompt, user_id, lease)
+            llm_started = time.perf_counter()
+            async for delta in stream_reply(instructions, user_message, lease.thread_id, metrics, run_options, history):
+                if metrics is not None and metrics.first_token_ms is None:
+                    metrics.first_token_ms = (time.perf_counter() - llm_started) * 1000
+                chunks.append(delta)
+                yield delta
+            if metrics is not None:
+                metrics.llm_ms = (time.perf_counter() - llm_started) * 1000
+            record_turn(chatbot_id, user_id, user_message, "".join(chunks).strip())
+    except ProviderUnavailable as e:
+        # Only raised before the first delta (refused, or no first token in time)
+        yield unavailable_reply(chatbot_id, e)
+        return
+    except openai.NotFoundError as e:
+        thread_sessions.forget(chatbot_id, user_id)
+        raise HTTPException(status_code=500, detail=f"🔥 Medusa AI Error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Medusa AI stream failed for chatbot {chatbot_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"🔥 Medusa AI Error: {str(e)}")
+
+    if cacheable:
+        await remember_reply(chatbot_id, cache_key, prompt, user_message, "".join(chunks).strip(), user_id)
+
+async def save_conversation(db: Optional[AsyncSession], chatbot_id: int, user_message: str, bot_response: str, platform: str = "Web", user_id: Optional[str] = None):
+    # ✅ Hand the record to the write-behind queue when it is running; otherwise write it inline
+    if conversation_writer.running:
+        await conversation_writer.submit(chatbot_id, user_message, bot_response, platform, user_id=user_id)
+        return
+    if db is None:
+        # The request-scoped session is already closed once a streaming response starts
+        async with AsyncSessionLocal() as db:
+            await save_conversation(db, chatbot_id, user_message, bot_response, platform, user_id)
+        return
+
+    conversation = ChatbotConversations(
+        chatbot_id=chatbot_id,
+        user_message=user_message,
+        bot_response=bot_response,
+        platform=platform,
+        user_id=user_id,
+        timestamp=datetime.datetime.utcnow()
+    )
+    db.add(conversation)
+    await db.commit()
+
+# ✅ Async end-to-end pipeline: detect language -> ask Medusa AI -> store the conversation
+async def process_chat_message(
+    db: AsyncSession,
+    chatbot_id: int,
+    user_message: str,
+    platform: str = "Web",
+    user_id: Optional[str] = None,
+    language: Optional[str] = None,
+) -> str:
+    metrics = MessageMetrics()
+    started = time.perf_counter()
+    bot_response = await generate_chat_reply(chatbot_id, user_message, user_id, language, metrics)
+    response_ms = (time.perf_counter() - started) * 1000
+    with measure(metrics, "db_write_ms"):
+        await save_conversation(db, chatbot_id, user_message, bot_response, platform, user_id)
+    analytics.record_message(chatbot_id, response_ms, metrics=metrics)
+    return bot_response
+
+# ✅ Streaming pipeline: yields deltas, then stores the full conversation once the stream completes
+async def stream_chat_message(
+    chatbot_id: int,
+    user_message: str,
+    platform: str = "Web",
+    user_id: Optional[str] = None,
+    language: Optional[str] = None,
+) -> AsyncIterator[str]:
+    metrics = MessageMetrics()
+    started = time.perf_counter()
+    chunks = []
+    async for delta in stream_chat_reply(chatbot_id, user_message, user_id, language, metrics):
+        chunks.append(delta)
+        yield delta
+    response_ms = (time.perf_counter() - started) * 1000
+
+    with measure(metrics, "db_write_ms"):
+        await save_conversation(None, chatbot_id, user_message, "".join(chunks).strip(), platform, user_id)
+    analytics.record_message(chatbot_id, response_ms, metrics=metrics)
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal
+from app.models import Chatbots
+
+logger = logging.getLogger("MedusaApp")
+
+CHATBOT_CONFIG_TTL_SECONDS = float(os.getenv("CHATBOT_CONFIG_TTL_SECONDS", 300))
+# Unknown ids are remembered briefly too, so probing a bad id does not hit the database every time
+CHATBOT_CONFIG_MISSING_TTL_SECONDS = float(os.getenv("CHATBOT_CONFIG_MISSING_TTL_SECONDS", 10))
+CHATBOT_CONFIG_CACHE_SIZE = int(os.getenv("CHATBOT_CONFIG_CACHE_SIZE", 10000))
+
+# Tool types a per-run override may enable. "function" is left out: nothing here answers
+# requires_action, so a function call would leave the run (and the user's thread) stuck
+ASSISTANT_TOOL_TYPES = {"code_interpreter", "file_search"}
+# Model families the Assistants API runs; anything else keeps the assistant's own model
+ASSISTANT_MODEL_PREFIXES = ("gpt-4", "gpt-3.5-turbo", "o1", "o3", "o4")
+# Display names stored by older dashboards, mapped to model ids ("legacy=model-id,...")
+CHATBOT_MODEL_ALIASES = dict(
+    (alias.strip().lower(), model_id.strip())
+    for alias, _, model_id in (
+        item.partition("=") for item in os.getenv("CHATBOT_MODEL_ALIASES", "gpt-3.5=gpt-3.5-turbo,chatgpt=gpt-3.5-turbo").split(",")
+    )
+    if alias.strip() and model_id.strip()
+)
+
+_MISSING = object()
+
+def parse_tools(raw: Optional[str]) -> Tuple[str, ...]:
+    """
+    Normalizes Chatbots.tools into JSON-encoded Assistants tool definitions.
+
+    Accepts a JSON list (tool type names or full tool objects) or a comma-separated list of
+    type names; anything the Assistants API would reject is dropped rather than failing
+    every message of the bot.
+    """
+    if not raw or not raw.strip():
+        return ()
+    try:
+        items = json.loads(raw)
+    except ValueError:
+        items = [name.strip() for name in raw.split(",")]
+    if not isinstance(items, list):
+        items = [items]
+
+    tools = []
+    for item in items:
+        tool = {"type": item} if isinstance(item, str) else item
+        if isinstance(tool, dict) and tool.get("type") in ASSISTANT_TOOL_TYPES:
+            tools.append(json.dumps(tool, sort_keys=True))
+    return tuple(tools)
+
+def parse_model(raw: Optional[str]) -> Optional[str]:
+    """
+    Normalizes Chatbots.model into an OpenAI model id, or None to keep the assistant's model.
+
+    Legacy display names (the seed data has "GPT-3") would make OpenAI reject every run of
+    the bot, so unknown values are ignored instead of being sent as an override.
+    """
+    name = (raw or "").strip().lower().replace(" ", "-")
+    if not name:
+        return None
+    name = CHATBOT_MODEL_ALIASES.get(name, name)
+    if name.startswith(ASSISTANT_MODEL_PREFIXES) and "instruct" not in name:
+        return name
+    logger.warning(f"Ignoring unsupported chatbot model '{raw}'; using the assistant's model")
+    return None
+
+class ChatbotConfig(NamedTuple):
+    """Immutable snapshot of the Chatbots columns the chat hot path needs."""
+    id: int
+    name: str
+    model: Optional[str]
+    prompt: Optional[str]
+    tools: Tuple[str, ...]
+
+    @classmethod
+    def from_row(cls, chatbot: Chatbots) -> "ChatbotConfig":
+        return cls(
+            id=chatbot.id,
+            name=chatbot.name,
+            model=parse_model(chatbot.model),
+            prompt=(chatbot.prompt or "").strip() or None,
+            tools=parse_tools(chatbot.tools),
+        )
+
+    def run_options(self) -> dict:
+        """Per-run overrides of the shared assistant's model and tools."""
+        options = {}
+        if self.model:
+            options["model"] = self.model
+        if self.tools:
+            options["tools"] = [json.loads(tool) for tool in self.tools]
+        return options
+
+class ChatbotConfigCache:
+    """
+    In-process chatbot config snapshots with a TTL.
+
+    Hits never touch the database. Writes through the ORM in this process invalidate their
+    entry immediately (see the mapper events below); other workers pick the change up once
+    the TTL expires. Guarded by a lock because the sync lead endpoints read it from the
+    threadpool.
+    """
+
+    def __init__(self, maxsize: int = CHATBOT_CONFIG_CACHE_SIZE, ttl: float = CHATBOT_CONFIG_TTL_SECONDS, missing_ttl: float = CHATBOT_CONFIG_MISSING_TTL_SECONDS):
+        self.missing_ttl = missing_ttl
+        self._cache = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _cached(self, chatbot_id: int):
+        with self._lock:
+            return self._cache.get(chatbot_id, _MISSING)
+
+    def _remember(self, chatbot_id: int, chatbot: Optional[Chatbots]) -> Optional[ChatbotConfig]:
+        config = ChatbotConfig.from_row(chatbot) if chatbot is not None else None
+        with self._lock:
+            self._cache.set(chatbot_id, config, None if config is not None else self.missing_ttl)
+            self.loads += 1
+        return config
+
+    async def get(self, chatbot_id: int, db: Optional[AsyncSession] = None) -> Optional[ChatbotConfig]:
+        """The bot's config, or None when it does not exist; loads with `db` (or a new session) on a miss."""
+        config = self._cached(chatbot_id)
+        if config is not _MISSING:
+            return config
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                return self._remember(chatbot_id, await session.get(Chatbots, chatbot_id))
+        return self._remember(chatbot_id, await db.get(Chatbots, chatbot_id))
+
+    def get_sync(self, chatbot_id: int, db: Session) -> Optional[ChatbotConfig]:
+        config = self._cached(chatbot_id)
+        if config is not _MISSING:
+            return config
+        return self._remember(chatbot_id, db.get(Chatbots, chatbot_id))
+
+    def invalidate(self, chatbot_id: Optional[int] = None):
+        """Drops one bot's snapshot, or every snapshot when no id is given."""
+        with self._lock:
+            if chatbot_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(chatbot_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"loads": self.loads, **self._cache.stats()}
+
+chatbot_configs = ChatbotConfigCache()
+
+# ✅ ORM writes to a chatbot (including creating one that was cached as missing) drop its snapshot
+@event.listens_for(Chatbots, "after_insert")
+@event.listens_for(Chatbots, "after_update")
+@event.listens_for(Chatbots, "after_delete")
+def _invalidate_chatbot_config(mapper, connection, target):
+    chatbot_configs.invalidate(target.id)
@@ -0,0 +1,212 @@
+import logging
+import os
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal
+from app.models import ChatbotConversations, ChatbotConversationSummaries
+
+try:
+    import tiktoken
+except ImportError:  # ✅ Token counts fall back to a ~4 characters per token estimate without tiktoken
+    tiktoken = None
+
+logger = logging.getLogger("MedusaApp")
+
+# How many past turns (user message + reply) a conversation may carry into a run
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 20))
+# Token budget for the carried-over turns, e.g. "gpt-4o:8000,gpt-4-turbo:4000"; models not listed get the default
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 3000))
+HISTORY_MODEL_TOKEN_BUDGETS = os.getenv("HISTORY_MODEL_TOKEN_BUDGETS", "")
+# Model of the shared assistant, used for bots that do not override it
+HISTORY_DEFAULT_MODEL = os.getenv("HISTORY_DEFAULT_MODEL", "gpt-4-turbo")
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", 10000))
+HISTORY_CACHE_TTL_SECONDS = float(os.getenv("HISTORY_CACHE_TTL_SECONDS", 3600))
+HISTORY_TOKEN_CACHE_SIZE = int(os.getenv("HISTORY_TOKEN_CACHE_SIZE", 50000))
+
+# Role and framing tokens the API adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Summary of the earlier conversation with this user:"
+
+def parse_token_budgets(raw: str) -> Dict[str, int]:
+    budgets = {}
+    for item in raw.split(","):
+        model, _, tokens = item.partition(":")
+        if model.strip() and tokens.strip().isdigit():
+            budgets[model.strip()] = int(tokens)
+    return budgets
+
+TOKEN_BUDGETS = parse_token_budgets(HISTORY_MODEL_TOKEN_BUDGETS)
+
+def token_budget(model: Optional[str]) -> int:
+    return TOKEN_BUDGETS.get(model or HISTORY_DEFAULT_MODEL, HISTORY_TOKEN_BUDGET)
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+# ✅ Each message is tokenized once; repeats (greetings, stored turns reloaded after a restart) are dict reads
+@lru_cache(maxsize=HISTORY_TOKEN_CACHE_SIZE)
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _encoding(model or HISTORY_DEFAULT_MODEL)
+    if encoding is None:
+        return (len(text) + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+    return len(encoding.encode(text, disallowed_special=())) + MESSAGE_OVERHEAD_TOKENS
+
+def turn_tokens(user_message: str, bot_response: str, model: Optional[str] = None) -> int:
+    return count_tokens(user_message, model) + count_tokens(bot_response, model)
+
+def with_summary(instructions: str, summary: Optional[str]) -> str:
+    return f"{instructions}\n\n{SUMMARY_HEADER}\n{summary}" if summary else instructions
+
+class HistoryWindow:
+    """
+    Token accounting for the most recent turns of one conversation, oldest first.
+
+    Only the per-turn token counts are kept: the turns themselves already live on the
+    conversation's OpenAI thread, so a new turn is one append plus trimming from the front
+    until the window (and the rolling summary of older turns, if any) fits the budget again.
+    """
+
+    __slots__ = ("model", "budget", "max_turns", "turns", "tokens", "summary", "summary_tokens", "unsummarized")
+
+    def __init__(self, model: Optional[str], max_turns: int = HISTORY_MAX_TURNS):
+        self.model = model
+        self.budget = token_budget(model)
+        self.max_turns = max_turns
+        self.turns: Deque[int] = deque()
+        self.tokens = 0
+        self.summary: Optional[str] = None
+        self.summary_tokens = 0
+        # Turns after the summary (including ones trimmed from the window) that are not summarized yet
+        self.unsummarized = 0
+
+    def append(self, tokens: int):
+        self.turns.append(tokens)
+        self.tokens += tokens
+        self.unsummarized += 1
+        self._trim()
+
+    def _trim(self):
+        while self.turns and (len(self.turns) > self.max_turns or self.tokens + self.summary_tokens > self.budget):
+            self.tokens -= self.turns.popleft()
+
+    def apply_summary(self, summary: str, turns_summarized: int):
+        """Swaps the oldest `turns_summarized` turns for the new summary."""
+        self.summary = summary
+        self.summary_tokens = count_tokens(summary, self.model)
+        self.unsummarized = max(0, self.unsummarized - turns_summarized)
+        while len(self.turns) > self.unsummarized:
+            self.tokens -= self.turns.popleft()
+        self._trim()
+
+    @property
+    def message_count(self) -> int:
+        return 2 * len(self.turns)
+
+class HistoryBuilder:
+    """
+    Bounded conversation history per (chatbot, user).
+
+    The first message of a session loads the stored summary and the last HISTORY_MAX_TURNS
+    turns after it with indexed queries (chatbot_id, user_id, id DESC); later turns only
+    append their own token count. Runs are limited to the messages in the window plus the
+    summary, and a thread created from scratch (expired or deleted on OpenAI's side) is
+    seeded with the same turns, so token spend stays flat however long the conversation gets.
+    """
+
+    def __init__(self, maxsize: int = HISTORY_CACHE_SIZE, ttl: float = HISTORY_CACHE_TTL_SECONDS, max_turns: int = HISTORY_MAX_TURNS):
+        self.max_turns = max_turns
+        self._cache = TTLCache(maxsize, ttl)
+        self.loads = 0
+        self.seeded_threads = 0
+        self.turns_trimmed = 0
+
+    async def _load(self, chatbot_id: int, user_id: str) -> Tuple[Optional[ChatbotConversationSummaries], list]:
+        """The stored summary (if any) and up to max_turns of the turns after it, oldest first."""
+        async with AsyncSessionLocal() as db:
+            summary = (await db.execute(
+                select(ChatbotConversationSummaries).where(
+                    ChatbotConversationSummaries.chatbot_id == chatbot_id,
+                    ChatbotConversationSummaries.user_id == user_id
+                )
+            )).scalar_one_or_none()
+            query = (
+                select(ChatbotConversations.user_message, ChatbotConversations.bot_response)
+                .where(ChatbotConversations.chatbot_id == chatbot_id, ChatbotConversations.user_id == user_id)
+                .order_by(ChatbotConversations.id.desc())
+                .limit(self.max_turns)
+            )
+            if summary is not None:
+                query = query.where(ChatbotConversations.id > summary.through_conversation_id)
+            rows = (await db.execute(query)).all()
+        return summary, list(reversed(rows))
+
+    def _remember(self, chatbot_id: int, user_id: str, summary: Optional[ChatbotConversationSummaries], rows: list, model: Optional[str]) -> HistoryWindow:
+        window = HistoryWindow(model, self.max_turns)
+        if summary is not None:
+            window.apply_summary(summary.summary, 0)
+        for row in rows:
+            window.append(turn_tokens(row.user_message, row.bot_response, model))
+        self._cache.set((chatbot_id, user_id), window)
+        self.loads += 1
+        return window
+
+    async def window(self, chatbot_id: int, user_id: str, model: Optional[str] = None) -> HistoryWindow:
+        window = self._cache.get((chatbot_id, user_id))
+        if window is None:
+            window = self._remember(chatbot_id, user_id, *await self._load(chatbot_id, user_id), model)
+        return window
+
+    async def seed_messages(self, chatbot_id: int, user_id: str, model: Optional[str] = None) -> List[dict]:
+        """The stored turns that fit the budget as Assistants messages, for seeding a freshly created thread."""
+        summary, rows = await self._load(chatbot_id, user_id)
+        window = self._cache.get((chatbot_id, user_id))
+        if window is None:
+            window = self._remember(chatbot_id, user_id, summary, rows, model)
+        messages = []
+        for row in rows[max(0, len(rows) - len(window.turns)):]:
+            messages.append({"role": "user", "content": row.user_message})
+            messages.append({"role": "assistant", "content": row.bot_response})
+        if messages:
+            self.seeded_threads += 1
+        return messages
+
+    def record_turn(self, chatbot_id: int, user_id: str, user_message: str, bot_response: str) -> Optional[HistoryWindow]:
+        """Appends a finished turn to the cached window (the row itself is stored by save_conversation)."""
+        window = self._cache.get((chatbot_id, user_id))
+        if window is None:
+            return None
+        turns = len(window.turns)
+        window.append(turn_tokens(user_message, bot_response, window.model))
+        self.turns_trimmed += turns + 1 - len(window.turns)
+        return window
+
+    def apply_summary(self, chatbot_id: int, user_id: str, summary: str, turns_summarized: int):
+        """Called by the summarizer once a new summary is stored; a window not in memory reloads it anyway."""
+        window = self._cache.get((chatbot_id, user_id))
+        if window is not None:
+            window.apply_summary(summary, turns_summarized)
+
+    def stats(self) -> dict:
+        info = count_tokens.cache_info()
+        return {
+            "tokenizer": "tiktoken" if tiktoken is not None else "estimate",
+            "loads": self.loads,
+            "seeded_threads": self.seeded_threads,
+            "turns_trimmed": self.turns_trimmed,
+            "token_cache_hits": info.hits,
+            "token_cache_misses": info.misses,
+            "cache": self._cache.stats(),
+        }
+
+conversation_history = HistoryBuilder()
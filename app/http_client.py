@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import random
+from typing import Dict, Optional
+
+import httpx
+
+from app.observability import track_call
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # ✅ HTTP/2 needs the optional h2 package; without it clients stay on keep-alive HTTP/1.1
+    h2 = None
+
+logger = logging.getLogger("MedusaApp")
+
+# Limits apply per service, and every service talks to a single host
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", 30))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 5))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", 30))
+# Also bounds the wait for a free pooled connection
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", 5))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+HTTP_RETRY_BACKOFF_SECONDS = float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", 0.2))
+HTTP_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("HTTP_RETRY_MAX_BACKOFF_SECONDS", 5))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes") and h2 is not None
+
+# The server turned the request away without processing it, so any method may be retried
+RETRY_ALWAYS_STATUSES = {429, 503}
+# The request may have been processed; only retried for idempotent calls
+RETRY_IDEMPOTENT_STATUSES = {502, 504}
+# Failures before the request left this process
+RETRY_ALWAYS_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def backoff_seconds(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After (in seconds) when it sent one."""
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), HTTP_RETRY_MAX_BACKOFF_SECONDS)
+    return random.uniform(0, min(HTTP_RETRY_MAX_BACKOFF_SECONDS, HTTP_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+def create_client(read_timeout: float = HTTP_READ_TIMEOUT_SECONDS, max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(HTTP_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=HTTP_CONNECT_TIMEOUT_SECONDS, pool=HTTP_POOL_TIMEOUT_SECONDS),
+        follow_redirects=True,
+    )
+
+class HttpClientPool:
+    """
+    One pooled httpx.AsyncClient per outbound service, created on first use.
+
+    Connections stay open between calls (keep-alive, HTTP/2 multiplexing when h2 is
+    installed), so only the first request to a host pays for the TCP and TLS handshakes.
+    Each service gets its own connection limits and timeouts.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.requests: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+
+    def get(self, service: str, read_timeout: float = HTTP_READ_TIMEOUT_SECONDS, max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST) -> httpx.AsyncClient:
+        client = self._clients.get(service)
+        if client is None or client.is_closed:
+            client = self._clients[service] = create_client(read_timeout, max_connections)
+        return client
+
+    async def request(self, service: str, operation: str, method: str, url: str, idempotent: bool = False, retries: int = HTTP_RETRIES, **kwargs) -> httpx.Response:
+        """
+        Sends one request on the service's pooled client, retrying with jittered backoff.
+
+        Connection failures, 429 and 503 are retried for any method; read errors, 502 and
+        504 only when `idempotent`, since the server may already have acted on the request.
+        The final response is returned whatever its status; the last error is raised.
+        """
+        client = self.get(service)
+        for attempt in range(retries + 1):
+            self.requests[service] = self.requests.get(service, 0) + 1
+            retry_after = None
+            try:
+                with track_call(service, operation):
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == retries or not (idempotent or isinstance(e, RETRY_ALWAYS_ERRORS)):
+                    raise
+                logger.warning(f"{service} {operation} failed ({type(e).__name__}), retrying")
+            else:
+                retryable = response.status_code in RETRY_ALWAYS_STATUSES or (idempotent and response.status_code in RETRY_IDEMPOTENT_STATUSES)
+                if attempt == retries or not retryable:
+                    return response
+                retry_after = response.headers.get("retry-after")
+                logger.warning(f"{service} {operation} returned {response.status_code}, retrying")
+            self.retries[service] = self.retries.get(service, 0) + 1
+            await asyncio.sleep(backoff_seconds(attempt, retry_after))
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "http2": HTTP2_ENABLED,
+            "clients": len(self._clients),
+            "requests": dict(self.requests),
+            "retries": dict(self.retries),
+        }
+
+http_clients = HttpClientPool()
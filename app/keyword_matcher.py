@@ -0,0 +1,154 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import ahocorasick
+except ImportError:  # ✅ pyahocorasick is optional; the pure-Python automaton below gives the same matches
+    ahocorasick = None
+
+_COMBINING_MARKS = re.compile("[\u0300-\u036f]")
+
+def fold_keyword_text(text: str) -> str:
+    """Case-folds and strips accents ("Orçamento" -> "orcamento"); plain ASCII skips the Unicode work."""
+    if text.isascii():
+        return text.lower()
+    return _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text.casefold()))
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over accent-folded keywords from several languages.
+
+    One linear pass over the folded message finds every keyword occurrence. A match must
+    start at a word boundary, so "order" does not fire on "border", and may only be followed
+    by a word boundary or one of its languages' inflectional suffixes ("orders", "subscribed"),
+    so "demo" does not fire on "democracy". Keywords that fold to the same text
+    ("orçamento" / "orcamento") share a node.
+    """
+
+    def __init__(self, keywords_by_language: Dict[str, Iterable[str]], use_extension: bool = True, suffixes_by_language: Optional[Dict[str, Iterable[str]]] = None):
+        suffixes_by_language = suffixes_by_language or {}
+        self._patterns = []   # folded keyword text per pattern id
+        self._keywords = []   # first spelling seen, reported back to callers
+        self._languages = []  # languages each pattern belongs to
+        pattern_ids = {}
+        for lang, keywords in keywords_by_language.items():
+            for keyword in keywords:
+                folded = fold_keyword_text(keyword.strip())
+                if not folded:
+                    continue
+                if folded not in pattern_ids:
+                    pattern_ids[folded] = len(self._patterns)
+                    self._patterns.append(folded)
+                    self._keywords.append(keyword.strip())
+                    self._languages.append(set())
+                self._languages[pattern_ids[folded]].add(lang)
+        # Word endings allowed right after each pattern, from every language it belongs to
+        self._suffixes = [
+            frozenset(fold_keyword_text(suffix) for lang in languages for suffix in suffixes_by_language.get(lang, ()))
+            for languages in self._languages
+        ]
+
+        if use_extension and ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern_id, pattern in enumerate(self._patterns):
+                self._automaton.add_word(pattern, pattern_id)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build()
+
+    def _build(self):
+        goto = [{}]
+        output = [[]]
+        for pattern_id, pattern in enumerate(self._patterns):
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(pattern_id)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(ids) for ids in output]
+        # Characters outside every keyword always lead back to the root; only the keywords'
+        # own characters get transitions, so the cache below stays bounded on arbitrary input
+        self._alphabet = frozenset(ch for pattern in self._patterns for ch in pattern)
+        # Full transitions, filled in lazily per (state, keyword char) so scanning never walks fail links
+        self._delta = [dict(edges) for edges in goto]
+
+    def _step(self, state: int, ch: str) -> int:
+        origin = state
+        while state and ch not in self._goto[state]:
+            state = self._fail[state]
+        next_state = self._goto[state].get(ch, 0)
+        self._delta[origin][ch] = next_state
+        return next_state
+
+    def _occurrences(self, text: str):
+        """(end_index, pattern_id) for every occurrence in already-folded text."""
+        if self._automaton is not None:
+            return list(self._automaton.iter(text))
+
+        delta, output, step, alphabet = self._delta, self._output, self._step, self._alphabet
+        occurrences = []
+        state = 0
+        for index, ch in enumerate(text):
+            next_state = delta[state].get(ch)
+            if next_state is None:
+                state = step(state, ch) if ch in alphabet else 0
+            else:
+                state = next_state
+            if output[state]:
+                occurrences.extend((index, pattern_id) for pattern_id in output[state])
+        return occurrences
+
+    def find(self, text: str, languages: Optional[Iterable[str]] = None) -> List[str]:
+        """Keywords found in `text`, optionally restricted to the given languages, in match order."""
+        languages = set(languages) if languages is not None else None
+        folded = fold_keyword_text(text)
+        found = []
+        seen = set()
+        for end, pattern_id in self._occurrences(folded):
+            if pattern_id in seen:
+                continue
+            if languages is not None and not (self._languages[pattern_id] & languages):
+                continue
+            pattern = self._patterns[pattern_id]
+            start = end - len(pattern) + 1
+            if _is_word_char(pattern[0]) and start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            if _is_word_char(pattern[-1]) and not self._ends_word(folded, end + 1, pattern_id):
+                continue
+            seen.add(pattern_id)
+            found.append(self._keywords[pattern_id])
+        return found
+
+    def _ends_word(self, folded: str, index: int, pattern_id: int) -> bool:
+        """True when the rest of the word from `index` is empty or an allowed suffix."""
+        stop = index
+        while stop < len(folded) and _is_word_char(folded[stop]):
+            stop += 1
+        return stop == index or folded[index:stop] in self._suffixes[pattern_id]
+
+    def __len__(self):
+        return len(self._patterns)
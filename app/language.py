@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+from langdetect.detector_factory import PROFILES_DIRECTORY, DetectorFactory
+from langdetect.lang_detect_exception import LangDetectException
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("MedusaApp")
+
+DEFAULT_LANGUAGE = "en"
+# Languages the detector chooses between; prompts and lead keywords only exist for these
+LANGUAGE_CANDIDATES = [lang.strip() for lang in os.getenv("LANGUAGE_CANDIDATES", "en,pt").split(",") if lang.strip()]
+LANGUAGE_CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", 50000))
+LANGUAGE_DETECT_SEED = int(os.getenv("LANGUAGE_DETECT_SEED", 0))
+# Below this probability the message is too ambiguous to call and DEFAULT_LANGUAGE is used
+LANGUAGE_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_MIN_CONFIDENCE", 0.9))
+
+# Short messages langdetect routinely gets wrong ("Hello!" -> it, "oi" -> random)
+GREETINGS = {
+    "en": {
+        "hi", "hello", "hey", "hi there", "hello there", "good morning", "good afternoon", "good evening",
+        "thanks", "thank you", "thx", "ok", "okay", "yes", "yeah", "bye", "goodbye", "how are you",
+    },
+    "pt": {
+        "oi", "ola", "opa", "bom dia", "boa tarde", "boa noite", "obrigado", "obrigada", "valeu",
+        "tudo bem", "tudo bom", "sim", "nao", "tchau", "ate logo", "como vai",
+    },
+}
+_GREETING_LANGUAGE = {phrase: lang for lang, phrases in GREETINGS.items() for phrase in phrases}
+
+_factory = None
+_factory_lock = threading.Lock()
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in folded).split())
+
+def init_language_detection():
+    """Loads the language profiles once; called at startup so no request pays for it."""
+    global _factory
+    with _factory_lock:
+        if _factory is not None:
+            return
+        profiles = []
+        for lang in LANGUAGE_CANDIDATES:
+            with open(os.path.join(PROFILES_DIRECTORY, lang), encoding="utf-8") as profile:
+                profiles.append(profile.read())
+        factory = DetectorFactory()
+        factory.load_json_profile(profiles)
+        factory.set_seed(LANGUAGE_DETECT_SEED)
+        _factory = factory
+        logger.info(f"Language detection ready for: {', '.join(LANGUAGE_CANDIDATES)}")
+
+def greeting_language(text: str) -> Optional[str]:
+    return _GREETING_LANGUAGE.get(_fold(text))
+
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def _detect_cached(text: str) -> str:
+    if _factory is None:
+        init_language_detection()
+    detector = _factory.create()
+    detector.append(text)
+    try:
+        best = detector.get_probabilities()[0]
+    except (LangDetectException, IndexError):
+        return DEFAULT_LANGUAGE
+    return best.lang if best.prob >= LANGUAGE_MIN_CONFIDENCE else DEFAULT_LANGUAGE
+
+def language_of(text: str) -> str:
+    """
+    Deterministic language of a message, restricted to LANGUAGE_CANDIDATES.
+
+    Greetings are answered from a lookup table; everything else goes through a seeded
+    langdetect detector with only the candidate profiles loaded, memoized per text.
+    """
+    text = " ".join(text.split())
+    if not text:
+        return DEFAULT_LANGUAGE
+    return greeting_language(text) or _detect_cached(text)
+
+async def detect_language(text: str) -> str:
+    """Async variant: greetings stay on the event loop, real detection runs on the threadpool."""
+    return greeting_language(text) or await run_in_threadpool(language_of, text)
+
+def stats() -> dict:
+    info = _detect_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "candidates": LANGUAGE_CANDIDATES,
+        "cache_hits": info.hits,
+        "cache_misses": info.misses,
+        "cache_size": info.currsize,
+        "hit_ratio": info.hits / lookups if lookups else 0.0,
+    }
@@ -0,0 +1,64 @@
+import re
+from typing import List, NamedTuple
+
+from app.keyword_matcher import KeywordAutomaton
+
+ENGLISH_KEYWORDS = [
+    "demo", "pricing", "quote", "purchase", "subscribe", "interested", "get started", "how much?", "buy",
+    "callback", "contact me", "request a call", "schedule a meeting", "more info", "cost?", "billing", "sign up",
+    "enroll", "product details", "want to buy", "plans", "offer", "free trial", "get a call", "schedule consultation",
+    "customer service", "order", "register", "pricing details", "request info", "request quote", "service options",
+    "monthly plan", "yearly plan", "can I buy?", "partner with us", "special offer", "customer support", "get started",
+    "join now", "corporate deal", "group discount", "training session", "AI chatbot demo"
+]
+
+PORTUGUESE_KEYWORDS = [
+    "demonstração", "demonstracao", "preços", "precos", "orçamento", "orcamento", "comprar", "assinar", "interessado",
+    "começar", "comecar", "quanto custa?", "adquirir", "me ligue", "ligação", "ligacao", "entre em contato",
+    "agendar reunião", "agendar reuniao", "solicitar chamada", "solicitação", "solicitacao", "detalhes do produto",
+    "quero comprar", "planos", "oferta", "teste grátis", "teste gratis", "receber proposta", "solicitar orçamento",
+    "planos disponíveis", "planos disponiveis", "consultoria", "atendimento ao cliente", "assinatura", "serviço",
+    "servico", "cadastro", "plano mensal", "plano anual", "posso comprar?", "parceria", "suporte técnico",
+    "promoção especial", "desconto exclusivo", "desconto empresa", "suporte ao cliente", "treinamento de IA"
+]
+
+EMAIL_REGEX = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_REGEX = re.compile(r"\+?\d{9,15}")
+
+# Inflections a keyword may carry and still count ("orders", "subscribed", "orçamentos");
+# anything else glued to it ("democracy", "border") does not match
+ENGLISH_SUFFIXES = ["s", "es", "d", "ed", "ing", "er", "ers"]
+PORTUGUESE_SUFFIXES = ["s", "es"]
+
+# ✅ Both keyword lists compiled once into one accent-folded, word-boundary-aware automaton
+LEAD_KEYWORDS = KeywordAutomaton(
+    {"en": ENGLISH_KEYWORDS, "pt": PORTUGUESE_KEYWORDS},
+    suffixes_by_language={"en": ENGLISH_SUFFIXES, "pt": PORTUGUESE_SUFFIXES},
+)
+
+class LeadSignals(NamedTuple):
+    keywords: List[str]
+    has_email: bool
+    has_phone: bool
+
+    @property
+    def is_lead(self) -> bool:
+        return bool(self.keywords) or self.has_email or self.has_phone
+
+def lead_signals(user_message: str, lang: str, automaton: KeywordAutomaton = LEAD_KEYWORDS) -> LeadSignals:
+    """Which lead keywords (for the message language), email and phone number the message contains."""
+    return LeadSignals(
+        keywords=automaton.find(user_message, ("pt",) if lang == "pt" else ("en",)),
+        has_email="@" in user_message and EMAIL_REGEX.search(user_message) is not None,
+        has_phone=PHONE_REGEX.search(user_message) is not None,
+    )
+
+def lead_row(chatbot_id: int, user_message: str, lead_source: str = "Chatbot") -> dict:
+    """Column values for one chatbot_leads row, shared by single, batch and backfill inserts."""
+    return {
+        "chatbot_id": chatbot_id,
+        "user_id": "unknown",
+        "user_name": "Anonymous",
+        "lead_source": lead_source,
+        "message": user_message,
+    }
@@ -0,0 +1,152 @@
+import os
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+import openai
+
+from app.http_client import http_clients
+from app.message_metrics import MessageMetrics
+from app.observability import track_call
+from app.resilience import guarded
+from app.run_engine import RunCompletionEngine, TERMINAL_RUN_STATUSES
+
+logger = logging.getLogger("MedusaApp")
+
+ASSISTANT_ID = os.getenv("ASSISTANT_ID")
+# Streamed runs can go quiet for a while (tool calls, long first token), hence the longer read timeout
+OPENAI_READ_TIMEOUT_SECONDS = float(os.getenv("OPENAI_READ_TIMEOUT_SECONDS", 120))
+
+_async_client = None
+
+def get_async_openai():
+    """Returns the shared AsyncOpenAI client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        # The SDK keeps its own retries; the shared pool provides keep-alive, HTTP/2 and the limits
+        _async_client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=http_clients.get("openai", read_timeout=OPENAI_READ_TIMEOUT_SECONDS),
+        )
+    return _async_client
+
+# ✅ One scheduler task waits on every outstanding run instead of a poll loop per request
+run_engine = RunCompletionEngine(get_async_openai)
+
+def extract_text(message):
+    """Joins the text parts of an Assistants API message."""
+    return "".join(part.text.value for part in message.content if part.type == "text").strip()
+
+# ✅ Only errors showing OpenAI itself is struggling count against the shared "openai" circuit; a 4xx
+# (bad model, missing assistant, auth) or a run that ended badly for one bot's request does not
+OPENAI_PROVIDER_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError, openai.InternalServerError, TimeoutError)
+
+def is_provider_failure(error: BaseException) -> bool:
+    return isinstance(error, OPENAI_PROVIDER_ERRORS)
+
+# ✅ Every OpenAI call runs under the "openai" bulkhead, circuit breaker and timeout (app.resilience)
+@guarded("openai", is_provider_failure)
+async def create_thread() -> str:
+    with track_call("openai", "create_thread"):
+        thread = await get_async_openai().beta.threads.create()
+    return thread.id
+
+# ✅ Run one user message through the Medusa assistant without blocking the event loop
+@guarded("openai", is_provider_failure)
+async def generate_reply(system_instruction: str, user_message: str, thread_id: Optional[str] = None, metrics: Optional[MessageMetrics] = None, run_options: Optional[dict] = None, history: Optional[List[dict]] = None) -> str:
+    client = get_async_openai()
+
+    # Already inside the guard; the unwrapped call does not take a second bulkhead slot
+    thread_id = thread_id or await create_thread.__wrapped__()
+    with track_call("openai", "run"):
+        run = await client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=ASSISTANT_ID,
+            additional_instructions=system_instruction,
+            additional_messages=[*(history or []), {"role": "user", "content": user_message}],
+            **(run_options or {})
+        )
+        if run.status not in TERMINAL_RUN_STATUSES:
+            run = await run_engine.wait(thread_id, run.id)
+        if run.status == "requires_action":
+            # No tool outputs are submitted here; cancel so the run does not block the thread
+            await run_engine.cancel(thread_id, run.id)
+        if run.status != "completed":
+            raise RuntimeError(f"Assistant run {run.id} ended with status '{run.status}'")
+    if metrics is not None:
+        metrics.record_usage(run.usage)
+
+    with track_call("openai", "list_messages"):
+        messages = await client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id, order="desc", limit=1)
+    if not messages.data:
+        raise RuntimeError(f"Assistant run {run.id} returned no messages")
+    return extract_text(messages.data[0])
+
+RUN_FAILURE_EVENTS = {"thread.run.failed", "thread.run.cancelled", "thread.run.expired", "thread.run.incomplete"}
+
+# ✅ Stream the assistant's reply as text deltas while the run is still generating
+@guarded("openai", is_provider_failure)
+async def stream_reply(system_instruction: str, user_message: str, thread_id: Optional[str] = None, metrics: Optional[MessageMetrics] = None, run_options: Optional[dict] = None, history: Optional[List[dict]] = None) -> AsyncIterator[str]:
+    client = get_async_openai()
+
+    # Already inside the guard; the unwrapped call does not take a second bulkhead slot
+    thread_id = thread_id or await create_thread.__wrapped__()
+    with track_call("openai", "stream_run"):
+        stream = await client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=ASSISTANT_ID,
+            additional_instructions=system_instruction,
+            additional_messages=[*(history or []), {"role": "user", "content": user_message}],
+            stream=True,
+            **(run_options or {})
+        )
+        run_id = None
+        finished = False
+        try:
+            async with stream:
+                async for event in stream:
+                    if event.event == "thread.run.created":
+                        run_id = event.data.id
+                    elif event.event == "thread.message.delta":
+                        for part in event.data.delta.content or []:
+                            if part.type == "text" and part.text and part.text.value:
+                                yield part.text.value
+                    elif event.event == "thread.run.completed":
+                        finished = True
+                        if metrics is not None:
+                            metrics.record_usage(event.data.usage)
+                    elif event.event in RUN_FAILURE_EVENTS:
+                        finished = True
+                        raise RuntimeError(f"Assistant run {event.data.id} ended with status '{event.data.status}'")
+                    elif event.event == "thread.run.requires_action":
+                        raise RuntimeError(f"Assistant run {event.data.id} requires tool outputs, which are not supported")
+                    elif event.event == "error":
+                        raise RuntimeError(f"Assistant stream error: {event.data.message}")
+        finally:
+            # Abandoned (client gone, timeout), errored or waiting on tools: don't leave the run blocking the thread
+            if run_id is not None and not finished:
+                run_engine.cancel_in_background(thread_id, run_id)
+
+SUMMARY_INSTRUCTION = (
+    "You maintain a running summary of a customer conversation with a chatbot. Merge the new turns into the "
+    "current summary. Keep names, contact details, stated needs, preferences, open questions and commitments; "
+    "drop greetings and small talk. Write in the conversation's language, as compact notes."
+)
+
+# ✅ Fold older turns into the rolling summary with a plain chat completion (no thread, no assistant)
+@guarded("openai", is_provider_failure)
+async def summarize_turns(previous_summary: Optional[str], turns: List[Tuple[str, str]], model: str, max_tokens: int) -> str:
+    transcript = "\n".join(f"User: {user_message}\nAssistant: {bot_response}" for user_message, bot_response in turns)
+    with track_call("openai", "summarize"):
+        completion = await get_async_openai().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTION},
+                {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            max_tokens=max_tokens,
+            temperature=0,
+        )
+    summary = (completion.choices[0].message.content or "").strip()
+    if not summary:
+        raise RuntimeError("Summary completion returned no text")
+    return summary
@@ -51,11 +51,52 @@ if missing_vars:
 
 # ✅ Set up SQLAlchemy engine and session (Ensure metadata is created properly)
 from app.database import engine, SessionLocal, Base
+from app.language import init_language_detection
+from app.write_behind import WRITE_BEHIND_ENABLED, conversation_writer
+from app.partitions import partition_maintenance
+from app.analytics_rollup import analytics
+from app.database import all_pool_stats, async_engine, replica_engines, replica_router
+from app.observability import install_metrics, instrument_engine, stats_collector
+from app import language, resilience
+from app.llm_client import run_engine
+from app.response_cache import response_cache
+from app.semantic_cache import semantic_cache
+from app.thread_sessions import thread_sessions
+from app.history import conversation_history
+from app.summarizer import SUMMARY_ENABLED, conversation_summarizer
+from app.http_client import http_clients
+from app.chatbot_config import chatbot_configs
+from app.prompts import prompt_registry
+import asyncio
 
 @app.on_event("startup")
 def startup():
-    """Initialize database tables at startup."""
+    """Initialize database tables, language profiles and prompt templates at startup."""
     Base.metadata.create_all(bind=engine)
+    init_language_detection()
+    prompt_registry.refresh()
+
+@app.on_event("startup")
+async def start_background_workers():
+    """Start the conversation write-behind queue, the summarizer pool, the analytics rollup flusher and partition maintenance."""
+    if semantic_cache.enabled_chatbots:
+        # Loads the embedding model on the threadpool before the first chat message needs it
+        await semantic_cache.load()
+    if WRITE_BEHIND_ENABLED:
+        await conversation_writer.start()
+    if SUMMARY_ENABLED:
+        await conversation_summarizer.start()
+    await analytics.start()
+    app.state.partition_task = asyncio.create_task(partition_maintenance())
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """Flush buffered conversations and analytics before the worker exits."""
+    app.state.partition_task.cancel()
+    await conversation_summarizer.stop()
+    await conversation_writer.stop()
+    await analytics.stop()
+    await http_clients.aclose()
     
 # ✅ Include API routers
 app.include_router(chatbot_routes.router, tags=["Chatbots"])
@@ -81,6 +122,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Prometheus metrics: request latency per route, pool checkout waits, and every component's stats() at scrape time
+install_metrics(app)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine, "async")
+for index, replica in enumerate(replica_engines):
+    instrument_engine(replica, f"replica_{index}")
+stats_collector.add("websocket", lambda: {"connections": len(websockets.active_connections) + len(chatbot_routes.active_connections)})
+stats_collector.add("db_pool", all_pool_stats)
+stats_collector.add("db_routing", replica_router.stats)
+stats_collector.add("run_engine", run_engine.stats)
+stats_collector.add("response_cache", response_cache.stats)
+stats_collector.add("semantic_cache", semantic_cache.stats)
+stats_collector.add("language", language.stats)
+stats_collector.add("chatbot_config", chatbot_configs.stats)
+stats_collector.add("prompts", prompt_registry.stats)
+stats_collector.add("thread_sessions", thread_sessions.stats)
+stats_collector.add("history", conversation_history.stats)
+stats_collector.add("summarizer", conversation_summarizer.stats)
+stats_collector.add("http_client", http_clients.stats)
+stats_collector.add("resilience", resilience.stats)
+stats_collector.add("conversation_writer", conversation_writer.stats)
+stats_collector.add("analytics", analytics.stats)
+
 # ✅ Password hashing setup
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
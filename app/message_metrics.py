@@ -0,0 +1,49 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class MessageMetrics:
+    """
+    Timings and token usage of one chat message, filled in along the pipeline.
+
+    Fields stay None when a stage did not run (a cached reply never calls the LLM,
+    a caller-supplied language skips detection), so they never skew the averages.
+    """
+
+    __slots__ = ("language_ms", "llm_ms", "first_token_ms", "prompt_tokens", "completion_tokens", "db_write_ms")
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, None)
+
+    def record_usage(self, usage):
+        """Copies token counts from an OpenAI run's `usage`, which is None until the run completes."""
+        if usage is not None:
+            self.prompt_tokens = usage.prompt_tokens
+            self.completion_tokens = usage.completion_tokens
+
+    def increments(self) -> Dict[str, int]:
+        """Additive rollup counters for this message: each timing contributes a total and a sample."""
+        counters = {}
+        for field in ("language_ms", "llm_ms", "first_token_ms", "db_write_ms"):
+            value = getattr(self, field)
+            if value is not None:
+                prefix = field[:-3]
+                counters[f"{prefix}_ms_total"] = round(value)
+                counters[f"{prefix}_samples"] = 1
+        if self.prompt_tokens is not None:
+            counters["prompt_tokens"] = self.prompt_tokens
+            counters["completion_tokens"] = self.completion_tokens or 0
+        return counters
+
+@contextmanager
+def measure(metrics: Optional[MessageMetrics], field: str):
+    """Stores the elapsed milliseconds of the block on `metrics.<field>`; a no-op without metrics."""
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, field, (time.perf_counter() - started) * 1000)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -38,17 +38,83 @@ class ChatbotAnalytics(Base):
 
     chatbot = relationship("Chatbots", back_populates="analytics")
 
+# Pre-aggregated per-chatbot counters, one row per time bucket, upserted by app.analytics_rollup
+class ChatbotAnalyticsRollups(Base):
+    __tablename__ = "chatbot_analytics_rollups"
+    id = Column(Integer, primary_key=True)
+    chatbot_id = Column(Integer, ForeignKey("chatbots.id"), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    messages_processed = Column(Integer, nullable=False, default=0)
+    leads_detected = Column(Integer, nullable=False, default=0)
+    response_time_ms_total = Column(BigInteger, nullable=False, default=0)
+    response_time_samples = Column(Integer, nullable=False, default=0)
+    # Per-stage timings (total ms and sample count) and token usage of the messages in the bucket
+    language_ms_total = Column(BigInteger, nullable=False, default=0)
+    language_samples = Column(Integer, nullable=False, default=0)
+    llm_ms_total = Column(BigInteger, nullable=False, default=0)
+    llm_samples = Column(Integer, nullable=False, default=0)
+    first_token_ms_total = Column(BigInteger, nullable=False, default=0)
+    first_token_samples = Column(Integer, nullable=False, default=0)
+    db_write_ms_total = Column(BigInteger, nullable=False, default=0)
+    db_write_samples = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (UniqueConstraint("chatbot_id", "bucket_start", name="uq_chatbot_analytics_rollups_chatbot_bucket"),)
+
 class ChatbotConversations(Base):
     __tablename__ = "chatbot_conversations"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     chatbot_id = Column(Integer, ForeignKey("chatbots.id"), nullable=False)
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
     platform = Column(String, nullable=True)  # New field for platform (e.g., WhatsApp, Web)
+    user_id = Column(String, nullable=True)  # Session user for chat endpoints; NULL for anonymous and webhook traffic
     timestamp = Column(DateTime, default=func.now())
 
     chatbot = relationship("Chatbots", back_populates="conversations")
 
+    # ✅ Serves per-chatbot history pages newest-first (keyset on timestamp, id); PostgreSQL only because of NULLS LAST
+    __table_args__ = (
+        Index(
+            "ix_chatbot_conversations_chatbot_id_timestamp",
+            chatbot_id, timestamp.desc().nulls_last(), id.desc()
+        ).ddl_if(dialect="postgresql"),
+        # ✅ Loads the latest turns of one user's conversation for the history window
+        Index(
+            "ix_chatbot_conversations_chatbot_id_user_id",
+            chatbot_id, user_id, id.desc(),
+            postgresql_where=user_id.isnot(None)
+        ),
+    )
+
+# One persistent OpenAI thread per (chatbot, user) so follow-up messages keep their context
+class ChatbotThreadSessions(Base):
+    __tablename__ = "chatbot_thread_sessions"
+    id = Column(Integer, primary_key=True)
+    chatbot_id = Column(Integer, ForeignKey("chatbots.id"), nullable=False)
+    user_id = Column(String, nullable=False)
+    thread_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    last_used_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (UniqueConstraint("chatbot_id", "user_id", name="uq_chatbot_thread_sessions_chatbot_user"),)
+
+# Rolling summary of one user's older turns, maintained by app.summarizer
+class ChatbotConversationSummaries(Base):
+    __tablename__ = "chatbot_conversation_summaries"
+    id = Column(Integer, primary_key=True)
+    chatbot_id = Column(Integer, ForeignKey("chatbots.id"), nullable=False)
+    user_id = Column(String, nullable=False)
+    summary = Column(Text, nullable=False)
+    # Highest chatbot_conversations.id folded into the summary; later turns are sent verbatim
+    through_conversation_id = Column(Integer, nullable=False)
+    turns_summarized = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (UniqueConstraint("chatbot_id", "user_id", name="uq_chatbot_conversation_summaries_chatbot_user"),)
+
 class ChatbotLeads(Base):
     __tablename__ = "chatbot_leads"
     id = Column(Integer, primary_key=True, index=True)
@@ -60,6 +126,8 @@ class ChatbotLeads(Base):
 
     chatbot = relationship("Chatbots", back_populates="leads")
 
+    __table_args__ = (Index("ix_chatbot_leads_chatbot_id", chatbot_id),)
+
 # Define relationships
 Chatbots.analytics = relationship("ChatbotAnalytics", back_populates="chatbot")
 Chatbots.conversations = relationship("ChatbotConversations", back_populates="chatbot")
@@ -0,0 +1,175 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+from sqlalchemy import event
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:  # ✅ Metrics are optional; without prometheus_client the app simply runs uninstrumented
+    REGISTRY = None
+
+logger = logging.getLogger("MedusaApp")
+
+METRICS_AVAILABLE = REGISTRY is not None
+
+if METRICS_AVAILABLE:
+    HTTP_REQUEST_SECONDS = Histogram(
+        "medusa_http_request_duration_seconds", "HTTP request latency by route template",
+        ["method", "route", "status"],
+    )
+    HTTP_IN_PROGRESS = Gauge("medusa_http_requests_in_progress", "HTTP requests currently being served", ["method"])
+    DB_POOL_WAIT_SECONDS = Histogram(
+        "medusa_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection",
+        ["engine"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+    OUTBOUND_CALL_SECONDS = Histogram(
+        "medusa_outbound_call_duration_seconds", "Latency of calls to external services (OpenAI, Agentive)",
+        ["service", "operation", "outcome"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+    )
+    CIRCUIT_STATE = Gauge("medusa_circuit_state", "Circuit breaker state per provider (0 closed, 1 half-open, 2 open)", ["service"])
+    CIRCUIT_TRANSITIONS = Counter("medusa_circuit_transitions_total", "Circuit breaker state changes", ["service", "from_state", "to_state"])
+    PROVIDER_REJECTIONS = Counter(
+        "medusa_provider_rejections_total", "Calls refused without reaching the provider (open circuit, full bulkhead)",
+        ["service", "reason"],
+    )
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+def record_circuit_transition(service: str, from_state: str, to_state: str):
+    logger.warning(f"Circuit for {service} changed from {from_state} to {to_state}")
+    if METRICS_AVAILABLE:
+        CIRCUIT_STATE.labels(service).set(CIRCUIT_STATE_VALUES[to_state])
+        CIRCUIT_TRANSITIONS.labels(service, from_state, to_state).inc()
+
+def record_rejection(service: str, reason: str):
+    if METRICS_AVAILABLE:
+        PROVIDER_REJECTIONS.labels(service, reason).inc()
+
+# ✅ Time one outbound call; the outcome label separates successes, errors and abandoned streams
+@contextmanager
+def track_call(service: str, operation: str):
+    if not METRICS_AVAILABLE:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except Exception:
+        raise
+    except BaseException:
+        # GeneratorExit / CancelledError: the client went away before the call finished
+        outcome = "cancelled"
+        raise
+    finally:
+        OUTBOUND_CALL_SECONDS.labels(service, operation, outcome).observe(time.perf_counter() - started)
+
+def instrument_engine(engine, name: str):
+    """
+    Records how long Pool.connect() waits for a connection (pool exhaustion shows up here first).
+
+    Accepts sync and async engines; the timer is re-applied to the fresh pool after dispose().
+    """
+    if not METRICS_AVAILABLE:
+        return
+    sync_engine = getattr(engine, "sync_engine", engine)
+    histogram = DB_POOL_WAIT_SECONDS.labels(name)
+
+    def wrap(pool):
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        pool.connect = timed_connect
+
+    wrap(sync_engine.pool)
+    event.listen(sync_engine, "engine_disposed", lambda disposed: wrap(disposed.pool))
+
+class StatsCollector:
+    """
+    Exposes the stats() dicts the components already keep as gauges, read at scrape time.
+
+    Nested dicts are flattened with underscores, booleans become 0/1 and non-numeric values
+    are skipped, so e.g. response_cache.stats()["local"]["hit_ratio"] becomes
+    medusa_response_cache_local_hit_ratio.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], dict]] = {}
+
+    def add(self, name: str, stats: Callable[[], dict]):
+        self._sources[name] = stats
+
+    def collect(self):
+        for name, stats in self._sources.items():
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"Metrics source '{name}' failed: {str(e)}")
+                continue
+            for key, value in flatten(values):
+                gauge = GaugeMetricFamily(f"medusa_{name}_{key}", f"{name} {key.replace('_', ' ')}")
+                gauge.add_metric([], value)
+                yield gauge
+
+def flatten(values: dict, prefix: str = ""):
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (bool, int, float)):
+            yield f"{prefix}{key}", float(value)
+
+stats_collector = StatsCollector()
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware (no response buffering, so streaming endpoints are timed to their last byte)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_PROGRESS.labels(method).dec()
+            # The router stores the matched route on the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(method, getattr(route, "path", "unmatched"), str(status)).observe(time.perf_counter() - started)
+
+def install_metrics(app):
+    """Adds the request middleware, the scrape-time stats collector and GET /metrics."""
+    if not METRICS_AVAILABLE:
+        logger.warning("prometheus_client is not installed; /metrics is disabled")
+        return
+    from starlette.responses import Response
+
+    app.add_middleware(PrometheusMiddleware)
+    REGISTRY.register(stats_collector)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
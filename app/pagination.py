@@ -0,0 +1,68 @@
+import base64
+import datetime
+import json
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import ChatbotConversations
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(timestamp: Optional[datetime.datetime], row_id: int) -> str:
+    """Opaque token for the last row of a page: its (timestamp, id) keyset position."""
+    raw = json.dumps({"t": timestamp.isoformat() if timestamp else None, "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime.datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        timestamp = datetime.datetime.fromisoformat(position["t"]) if position["t"] else None
+        return timestamp, int(position["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def conversation_page(db: Session, chatbot_id: int, limit: int, cursor: Optional[Tuple[Optional[datetime.datetime], int]] = None) -> list:
+    """
+    Up to limit + 1 rows after the cursor in (timestamp DESC NULLS LAST, id DESC) order.
+
+    Dated rows and legacy rows with a NULL timestamp are read in two phases, each one index
+    range scan on (chatbot_id, timestamp DESC, id DESC): the NULL tail is only read once the
+    dated rows run out. A single OR across both would make PostgreSQL walk from the newest row.
+    """
+    ts, pk = ChatbotConversations.timestamp, ChatbotConversations.id
+    base = (
+        select(ChatbotConversations)
+        .where(ChatbotConversations.chatbot_id == chatbot_id)
+        .order_by(ts.desc().nulls_last(), pk.desc())
+    )
+    timestamp, row_id = cursor if cursor else (None, None)
+
+    rows = []
+    if cursor is None or timestamp is not None:
+        dated = base.where(ts.isnot(None)).limit(limit + 1)
+        if cursor:
+            # Row-value comparison, so the cursor bounds the range scan instead of filtering it
+            dated = dated.where(tuple_(ts, pk) < tuple_(timestamp, row_id))
+        rows = db.execute(dated).scalars().all()
+        if len(rows) > limit:
+            return rows
+
+    undated = base.where(ts.is_(None)).limit(limit + 1 - len(rows))
+    if cursor and timestamp is None:
+        undated = undated.where(pk < row_id)
+    return rows + db.execute(undated).scalars().all()
+
+def conversation_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "chatbot_id": row.chatbot_id,
+        "user_message": row.user_message,
+        "bot_response": row.bot_response,
+        "platform": row.platform,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+    }
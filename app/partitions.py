@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+import logging
+import os
+from typing import List, Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import engine
+
+logger = logging.getLogger("MedusaApp")
+
+CONVERSATIONS_TABLE = "chatbot_conversations"
+# Monthly partitions kept ready beyond the current month
+CONVERSATION_PARTITION_MONTHS_AHEAD = int(os.getenv("CONVERSATION_PARTITION_MONTHS_AHEAD", 3))
+CONVERSATION_PARTITION_CHECK_SECONDS = int(os.getenv("CONVERSATION_PARTITION_CHECK_SECONDS", 12 * 3600))
+
+def month_start(day: datetime.date) -> datetime.date:
+    return datetime.date(day.year, day.month, 1)
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime.date) -> str:
+    return f"{CONVERSATIONS_TABLE}_p{month:%Y%m}"
+
+def create_partition_sql(month: datetime.date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {CONVERSATIONS_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+    ), {"table": CONVERSATIONS_TABLE}).scalar())
+
+def ensure_conversation_partitions(bind=engine, months_ahead: int = CONVERSATION_PARTITION_MONTHS_AHEAD, today: Optional[datetime.date] = None) -> List[str]:
+    """
+    Creates any missing monthly partitions from the current month to `months_ahead` months out.
+
+    A no-op unless chatbot_conversations was converted to a partitioned table by the
+    optional partitioning migration. Returns the names of the partitions it created.
+    """
+    if bind.dialect.name != "postgresql":
+        return []
+    current = month_start(today or datetime.datetime.utcnow().date())
+    created = []
+    with bind.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(month)
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+                conn.execute(text(create_partition_sql(month)))
+                created.append(name)
+    if created:
+        logger.info(f"✅ Created conversation partitions: {', '.join(created)}")
+    return created
+
+async def partition_maintenance(interval: float = CONVERSATION_PARTITION_CHECK_SECONDS):
+    """Background loop so long-running workers keep creating partitions ahead of time."""
+    while True:
+        try:
+            await run_in_threadpool(ensure_conversation_partitions)
+        except Exception as e:
+            # Rows still land in the default partition, so this is worth a warning but not a crash
+            logger.warning(f"Conversation partition maintenance failed: {str(e)}")
+        await asyncio.sleep(interval)
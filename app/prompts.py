@@ -0,0 +1,130 @@
+import glob
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, NamedTuple, Tuple
+
+from app.chatbot_config import ChatbotConfig
+from app.language import DEFAULT_LANGUAGE
+
+logger = logging.getLogger("MedusaApp")
+
+# One "<name>.<language>.txt" file per persona and language
+PROMPT_TEMPLATE_DIR = os.getenv("PROMPT_TEMPLATE_DIR", os.path.join(os.path.dirname(__file__), "prompt_templates"))
+PROMPT_TEMPLATE_NAME = os.getenv("PROMPT_TEMPLATE_NAME", "medusa")
+# How often the template files are stat()ed for changes (0 disables hot reload)
+PROMPT_RELOAD_SECONDS = float(os.getenv("PROMPT_RELOAD_SECONDS", 5))
+
+def fingerprint(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def load_templates(template_dir: str = PROMPT_TEMPLATE_DIR, name: str = PROMPT_TEMPLATE_NAME) -> Dict[str, str]:
+    """{language: template text} for every <name>.<language>.txt in `template_dir`."""
+    templates = {}
+    for path in sorted(glob.glob(os.path.join(template_dir, f"{name}.*.txt"))):
+        language = os.path.basename(path)[len(name) + 1:-len(".txt")]
+        with open(path, encoding="utf-8") as f:
+            templates[language] = f.read().rstrip("\n")
+    return templates
+
+class CompiledPrompt(NamedTuple):
+    text: str
+    # Hash of everything that shapes the reply besides the message: prompt text, model and tools
+    fingerprint: str
+    # Language-independent hash of the bot's config and the template set; changes on any edit
+    revision: str
+
+class PromptRegistry:
+    """
+    Compiled system instructions per (chatbot, language).
+
+    Each prompt is assembled and hashed once, when a chatbot config snapshot is first seen
+    (so a config change recompiles on the next message); lookups are dict reads. Template
+    files are re-read when their mtimes change, which drops every compiled prompt.
+    """
+
+    def __init__(self, template_dir: str = PROMPT_TEMPLATE_DIR, name: str = PROMPT_TEMPLATE_NAME, reload_seconds: float = PROMPT_RELOAD_SECONDS):
+        self.template_dir = template_dir
+        self.name = name
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._templates: Dict[str, str] = {}
+        self._templates_version = ""
+        self._mtimes: Tuple = ()
+        self._checked_at = float("-inf")
+        self._compiled: Dict[int, Tuple[ChatbotConfig, Dict[str, CompiledPrompt]]] = {}
+        self.compilations = 0
+        self.reloads = 0
+
+    def _template_mtimes(self) -> Tuple:
+        paths = sorted(glob.glob(os.path.join(self.template_dir, f"{self.name}.*.txt")))
+        return tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+
+    def reload(self):
+        templates = load_templates(self.template_dir, self.name)
+        if DEFAULT_LANGUAGE not in templates:
+            raise RuntimeError(f"No '{DEFAULT_LANGUAGE}' prompt template in {self.template_dir}")
+        with self._lock:
+            self._templates = templates
+            self._templates_version = fingerprint(*(f"{lang}\x1e{text}" for lang, text in sorted(templates.items())))
+            self._compiled = {}
+            self.reloads += 1
+        logger.info(f"✅ Loaded prompt templates for: {', '.join(sorted(templates))}")
+
+    def refresh(self):
+        """Loads the templates on first use and re-reads them when a file changed (checked every reload_seconds)."""
+        now = time.monotonic()
+        if self._templates and (self.reload_seconds <= 0 or now - self._checked_at < self.reload_seconds):
+            return
+        self._checked_at = now
+        try:
+            mtimes = self._template_mtimes()
+            if mtimes != self._mtimes or not self._templates:
+                self.reload()
+                self._mtimes = mtimes
+        except (OSError, RuntimeError) as e:
+            if not self._templates:
+                raise
+            # A half-written template must not take the chat endpoints down; keep serving the last good set
+            logger.warning(f"Prompt template reload failed, keeping the previous templates: {str(e)}")
+
+    def template(self, language: str) -> str:
+        self.refresh()
+        return self._templates.get(language) or self._templates[DEFAULT_LANGUAGE]
+
+    def compiled(self, config: ChatbotConfig, language: str) -> CompiledPrompt:
+        """The system instruction for one bot and language; a dict lookup once compiled."""
+        self.refresh()
+        entry = self._compiled.get(config.id)
+        if entry is not None and (entry[0] is config or entry[0] == config):
+            prompt = entry[1].get(language)
+            if prompt is not None:
+                return prompt
+        return self._compile(config, language)
+
+    def _compile(self, config: ChatbotConfig, language: str) -> CompiledPrompt:
+        with self._lock:
+            entry = self._compiled.get(config.id)
+            if entry is None or entry[0] != config:
+                entry = self._compiled[config.id] = (config, {})
+            template = self._templates.get(language) or self._templates[DEFAULT_LANGUAGE]
+            text = sys.intern(f"{template}\n\n{config.prompt}" if config.prompt else template)
+            revision = fingerprint(self._templates_version, config.prompt or "", config.model or "", *config.tools)
+            prompt = CompiledPrompt(text, fingerprint(text, config.model or "", *config.tools), revision)
+            entry[1][language] = prompt
+            self.compilations += 1
+        return prompt
+
+    def stats(self) -> dict:
+        return {
+            "languages": sorted(self._templates),
+            "templates_version": self._templates_version,
+            "compiled_chatbots": len(self._compiled),
+            "compilations": self.compilations,
+            "reloads": self.reloads,
+        }
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,311 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+from app.observability import CIRCUIT_STATE_VALUES, record_circuit_transition, record_rejection
+
+logger = logging.getLogger("MedusaApp")
+
+# Defaults for every provider; any of them can be overridden per provider with a suffix,
+# e.g. RESILIENCE_MAX_CONCURRENCY_AGENTIVE=20 or LLM_FALLBACK_RESPONSE_OPENAI="..."
+RESILIENCE_MAX_CONCURRENCY = int(os.getenv("RESILIENCE_MAX_CONCURRENCY", 100))
+# How long a call may wait for a free slot before it is refused
+RESILIENCE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("RESILIENCE_QUEUE_TIMEOUT_SECONDS", 1))
+# Whole call (non-streaming) or time to first token (streaming)
+RESILIENCE_TIMEOUT_SECONDS = float(os.getenv("RESILIENCE_TIMEOUT_SECONDS", 60))
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", 30))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 10))
+BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", 0.5))
+# Calls slower than this count as slow; the circuit also opens when too many are
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", 20))
+BREAKER_SLOW_CALL_RATIO = float(os.getenv("BREAKER_SLOW_CALL_RATIO", 0.8))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+# Trial calls let through while half-open; all must succeed to close the circuit
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", 3))
+# Reply sent instead of an error while a provider is unavailable; empty means respond 503
+LLM_FALLBACK_RESPONSE = os.getenv("LLM_FALLBACK_RESPONSE", "")
+
+def setting(name: str, service: str, default, cast=str):
+    """The per-provider override of a setting (e.g. BREAKER_OPEN_SECONDS_OPENAI), else the default."""
+    return cast(os.getenv(f"{name}_{service.upper()}", default))
+
+class ProviderUnavailable(Exception):
+    """A call was refused or abandoned without a usable answer from the provider."""
+
+    def __init__(self, service: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{service} is unavailable ({reason})")
+        self.service = service
+        self.reason = reason
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Closed -> open when, over the last window_seconds (and at least min_calls calls), the
+    share of failed or of slow calls reaches its ratio. Open refuses calls for
+    open_seconds, then half-open lets half_open_calls trial calls through: any failure
+    re-opens the circuit, all of them succeeding closes it.
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self.window_seconds = setting("BREAKER_WINDOW_SECONDS", service, BREAKER_WINDOW_SECONDS, float)
+        self.min_calls = setting("BREAKER_MIN_CALLS", service, BREAKER_MIN_CALLS, int)
+        self.failure_ratio = setting("BREAKER_FAILURE_RATIO", service, BREAKER_FAILURE_RATIO, float)
+        self.slow_call_seconds = setting("BREAKER_SLOW_CALL_SECONDS", service, BREAKER_SLOW_CALL_SECONDS, float)
+        self.slow_call_ratio = setting("BREAKER_SLOW_CALL_RATIO", service, BREAKER_SLOW_CALL_RATIO, float)
+        self.open_seconds = setting("BREAKER_OPEN_SECONDS", service, BREAKER_OPEN_SECONDS, float)
+        self.half_open_calls = setting("BREAKER_HALF_OPEN_CALLS", service, BREAKER_HALF_OPEN_CALLS, int)
+        self.state = "closed"
+        # (finished_at, failed, slow) of the calls in the window, with running totals
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        self.transitions = 0
+
+    def _transition(self, state: str):
+        record_circuit_transition(self.service, self.state, state)
+        self.state = state
+        self.transitions += 1
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._failures = self._slow = 0
+        self._transition("open")
+
+    def allow(self):
+        """Claims permission for one call; raises ProviderUnavailable while the circuit is open."""
+        if self.state == "open":
+            remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise ProviderUnavailable(self.service, "circuit open", remaining)
+            self._trials = self._trial_successes = 0
+            self._transition("half_open")
+        if self.state == "half_open":
+            if self._trials >= self.half_open_calls:
+                raise ProviderUnavailable(self.service, "circuit half-open", self.open_seconds)
+            self._trials += 1
+
+    def abandon(self):
+        """Returns the permission of a call that ended without an outcome (e.g. the client went away)."""
+        if self.state == "half_open" and self._trials > self._trial_successes:
+            self._trials -= 1
+
+    def record(self, failed: bool, seconds: float):
+        slow = seconds >= self.slow_call_seconds
+        if self.state == "half_open":
+            if failed or slow:
+                self._open()
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_calls:
+                self._transition("closed")
+            return
+        if self.state == "open":
+            # Finished after the circuit opened; already accounted for
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, failed, slow))
+        self._failures += failed
+        self._slow += slow
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            _, old_failed, old_slow = self._outcomes.popleft()
+            self._failures -= old_failed
+            self._slow -= old_slow
+
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and (self._failures >= self.failure_ratio * calls or self._slow >= self.slow_call_ratio * calls):
+            self._open()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "state_value": CIRCUIT_STATE_VALUES[self.state],
+            "window_calls": len(self._outcomes),
+            "window_failures": self._failures,
+            "window_slow": self._slow,
+            "transitions": self.transitions,
+        }
+
+class Bulkhead:
+    """Caps concurrent calls to one provider so a slow provider cannot tie up every request."""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.limit = setting("RESILIENCE_MAX_CONCURRENCY", service, RESILIENCE_MAX_CONCURRENCY, int)
+        self.queue_timeout = setting("RESILIENCE_QUEUE_TIMEOUT_SECONDS", service, RESILIENCE_QUEUE_TIMEOUT_SECONDS, float)
+        # Created on first use so it binds to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        try:
+            if self._semaphore.locked() and self.queue_timeout <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ProviderUnavailable(self.service, "bulkhead full", self.queue_timeout) from None
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+def every_error(error: BaseException) -> bool:
+    return True
+
+class ProviderGuard:
+    """
+    Bulkhead, circuit breaker and timeout around every call to one provider.
+
+    Timeouts always count against the circuit; other exceptions only when is_failure(error)
+    says the provider is at fault. The rest (e.g. a 400 for one bot's bad request) propagate
+    without affecting the circuit, so one misconfigured caller cannot open it for everyone.
+    """
+
+    def __init__(self, service: str, is_failure: Callable[[BaseException], bool] = every_error):
+        self.service = service
+        self.is_failure = is_failure
+        self.timeout = setting("RESILIENCE_TIMEOUT_SECONDS", service, RESILIENCE_TIMEOUT_SECONDS, float)
+        self.fallback = setting("LLM_FALLBACK_RESPONSE", service, LLM_FALLBACK_RESPONSE)
+        self.bulkhead = Bulkhead(service)
+        self.breaker = CircuitBreaker(service)
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.caller_errors = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        try:
+            self.breaker.allow()
+            try:
+                await self.bulkhead.acquire()
+            except ProviderUnavailable:
+                self.breaker.abandon()
+                raise
+        except ProviderUnavailable as e:
+            self.rejected += 1
+            record_rejection(self.service, e.reason)
+            raise
+        self.calls += 1
+        try:
+            yield
+        finally:
+            self.bulkhead.release()
+
+    def _failed(self, started: float, timed_out: bool = False):
+        self.failures += 1
+        self.timeouts += timed_out
+        self.breaker.record(True, time.monotonic() - started)
+
+    def _errored(self, started: float, error: Exception):
+        if self.is_failure(error):
+            self._failed(started)
+        else:
+            self.caller_errors += 1
+            self.breaker.abandon()
+
+    async def run(self, call, *args, **kwargs):
+        """Awaits call(*args, **kwargs) under the guard; a timeout surfaces as ProviderUnavailable."""
+        async with self._slot():
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(call(*args, **kwargs), self.timeout)
+            except asyncio.TimeoutError:
+                self._failed(started, timed_out=True)
+                raise ProviderUnavailable(self.service, "timeout", self.timeout) from None
+            except Exception as e:
+                self._errored(started, e)
+                raise
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            self.breaker.record(False, time.monotonic() - started)
+            return result
+
+    async def stream(self, call, *args, **kwargs) -> AsyncIterator:
+        """Iterates the async generator call(*args, **kwargs) under the guard; the timeout and latency apply to the first item."""
+        async with self._slot():
+            started = time.monotonic()
+            first_item_seconds = None
+            items = call(*args, **kwargs)
+            try:
+                while True:
+                    try:
+                        if first_item_seconds is None:
+                            item = await asyncio.wait_for(items.__anext__(), self.timeout)
+                            first_item_seconds = time.monotonic() - started
+                        else:
+                            item = await items.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    yield item
+            except asyncio.TimeoutError:
+                self._failed(started, timed_out=True)
+                raise ProviderUnavailable(self.service, "timeout", self.timeout) from None
+            except Exception as e:
+                self._errored(started, e)
+                raise
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            finally:
+                await items.aclose()
+            self.breaker.record(False, first_item_seconds if first_item_seconds is not None else time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "caller_errors": self.caller_errors,
+            "rejected": self.rejected,
+            "in_flight": self.bulkhead.in_flight,
+            "max_concurrency": self.bulkhead.limit,
+            "circuit": self.breaker.stats(),
+        }
+
+provider_guards: Dict[str, ProviderGuard] = {}
+
+def guard_for(service: str, is_failure: Optional[Callable[[BaseException], bool]] = None) -> ProviderGuard:
+    guard = provider_guards.get(service)
+    if guard is None:
+        guard = provider_guards[service] = ProviderGuard(service)
+    if is_failure is not None:
+        guard.is_failure = is_failure
+    return guard
+
+def stats() -> dict:
+    return {service: guard.stats() for service, guard in provider_guards.items()}
+
+def guarded(service: str, is_failure: Optional[Callable[[BaseException], bool]] = None):
+    """Decorator running a coroutine function (or async generator function) under the provider's guard."""
+    guard = guard_for(service, is_failure)
+
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            def stream_wrapper(*args, **kwargs):
+                return guard.stream(fn, *args, **kwargs)
+            return stream_wrapper
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await guard.run(fn, *args, **kwargs)
+        return wrapper
+
+    return decorate
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+import re
+from typing import Optional
+
+from app.cache import TTLCache
+
+logger = logging.getLogger("MedusaApp")
+
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 5000))
+# Comma-separated chatbot ids that opted in, or "*" for every chatbot. Empty disables the cache.
+RESPONSE_CACHE_CHATBOTS = os.getenv("RESPONSE_CACHE_CHATBOTS", "")
+# Optional shared backend (e.g. redis://localhost:6379/0) so all workers share hits
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s!?.,;:]+$")
+
+def normalize_message(user_message: str) -> str:
+    """Case-folds and collapses whitespace so "Hello!" and " hello " share one entry."""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", user_message.casefold()).strip())
+
+def parse_enabled_chatbots(value: str):
+    value = value.strip()
+    if value == "*":
+        return "*"
+    return {int(part) for part in value.split(",") if part.strip()}
+
+class ResponseCache:
+    """
+    Exact-match cache of bot replies in front of the LLM call.
+
+    Entries live in an in-process LRU with TTL and, when a shared backend is
+    configured, in Redis as well so every worker benefits from each other's misses.
+    Only chatbots listed in RESPONSE_CACHE_CHATBOTS are cached.
+    """
+
+    def __init__(self, enabled_chatbots=None, maxsize: int = RESPONSE_CACHE_SIZE, ttl: int = RESPONSE_CACHE_TTL_SECONDS, redis_url: Optional[str] = RESPONSE_CACHE_REDIS_URL):
+        self.enabled_chatbots = parse_enabled_chatbots(RESPONSE_CACHE_CHATBOTS) if enabled_chatbots is None else enabled_chatbots
+        self.ttl = ttl
+        self._local = TTLCache(maxsize, ttl)
+        self._shared = None
+        if redis_url:
+            try:
+                import redis.asyncio as redis
+                self._shared = redis.from_url(redis_url)
+            except ImportError:
+                logger.warning("RESPONSE_CACHE_REDIS_URL is set but the redis package is not installed; using the local cache only.")
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def enabled_for(self, chatbot_id: int) -> bool:
+        return self.enabled_chatbots == "*" or chatbot_id in self.enabled_chatbots
+
+    def key_for(self, chatbot_id: int, user_message: str, language: str, prompt_fingerprint: str) -> str:
+        raw = f"{chatbot_id}\x1f{normalize_message(user_message)}\x1f{language}\x1f{prompt_fingerprint}"
+        return "medusa:reply:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self._shared is not None:
+            try:
+                shared_value = await self._shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared response cache lookup failed: {str(e)}")
+                shared_value = None
+            if shared_value is not None:
+                value = shared_value.decode("utf-8")
+                self._local.set(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, bot_response: str):
+        if not bot_response:
+            return
+        self._local.set(key, bot_response)
+        if self._shared is not None:
+            try:
+                await self._shared.set(key, bot_response.encode("utf-8"), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Shared response cache write failed: {str(e)}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "local": self._local.stats(),
+            "shared_backend": self._shared is not None,
+        }
+
+response_cache = ResponseCache()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+from typing import Callable
+
+logger = logging.getLogger("MedusaApp")
+
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete", "requires_action"}
+
+RUN_POLL_INITIAL_SECONDS = float(os.getenv("RUN_POLL_INITIAL_SECONDS", 0.5))
+RUN_POLL_MIN_SECONDS = float(os.getenv("RUN_POLL_MIN_SECONDS", 0.1))
+RUN_POLL_MAX_SECONDS = float(os.getenv("RUN_POLL_MAX_SECONDS", 2.0))
+RUN_POLL_BACKOFF = float(os.getenv("RUN_POLL_BACKOFF", 1.5))
+RUN_TIMEOUT_SECONDS = float(os.getenv("RUN_TIMEOUT_SECONDS", 120))
+
+class _PendingRun:
+    __slots__ = ("thread_id", "run_id", "future", "started_at", "next_poll_at", "interval", "polls")
+
+    def __init__(self, thread_id, run_id, future, started_at, first_poll_at):
+        self.thread_id = thread_id
+        self.run_id = run_id
+        self.future = future
+        self.started_at = started_at
+        self.next_poll_at = first_poll_at
+        self.interval = RUN_POLL_MIN_SECONDS
+        self.polls = 0
+
+class RunCompletionEngine:
+    """
+    Waits for Assistants runs to reach a terminal status.
+
+    All outstanding runs are tracked by one scheduler task: it sleeps until the
+    earliest run is due, retrieves every due run concurrently, and resolves the
+    waiters whose run finished. The first poll is scheduled from a moving average of
+    recent run durations, so most runs are already done when they are first checked;
+    after that each run backs off geometrically up to RUN_POLL_MAX_SECONDS.
+    """
+
+    def __init__(self, client_factory: Callable):
+        self._client_factory = client_factory
+        self._pending = {}
+        self._task = None
+        self._wakeup = None
+        self._expected_duration = RUN_POLL_INITIAL_SECONDS
+        self.polls = 0
+        self.wasted_polls = 0
+        self.poll_errors = 0
+        self.runs_completed = 0
+        self.runs_failed = 0
+        self.runs_timed_out = 0
+        self.runs_cancelled = 0
+        self._cancellations = set()
+
+    async def wait(self, thread_id: str, run_id: str, timeout: float = RUN_TIMEOUT_SECONDS):
+        """Returns the run object once it reaches a terminal status."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        now = loop.time()
+        pending = _PendingRun(thread_id, run_id, future, now, now + max(RUN_POLL_MIN_SECONDS, 0.8 * self._expected_duration))
+        self._pending[run_id] = pending
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._scheduler())
+        self._wakeup.set()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.runs_timed_out += 1
+            # An active run blocks the (reused) thread until OpenAI expires it
+            await self.cancel(thread_id, run_id)
+            raise TimeoutError(f"Assistant run {run_id} did not finish within {timeout:.0f}s")
+        except asyncio.CancelledError:
+            # The caller gave up (client gone, resilience timeout); this task can no longer await
+            self.cancel_in_background(thread_id, run_id)
+            raise
+        finally:
+            self._pending.pop(run_id, None)
+
+    async def cancel(self, thread_id: str, run_id: str):
+        """Best-effort cancel of a run nobody waits for any more, so its thread takes new runs again."""
+        try:
+            await self._client_factory().beta.threads.runs.cancel(run_id=run_id, thread_id=thread_id)
+            self.runs_cancelled += 1
+        except Exception as e:
+            # Most often the run finished in the meantime
+            logger.warning(f"Cancelling run {run_id} failed: {str(e)}")
+
+    def cancel_in_background(self, thread_id: str, run_id: str):
+        task = asyncio.get_running_loop().create_task(self.cancel(thread_id, run_id))
+        self._cancellations.add(task)
+        task.add_done_callback(self._cancellations.discard)
+
+    async def _scheduler(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            now = loop.time()
+            due = [p for p in self._pending.values() if p.next_poll_at <= now and not p.future.done()]
+            if due:
+                await asyncio.gather(*(self._poll(p) for p in due))
+                continue
+
+            self._wakeup.clear()
+            next_poll_at = min(p.next_poll_at for p in self._pending.values())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, next_poll_at - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, pending: _PendingRun):
+        loop = asyncio.get_running_loop()
+        self.polls += 1
+        pending.polls += 1
+        try:
+            run = await self._client_factory().beta.threads.runs.retrieve(run_id=pending.run_id, thread_id=pending.thread_id)
+        except Exception as e:
+            self.poll_errors += 1
+            logger.warning(f"Polling run {pending.run_id} failed: {str(e)}")
+            self._reschedule(pending, loop.time())
+            return
+
+        if run.status not in TERMINAL_RUN_STATUSES:
+            self.wasted_polls += 1
+            self._reschedule(pending, loop.time())
+            return
+
+        duration = loop.time() - pending.started_at
+        self._expected_duration = 0.8 * self._expected_duration + 0.2 * duration
+        if run.status == "completed":
+            self.runs_completed += 1
+        else:
+            self.runs_failed += 1
+        self._pending.pop(pending.run_id, None)
+        if not pending.future.done():
+            pending.future.set_result(run)
+
+    def _reschedule(self, pending: _PendingRun, now: float):
+        pending.interval = min(RUN_POLL_MAX_SECONDS, max(RUN_POLL_MIN_SECONDS, pending.interval * RUN_POLL_BACKOFF))
+        pending.next_poll_at = now + pending.interval
+
+    def stats(self) -> dict:
+        finished = self.runs_completed + self.runs_failed
+        return {
+            "outstanding_runs": len(self._pending),
+            "polls": self.polls,
+            "wasted_polls": self.wasted_polls,
+            "poll_errors": self.poll_errors,
+            "runs_completed": self.runs_completed,
+            "runs_failed": self.runs_failed,
+            "runs_timed_out": self.runs_timed_out,
+            "runs_cancelled": self.runs_cancelled,
+            "polls_per_run": self.polls / finished if finished else 0.0,
+            "expected_run_seconds": round(self._expected_duration, 3),
+        }
@@ -0,0 +1,290 @@
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import re
+import unicodedata
+import zlib
+from typing import FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.database import AsyncSessionLocal
+from app.models import ChatbotConversations
+from app.response_cache import parse_enabled_chatbots
+
+try:
+    import numpy as np
+except ImportError:  # ✅ Semantic caching is optional; exact-match caching still works without numpy
+    np = None
+
+logger = logging.getLogger("MedusaApp")
+
+# Comma-separated chatbot ids that opted in, or "*" for every chatbot. Empty disables the cache.
+SEMANTIC_CACHE_CHATBOTS = os.getenv("SEMANTIC_CACHE_CHATBOTS", "")
+# Minimum cosine similarity for a hit. Unset means the embedder's own default; validate any
+# override on real paraphrases first (benchmarks/bench_semantic_cache.py --calibrate)
+SEMANTIC_CACHE_THRESHOLD = float(os.environ["SEMANTIC_CACHE_THRESHOLD"]) if os.getenv("SEMANTIC_CACHE_THRESHOLD") else None
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 100000))
+# How many recent conversations to index when a chatbot is first looked up
+SEMANTIC_CACHE_WARM_ROWS = int(os.getenv("SEMANTIC_CACHE_WARM_ROWS", 10000))
+# Indexes larger than this are searched on the threadpool instead of the event loop
+SEMANTIC_CACHE_INLINE_ENTRIES = int(os.getenv("SEMANTIC_CACHE_INLINE_ENTRIES", 20000))
+# Optional "module:attribute" of a custom embedder exposing `dim`, `threshold` and `embed(texts) -> ndarray`,
+# e.g. "app.semantic_cache:HashingEmbedder" for the dependency-free lexical one
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER")
+# Sentence-embedding model behind the default embedder (sentence-transformers, in requirements.txt)
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+# Closest stored questions checked against the threshold (and the embedder's own guard) per lookup
+SEMANTIC_CACHE_CANDIDATES = int(os.getenv("SEMANTIC_CACHE_CANDIDATES", 5))
+
+_TOKEN = re.compile(r"\w+")
+
+# Function words (English, Portuguese, Spanish) that do not change what a question asks
+STOP_WORDS = frozenset("""
+a an the and or of to in on for with at by from is are was be do does did can could would should will
+i me my we our you your it this that how what which who when where why please hi hello there
+o os as um uma de da do das dos em no na nos nas para por com e ou que como qual quais eu meu minha
+voce voces por favor ola el la los las un una y en con del al es son yo mi tu usted cual cuales hola
+""".split())
+
+def fold_text(text: str) -> str:
+    """Lowercases and strips accents so "orçamento" and "orcamento" embed identically."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def content_words(text: str) -> FrozenSet[str]:
+    return frozenset(word for word in _TOKEN.findall(fold_text(text)) if word not in STOP_WORDS)
+
+class HashingEmbedder:
+    """
+    Local, dependency-free embedder: hashed word unigrams plus half-weight bigrams,
+    L2-normalized. Not the default; select it with SEMANTIC_CACHE_EMBEDDER.
+
+    It is lexical: "schedule a demo" and "cancel a demo" score above any threshold that
+    also admits real paraphrases. So a hit additionally needs the same content words
+    (numbers included), i.e. it only absorbs changes in word order, case, accents,
+    punctuation and function words. Paraphrases need a model-backed embedder.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    BIGRAM_WEIGHT = 0.5
+    threshold = 0.9
+
+    def same_question(self, query: str, stored: str) -> bool:
+        return content_words(query) == content_words(stored)
+
+    def _features(self, text: str):
+        words = _TOKEN.findall(fold_text(text))
+        return [(word, 1.0) for word in words] + [(f"{a} {b}", self.BIGRAM_WEIGHT) for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, digest % self.dim] += weight if digest & 0x80000000 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class SentenceTransformerEmbedder:
+    """
+    Multilingual sentence-embedding model run locally; the default embedder. Loading it and
+    encoding are CPU-bound, so SemanticCache only calls both on the threadpool.
+    """
+
+    # Starting point for the default model; calibrate on the bot's own paraphrases before relying on it
+    threshold = 0.9
+
+    def __init__(self, model_name: str = SEMANTIC_CACHE_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def same_question(self, query: str, stored: str) -> bool:
+        return True
+
+    def embed(self, texts: List[str]):
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+def load_embedder():
+    """The configured embedder, or None when the default model's package is not installed."""
+    if not SEMANTIC_CACHE_EMBEDDER:
+        if importlib.util.find_spec("sentence_transformers") is None:
+            return None
+        return SentenceTransformerEmbedder()
+    module_name, _, attribute = SEMANTIC_CACHE_EMBEDDER.partition(":")
+    embedder = getattr(importlib.import_module(module_name), attribute)
+    return embedder() if isinstance(embedder, type) else embedder
+
+class SemanticIndex:
+    """
+    Unit vectors for one chatbot's past questions, stored in one contiguous float32
+    matrix so a lookup is a single matrix-vector product. Once `max_entries` is reached
+    the oldest entries are overwritten.
+    """
+
+    def __init__(self, dim: int, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, initial_capacity: int = 1024, revision: str = ""):
+        self.dim = dim
+        self.revision = revision
+        self.max_entries = max_entries
+        self._vectors = np.zeros((min(initial_capacity, max_entries), dim), dtype=np.float32)
+        self._entries: List[Tuple[str, str]] = []
+        self._next = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_many(self, vectors, questions: List[str], responses: List[str]):
+        for vector, question, response in zip(vectors, questions, responses):
+            self.add(vector, question, response)
+
+    def add(self, vector, question: str, response: str):
+        if len(self._entries) < self.max_entries:
+            if len(self._entries) == len(self._vectors):
+                grown = np.zeros((min(len(self._vectors) * 2, self.max_entries), self.dim), dtype=np.float32)
+                grown[:len(self._vectors)] = self._vectors
+                self._vectors = grown
+            self._vectors[len(self._entries)] = vector
+            self._entries.append((question, response))
+            return
+
+        self._vectors[self._next] = vector
+        self._entries[self._next] = (question, response)
+        self._next = (self._next + 1) % self.max_entries
+
+    def search(self, vector, k: int = 1) -> List[Tuple[float, str, str]]:
+        """The k closest stored entries as (similarity, question, response), best first."""
+        if not self._entries:
+            return []
+        scores = self._vectors[:len(self._entries)] @ vector
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), *self._entries[i]) for i in best]
+
+class SemanticCache:
+    """Returns a stored reply when a new question is close enough to one answered before."""
+
+    def __init__(self, enabled_chatbots=None, threshold: Optional[float] = SEMANTIC_CACHE_THRESHOLD):
+        self.enabled_chatbots = parse_enabled_chatbots(SEMANTIC_CACHE_CHATBOTS) if enabled_chatbots is None else enabled_chatbots
+        self._threshold = threshold
+        self._embedder = None
+        self._loading = None
+        self.available = np is not None
+        self._indexes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def enabled_for(self, chatbot_id: int) -> bool:
+        if not self.available:
+            return False
+        return self.enabled_chatbots == "*" or chatbot_id in self.enabled_chatbots
+
+    async def load(self):
+        """
+        Loads the embedder once, on the threadpool (a sentence-transformers model takes seconds).
+        Called at startup; the first lookup awaits the same load if startup did not run it.
+        """
+        if self._embedder is not None or not self.available:
+            return self._embedder
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(run_in_threadpool(load_embedder))
+        try:
+            embedder = await asyncio.shield(self._loading)
+            if embedder is None:
+                raise RuntimeError("sentence-transformers is not installed")
+        except Exception as e:
+            if self.available:
+                logger.error(f"Semantic cache disabled, no embedder: {str(e)}")
+            self.available = False
+            return None
+        self._embedder = embedder
+        return embedder
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold if self._threshold is not None else getattr(self._embedder, "threshold", 0.9)
+
+    async def _index_for(self, chatbot_id: int, revision: str, embedder) -> SemanticIndex:
+        index = self._indexes.get(chatbot_id)
+        if index is not None:
+            if index.revision != revision:
+                # The bot's prompt, model or tools changed: earlier replies no longer apply, and
+                # neither does the conversation history the index would be warmed from
+                index = self._indexes[chatbot_id] = SemanticIndex(embedder.dim, revision=revision)
+            return index
+
+        index = SemanticIndex(embedder.dim, revision=revision)
+        self._indexes[chatbot_id] = index
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    select(ChatbotConversations.user_message, ChatbotConversations.bot_response)
+                    # Only anonymous turns: a signed-in user's reply may be personalized
+                    .where(ChatbotConversations.chatbot_id == chatbot_id, ChatbotConversations.user_id.is_(None))
+                    .order_by(ChatbotConversations.id.desc())
+                    .limit(SEMANTIC_CACHE_WARM_ROWS)
+                )).all()
+        except Exception as e:
+            logger.warning(f"Could not warm semantic cache for chatbot {chatbot_id}: {str(e)}")
+            return index
+
+        rows = [row for row in reversed(rows) if row.user_message and row.bot_response]
+        if rows:
+            vectors = await run_in_threadpool(embedder.embed, [row.user_message for row in rows])
+            index.add_many(vectors, [row.user_message for row in rows], [row.bot_response for row in rows])
+            logger.info(f"Semantic cache warmed for chatbot {chatbot_id} with {len(rows)} conversations")
+        return index
+
+    async def lookup(self, chatbot_id: int, user_message: str, revision: str = "") -> Optional[str]:
+        embedder = await self.load()
+        if embedder is None:
+            return None
+        index = await self._index_for(chatbot_id, revision, embedder)
+        # Embedding (and the search, on a large index) is CPU-bound: keep it off the event loop
+        vector = (await run_in_threadpool(embedder.embed, [user_message]))[0]
+        if len(index) > SEMANTIC_CACHE_INLINE_ENTRIES:
+            candidates = await run_in_threadpool(index.search, vector, SEMANTIC_CACHE_CANDIDATES)
+        else:
+            candidates = index.search(vector, SEMANTIC_CACHE_CANDIDATES)
+        threshold = self.threshold
+        same_question = getattr(embedder, "same_question", None)
+        for similarity, question, response in candidates:
+            if similarity < threshold:
+                break
+            if same_question is None or same_question(user_message, question):
+                self.hits += 1
+                return response
+        self.misses += 1
+        return None
+
+    async def add(self, chatbot_id: int, user_message: str, bot_response: str, revision: str = ""):
+        """Indexes a reply; callers only pass replies that are not personalized (anonymous turns)."""
+        if not bot_response:
+            return
+        embedder = await self.load()
+        if embedder is None:
+            return
+        index = await self._index_for(chatbot_id, revision, embedder)
+        vector = (await run_in_threadpool(embedder.embed, [user_message]))[0]
+        index.add(vector, user_message, bot_response)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "available": self.available,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "threshold": self.threshold,
+            "indexed_chatbots": len(self._indexes),
+            "indexed_entries": sum(len(index) for index in self._indexes.values()),
+        }
+
+semantic_cache = SemanticCache()
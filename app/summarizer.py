@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+import logging
+import os
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import AsyncSessionLocal
+from app.history import HistoryWindow, conversation_history
+from app.llm_client import summarize_turns
+from app.models import ChatbotConversations, ChatbotConversationSummaries
+
+logger = logging.getLogger("MedusaApp")
+
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() in ("1", "true", "yes")
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", 2))
+SUMMARY_QUEUE_SIZE = int(os.getenv("SUMMARY_QUEUE_SIZE", 1000))
+# Most recent turns that always stay verbatim
+SUMMARY_KEEP_RECENT_TURNS = int(os.getenv("SUMMARY_KEEP_RECENT_TURNS", 6))
+# A session is summarized once this many turns beyond the recent ones have piled up
+SUMMARY_TRIGGER_TURNS = int(os.getenv("SUMMARY_TRIGGER_TURNS", 10))
+# Upper bound on turns folded in per summarization call (long backlogs are worked off in several passes)
+SUMMARY_MAX_BATCH_TURNS = int(os.getenv("SUMMARY_MAX_BATCH_TURNS", 50))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", 300))
+
+def upsert_statement(dialect_name: str, row: dict):
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = ChatbotConversationSummaries.__table__
+    statement = dialect_insert(table).values(row)
+    return statement.on_conflict_do_update(
+        index_elements=["chatbot_id", "user_id"],
+        set_={
+            "summary": statement.excluded.summary,
+            "through_conversation_id": statement.excluded.through_conversation_id,
+            "turns_summarized": table.c.turns_summarized + statement.excluded.turns_summarized,
+            "updated_at": func.now(),
+        },
+        # Another worker may have summarized further already; never move the summary backwards
+        where=table.c.through_conversation_id < statement.excluded.through_conversation_id,
+    )
+
+class ConversationSummarizer:
+    """
+    Background pool that folds a session's older turns into its rolling summary.
+
+    The chat path only enqueues (chatbot_id, user_id) once enough unsummarized turns have
+    piled up; SUMMARY_WORKERS tasks take sessions off the queue, summarize everything but
+    the last SUMMARY_KEEP_RECENT_TURNS turns together with the previous summary, and store
+    the result in chatbot_conversation_summaries. Raw turns stay in chatbot_conversations.
+    """
+
+    def __init__(self, workers: int = SUMMARY_WORKERS, queue_size: int = SUMMARY_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[Tuple[int, str]] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.summaries_written = 0
+        self.turns_summarized = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(self.queue_size)
+        self._tasks = [asyncio.get_running_loop().create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Queued sessions are simply re-requested by their next message after a restart
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+
+    def maybe_request(self, chatbot_id: int, user_id: str, window: Optional[HistoryWindow]):
+        """Queues the session when its window has enough unsummarized turns; never blocks."""
+        if window is None or not self.running or window.unsummarized < SUMMARY_KEEP_RECENT_TURNS + SUMMARY_TRIGGER_TURNS:
+            return
+        key = (chatbot_id, user_id)
+        if key in self._pending:
+            return
+        try:
+            self._queue.put_nowait(key)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self._pending.add(key)
+
+    async def _run(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                await self.summarize(*key)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Summarizing conversation {key} failed: {str(e)}")
+            finally:
+                self._pending.discard(key)
+
+    async def summarize(self, chatbot_id: int, user_id: str) -> int:
+        """Folds the session's older unsummarized turns into its summary; returns how many turns were folded."""
+        async with AsyncSessionLocal() as db:
+            current = (await db.execute(
+                select(ChatbotConversationSummaries).where(
+                    ChatbotConversationSummaries.chatbot_id == chatbot_id,
+                    ChatbotConversationSummaries.user_id == user_id
+                )
+            )).scalar_one_or_none()
+            query = (
+                select(ChatbotConversations.id, ChatbotConversations.user_message, ChatbotConversations.bot_response)
+                .where(ChatbotConversations.chatbot_id == chatbot_id, ChatbotConversations.user_id == user_id)
+                .order_by(ChatbotConversations.id)
+                .limit(SUMMARY_MAX_BATCH_TURNS + SUMMARY_KEEP_RECENT_TURNS)
+            )
+            if current is not None:
+                query = query.where(ChatbotConversations.id > current.through_conversation_id)
+            rows = (await db.execute(query)).all()
+
+        older = rows[:max(0, len(rows) - SUMMARY_KEEP_RECENT_TURNS)]
+        if not older:
+            return 0
+
+        summary = await summarize_turns(
+            current.summary if current is not None else None,
+            [(row.user_message, row.bot_response) for row in older],
+            SUMMARY_MODEL,
+            SUMMARY_MAX_TOKENS,
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(upsert_statement(db.bind.dialect.name, {
+                "chatbot_id": chatbot_id,
+                "user_id": user_id,
+                "summary": summary,
+                "through_conversation_id": older[-1].id,
+                "turns_summarized": len(older),
+                "updated_at": datetime.datetime.utcnow(),
+            }))
+            await db.commit()
+
+        conversation_history.apply_summary(chatbot_id, user_id, summary, len(older))
+        self.summaries_written += 1
+        self.turns_summarized += len(older)
+        return len(older)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "summaries_written": self.summaries_written,
+            "turns_summarized": self.turns_summarized,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+conversation_summarizer = ConversationSummarizer()
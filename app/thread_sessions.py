@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal
+from app.llm_client import create_thread
+from app.models import ChatbotThreadSessions
+
+logger = logging.getLogger("MedusaApp")
+
+THREAD_SESSION_TTL_SECONDS = int(os.getenv("THREAD_SESSION_TTL_SECONDS", 24 * 3600))
+THREAD_SESSION_CACHE_SIZE = int(os.getenv("THREAD_SESSION_CACHE_SIZE", 10000))
+# How stale last_used_at may get before we write it back (avoids one UPDATE per message)
+THREAD_SESSION_TOUCH_SECONDS = int(os.getenv("THREAD_SESSION_TOUCH_SECONDS", 300))
+
+class ThreadLease(NamedTuple):
+    thread_id: Optional[str]
+    # True when the thread has no earlier messages (new session, expired or anonymous)
+    created: bool
+
+class ThreadSessionRegistry:
+    """
+    Maps (chatbot_id, user_id) to a persistent OpenAI thread.
+
+    Lookups hit an in-memory LRU first, then the chatbot_thread_sessions table; a new
+    thread is only created when neither has a session used within the TTL. Each session
+    also carries a lock so one user's messages run one at a time on their thread
+    (the Assistants API rejects new messages while a run is active).
+    """
+
+    def __init__(self, maxsize: int = THREAD_SESSION_CACHE_SIZE, ttl: float = THREAD_SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize, ttl)
+        self._locks = {}
+        self.threads_created = 0
+        self.threads_reused = 0
+
+    @asynccontextmanager
+    async def session(self, chatbot_id: int, user_id: str) -> AsyncIterator[ThreadLease]:
+        """Holds the session lock and yields the thread to run the message on."""
+        key = (chatbot_id, user_id)
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield ThreadLease(*await self._get_or_create(chatbot_id, user_id))
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def forget(self, chatbot_id: int, user_id: str):
+        """Drops the cached thread, e.g. after OpenAI reports it no longer exists."""
+        self._cache.pop((chatbot_id, user_id))
+
+    async def _get_or_create(self, chatbot_id: int, user_id: str) -> Tuple[str, bool]:
+        key = (chatbot_id, user_id)
+        now = datetime.datetime.utcnow()
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            thread_id, touched_at = cached
+            if (now - touched_at).total_seconds() >= THREAD_SESSION_TOUCH_SECONDS:
+                await self._store(chatbot_id, user_id, thread_id, now)
+                self._cache.set(key, (thread_id, now))
+            self.threads_reused += 1
+            return thread_id, False
+
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(ChatbotThreadSessions).where(
+                    ChatbotThreadSessions.chatbot_id == chatbot_id,
+                    ChatbotThreadSessions.user_id == user_id
+                )
+            )).scalar_one_or_none()
+
+        created = row is None or not row.last_used_at or (now - row.last_used_at).total_seconds() >= self.ttl
+        if not created:
+            thread_id = row.thread_id
+            self.threads_reused += 1
+        else:
+            thread_id = await create_thread()
+            self.threads_created += 1
+            logger.info(f"Created thread {thread_id} for chatbot {chatbot_id} / user {user_id}")
+
+        await self._store(chatbot_id, user_id, thread_id, now)
+        self._cache.set(key, (thread_id, now))
+        return thread_id, created
+
+    async def _store(self, chatbot_id: int, user_id: str, thread_id: str, used_at: datetime.datetime):
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(ChatbotThreadSessions).where(
+                    ChatbotThreadSessions.chatbot_id == chatbot_id,
+                    ChatbotThreadSessions.user_id == user_id
+                )
+            )).scalar_one_or_none()
+            if row is None:
+                db.add(ChatbotThreadSessions(
+                    chatbot_id=chatbot_id,
+                    user_id=user_id,
+                    thread_id=thread_id,
+                    created_at=used_at,
+                    last_used_at=used_at
+                ))
+            else:
+                if row.thread_id != thread_id:
+                    row.thread_id = thread_id
+                    row.created_at = used_at
+                row.last_used_at = used_at
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker stored the same session first; its row is just as good
+                await db.rollback()
+
+    def stats(self) -> dict:
+        return {
+            "threads_created": self.threads_created,
+            "threads_reused": self.threads_reused,
+            "cache": self._cache.stats(),
+        }
+
+thread_sessions = ThreadSessionRegistry()
+
+@asynccontextmanager
+async def thread_for(chatbot_id: int, user_id: Optional[str]) -> AsyncIterator[ThreadLease]:
+    """Yields the user's persistent thread, or no thread_id (fresh thread) for anonymous callers."""
+    if not user_id:
+        yield ThreadLease(None, True)
+        return
+    async with thread_sessions.session(chatbot_id, user_id) as lease:
+        yield lease
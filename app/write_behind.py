@@ -0,0 +1,327 @@
+import asyncio
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.database import AsyncSessionLocal
+from app.models import ChatbotConversations
+
+try:
+    import fcntl
+except ImportError:  # ✅ No flock on Windows; segments are then only replayed by the worker that wrote them
+    fcntl = None
+
+logger = logging.getLogger("MedusaApp")
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 500))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", 0.5))
+# Holds conversation contents: keep it out of the source tree and on a writable, persistent volume
+WRITE_BEHIND_SPOOL_DIR = os.getenv(
+    "WRITE_BEHIND_SPOOL_DIR",
+    os.path.join(os.getenv("XDG_STATE_HOME", os.path.join(os.path.expanduser("~"), ".local", "state")), "medusa", "spool")
+)
+# fsync every record (survives power loss) instead of only flushing to the OS (survives process crashes).
+# Appends run on the writer's own thread, so a slow disk delays that turn's save, not the event loop.
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_RETRY_SECONDS = float(os.getenv("WRITE_BEHIND_MAX_RETRY_SECONDS", 30))
+# Failed flushes of one batch before it is moved to a dead-letter segment (~10 minutes at the default backoff)
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", 25))
+
+# Errors caused by the records themselves (FK or NOT NULL violations, over-long values,
+# malformed spool lines): retrying never helps, so the offending rows are dead-lettered.
+# Anything else (connection loss, timeouts, missing schema) is retried.
+RECORD_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+class _Segment:
+    """One append-only spool file, held open (and flock'd) until its records are in the database."""
+
+    def __init__(self, path: str, file):
+        self.path = path
+        self.file = file
+
+    @classmethod
+    def create(cls, path: str):
+        file = open(path, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return cls(path, file)
+
+    @classmethod
+    def adopt(cls, path: str):
+        """Opens another worker's segment; returns None while that worker is still alive and holds it."""
+        file = open(path, "a+", encoding="utf-8")
+        if fcntl is not None:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return None
+        return cls(path, file)
+
+    def append(self, line: str):
+        self.file.write(line)
+        self.file.flush()
+        if WRITE_BEHIND_FSYNC:
+            os.fsync(self.file.fileno())
+
+    def read_records(self) -> List[dict]:
+        self.file.seek(0)
+        records = []
+        for line in self.file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write; everything before it is intact
+                logger.warning(f"Skipping a partial record in spool segment {self.path}")
+        return records
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.path)
+
+class ConversationWriter:
+    """
+    Write-behind buffer for chat conversations.
+
+    `submit` appends the record to a local spool segment and returns; spool file I/O runs on
+    one dedicated thread, in submission order, never on the event loop. A background task
+    flushes buffered records every WRITE_BEHIND_FLUSH_SECONDS or WRITE_BEHIND_BATCH_SIZE
+    records with one multi-row INSERT per batch. A segment is deleted only after all of
+    its records are committed, and segments left behind by a crashed worker are replayed
+    at startup, so delivery is at-least-once.
+
+    A batch rejected because of its records is split until the bad rows are isolated;
+    those (and batches still failing after WRITE_BEHIND_MAX_RETRIES attempts) go to
+    dead-letter-*.ndjson segments, which are logged and never replayed automatically.
+    Rename one to conversations-*.ndjson to replay it after fixing the cause.
+    """
+
+    def __init__(self, spool_dir: str = WRITE_BEHIND_SPOOL_DIR, batch_size: int = WRITE_BEHIND_BATCH_SIZE, flush_seconds: float = WRITE_BEHIND_FLUSH_SECONDS):
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer = []
+        self._active: Optional[_Segment] = None
+        self._sealed: List[_Segment] = []
+        self._sequence = 0
+        self._task = None
+        self._wakeup = None
+        self._closing = False
+        self._io: Optional[ThreadPoolExecutor] = None
+        self.submitted = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.replayed = 0
+        self.dead_lettered = 0
+        self.spool_errors = 0
+        self._failed_attempts = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._flush_seconds_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # One thread, so appends, closes and deletes of a segment happen in the order they were queued
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write-behind")
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._replay()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Conversation write-behind started (spool: {self.spool_dir}, replayed {self.replayed} records)")
+
+    async def stop(self):
+        """Flushes whatever is buffered; anything that still fails stays in the spool for the next start."""
+        if not self.running:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        if self._active is not None:
+            self._sealed.append(self._active)
+            self._active = None
+        for segment in self._sealed:
+            await self._on_io_thread(segment.file.close)
+        self._sealed = []
+        self._io.shutdown()
+        self._io = None
+
+    async def _on_io_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    async def submit(self, chatbot_id: int, user_message: str, bot_response: str, platform: Optional[str] = "Web", timestamp: Optional[datetime.datetime] = None, user_id: Optional[str] = None):
+        record = {
+            "chatbot_id": chatbot_id,
+            "user_message": user_message,
+            "bot_response": bot_response,
+            "platform": platform,
+            "user_id": user_id,
+            "timestamp": (timestamp or datetime.datetime.utcnow()).isoformat(),
+        }
+        if self._active is None:
+            self._active = self._new_segment()
+        # Buffered together with choosing the segment, so a flush never deletes a segment
+        # whose records are not in the batch it committed
+        segment = self._active
+        self._buffer.append(record)
+        self.submitted += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        try:
+            await self._on_io_thread(segment.append, json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            # Still buffered and written with the next flush; only crash safety is lost
+            self.spool_errors += 1
+            logger.error(f"Could not spool conversation for chatbot {chatbot_id}: {str(e)}")
+
+    def _segment_path(self, prefix: str) -> str:
+        self._sequence += 1
+        return os.path.join(self.spool_dir, f"{prefix}-{os.getpid()}-{int(time.time() * 1000)}-{self._sequence}.ndjson")
+
+    def _new_segment(self) -> _Segment:
+        return _Segment.create(self._segment_path("conversations"))
+
+    @staticmethod
+    def _write_dead_letter(path: str, records: List[dict]):
+        with open(path, "a", encoding="utf-8") as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    async def _dead_letter(self, rejected: List[Tuple[dict, Exception]]):
+        path = self._segment_path("dead-letter")
+        await self._on_io_thread(self._write_dead_letter, path, [record for record, _ in rejected])
+        for record, error in rejected:
+            logger.error(f"Conversation record for chatbot {record.get('chatbot_id')} moved to {path}: {str(error)}")
+        self.dead_lettered += len(rejected)
+
+    def _replay(self):
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "conversations-*.ndjson"))):
+            segment = _Segment.adopt(path)
+            if segment is None:
+                continue
+            records = segment.read_records()
+            self._buffer.extend(records)
+            self._sealed.append(segment)
+            self.replayed += len(records)
+
+    async def _run(self):
+        retry_delay = self.flush_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), retry_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._buffer and not await self._flush():
+                if self._closing:
+                    return
+                retry_delay = min(WRITE_BEHIND_MAX_RETRY_SECONDS, max(self.flush_seconds, retry_delay * 2))
+                continue
+            retry_delay = self.flush_seconds
+            if self._closing:
+                return
+
+    async def _insert(self, records: List[dict]):
+        async with AsyncSessionLocal() as db:
+            for offset in range(0, len(records), self.batch_size):
+                rows = [
+                    # Segments spooled before user_id existed replay without it
+                    dict(record, user_id=record.get("user_id"), timestamp=datetime.datetime.fromisoformat(record["timestamp"]))
+                    for record in records[offset:offset + self.batch_size]
+                ]
+                await db.execute(insert(ChatbotConversations).values(rows))
+            await db.commit()
+
+    async def _insert_isolating(self, records: List[dict], committed: List[dict]) -> List[Tuple[dict, Exception]]:
+        """
+        Inserts the records, halving any chunk rejected for its records until the bad ones are
+        isolated; returns those with their errors. Committed chunks are added to `committed`;
+        other errors propagate.
+        """
+        try:
+            await self._insert(records)
+        except RECORD_ERRORS as e:
+            if len(records) == 1:
+                return [(records[0], e)]
+            middle = len(records) // 2
+            rejected = await self._insert_isolating(records[:middle], committed)
+            return rejected + await self._insert_isolating(records[middle:], committed)
+        committed.extend(records)
+        return []
+
+    async def _flush(self) -> bool:
+        # Seal the active segment so new submissions land in a fresh one while this batch is written
+        if self._active is not None:
+            self._sealed.append(self._active)
+            self._active = None
+        batch, self._buffer = self._buffer, []
+        sealed = list(self._sealed)
+
+        started = time.perf_counter()
+        committed = []
+        try:
+            rejected = await self._insert_isolating(batch, committed)
+        except Exception as e:
+            self.flush_errors += 1
+            self._failed_attempts += 1
+            written = {id(record) for record in committed}
+            remaining = [record for record in batch if id(record) not in written]
+            if self._failed_attempts <= WRITE_BEHIND_MAX_RETRIES:
+                self._buffer = remaining + self._buffer
+                logger.error(f"Conversation write-behind flush of {len(remaining)} records failed (attempt {self._failed_attempts}): {str(e)}")
+                return False
+            logger.error(f"Conversation write-behind gave up on {len(remaining)} records after {self._failed_attempts} attempts")
+            rejected = [(record, e) for record in remaining]
+        self._failed_attempts = 0
+        if rejected:
+            await self._dead_letter(rejected)
+
+        elapsed = time.perf_counter() - started
+        for segment in sealed:
+            # Queued behind any append still in flight to the segment
+            await self._on_io_thread(segment.discard)
+        self._sealed = self._sealed[len(sealed):]
+        self.flushes += 1
+        self.rows_flushed += len(batch) - len(rejected)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self._flush_seconds_total += elapsed
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": len(self._buffer),
+            "spool_segments": len(self._sealed) + (1 if self._active is not None else 0),
+            "submitted": self.submitted,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "flush_errors": self.flush_errors,
+            "dead_lettered": self.dead_lettered,
+            "spool_errors": self.spool_errors,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+            "max_flush_seconds": round(self.max_flush_seconds, 4),
+            "avg_flush_seconds": round(self._flush_seconds_total / self.flushes, 4) if self.flushes else 0.0,
+        }
+
+conversation_writer = ConversationWriter()
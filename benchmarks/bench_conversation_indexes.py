@@ -0,0 +1,159 @@
+"""
+Query plans and latencies for per-chatbot conversation queries on a local PostgreSQL,
+with the original schema (primary key plus a redundant id index), with the composite
+(chatbot_id, timestamp DESC, id DESC) index, and with monthly range partitioning.
+
+Seeds three copies of a synthetic chatbot_conversations table (10M rows each by default)
+into a scratch schema, so it never touches the application tables:
+
+    python benchmarks/bench_conversation_indexes.py --url postgresql://localhost/medusa_bench --rows 10000000
+    python benchmarks/bench_conversation_indexes.py --url ... --skip-seed   # re-run queries only
+
+Before timing, it checks that a keyset cursor near the end of the busiest chatbot's history
+is served by an index range scan (the row-value bound in Index Cond, no Sort).
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text
+
+from app.partitions import add_months
+
+SCHEMA = "medusa_bench"
+VARIANTS = ("baseline", "indexed", "partitioned")
+COLUMNS = "id bigint NOT NULL, chatbot_id integer NOT NULL, user_message text NOT NULL, bot_response text NOT NULL, platform varchar, \"timestamp\" timestamp"
+
+QUERIES = {
+    "latest page": (
+        "SELECT id, user_message, bot_response, \"timestamp\" FROM {table} WHERE chatbot_id = :chatbot_id "
+        "ORDER BY \"timestamp\" DESC NULLS LAST, id DESC LIMIT 100"
+    ),
+    # Same statement as app.pagination.conversation_page for a dated cursor
+    "keyset page": (
+        "SELECT id, user_message, bot_response, \"timestamp\" FROM {table} WHERE chatbot_id = :chatbot_id "
+        "AND \"timestamp\" IS NOT NULL AND (\"timestamp\", id) < (:before, :before_id) "
+        "ORDER BY \"timestamp\" DESC NULLS LAST, id DESC LIMIT 100"
+    ),
+    "deep keyset page": (
+        "SELECT id, user_message, bot_response, \"timestamp\" FROM {table} WHERE chatbot_id = :chatbot_id "
+        "AND \"timestamp\" IS NOT NULL AND (\"timestamp\", id) < (:deep_before, :deep_before_id) "
+        "ORDER BY \"timestamp\" DESC NULLS LAST, id DESC LIMIT 100"
+    ),
+    "last 30 days count": (
+        "SELECT count(*) FROM {table} WHERE chatbot_id = :chatbot_id AND \"timestamp\" >= :since"
+    ),
+}
+
+def seed(conn, rows, chatbots, months, start):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.baseline ({COLUMNS}, PRIMARY KEY (id))"))
+
+    # Skewed chatbot ids (a few chatbots own most of the traffic), timestamps spread over `months`
+    started = time.perf_counter()
+    conn.execute(text(
+        f"INSERT INTO {SCHEMA}.baseline "
+        "SELECT g, 1 + floor(:chatbots * power(random(), 3))::int, 'question ' || g, 'answer ' || g, 'Web', "
+        ":start + random() * (:end - :start) "
+        "FROM generate_series(1, :rows) AS g"
+    ), {"rows": rows, "chatbots": chatbots, "start": start, "end": datetime.datetime.combine(add_months(start.date(), months), datetime.time())})
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.baseline (id)"))
+    print(f"seeded {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.indexed (LIKE {SCHEMA}.baseline INCLUDING ALL)"))
+    conn.execute(text(f"INSERT INTO {SCHEMA}.indexed SELECT * FROM {SCHEMA}.baseline"))
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.indexed (chatbot_id, \"timestamp\" DESC NULLS LAST, id DESC)"))
+
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.partitioned ({COLUMNS}) PARTITION BY RANGE (\"timestamp\")"))
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.partitioned_default PARTITION OF {SCHEMA}.partitioned DEFAULT"))
+    month = start.date().replace(day=1)
+    for _ in range(months + 1):
+        conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.partitioned_p{month:%Y%m} PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        month = add_months(month, 1)
+    conn.execute(text(f"INSERT INTO {SCHEMA}.partitioned SELECT * FROM {SCHEMA}.baseline"))
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.partitioned (id)"))
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.partitioned (chatbot_id, \"timestamp\" DESC NULLS LAST, id DESC)"))
+
+    for variant in VARIANTS:
+        conn.execute(text(f"ANALYZE {SCHEMA}.{variant}"))
+    print(f"built all variants in {time.perf_counter() - started:.1f}s")
+
+def cursor_at(conn, chatbot_id, offset, now):
+    cursor = conn.execute(text(
+        f"SELECT \"timestamp\", id FROM {SCHEMA}.indexed WHERE chatbot_id = :chatbot_id "
+        "ORDER BY \"timestamp\" DESC NULLS LAST, id DESC OFFSET :offset LIMIT 1"
+    ), {"chatbot_id": chatbot_id, "offset": offset}).first()
+    return cursor if cursor else (now, 2**62)
+
+def query_params(conn, rng, chatbots, now):
+    chatbot_id = rng.randint(1, chatbots)
+    rows = conn.execute(text(f"SELECT count(*) FROM {SCHEMA}.indexed WHERE chatbot_id = :chatbot_id"), {"chatbot_id": chatbot_id}).scalar()
+    before, before_id = cursor_at(conn, chatbot_id, 1000, now)
+    # Near the end of the chatbot's history: with a bounded range scan this costs the same as the first page
+    deep_before, deep_before_id = cursor_at(conn, chatbot_id, max(0, rows - 200), now)
+    return {
+        "chatbot_id": chatbot_id, "before": before, "before_id": before_id,
+        "deep_before": deep_before, "deep_before_id": deep_before_id, "since": now - datetime.timedelta(days=30),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL", "postgresql://localhost/medusa_bench"))
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--chatbots", type=int, default=1000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    start = datetime.datetime(2024, 1, 1)
+    now = datetime.datetime.combine(add_months(start.date(), args.months), datetime.time())
+    if not args.skip_seed:
+        with engine.begin() as conn:
+            seed(conn, args.rows, args.chatbots, args.months, start)
+
+    rng = random.Random(7)
+    with engine.connect() as conn:
+        samples = [query_params(conn, rng, args.chatbots, now) for _ in range(args.samples)]
+        # The busiest chatbot's deepest cursor: the plan must seek with the row value, not filter
+        busiest, rows = conn.execute(text(
+            f"SELECT chatbot_id, count(*) FROM {SCHEMA}.indexed GROUP BY chatbot_id ORDER BY count(*) DESC LIMIT 1"
+        )).first()
+        deep_before, deep_before_id = cursor_at(conn, busiest, max(0, rows - 200), now)
+        plan = "\n".join(conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {QUERIES['deep keyset page'].format(table=f'{SCHEMA}.indexed')}"),
+            {"chatbot_id": busiest, "deep_before": deep_before, "deep_before_id": deep_before_id},
+        ).scalars().all())
+        print(f"== deep cursor plan (chatbot {busiest}, {rows:,} rows)\n{plan}")
+        assert "Index Cond" in plan and "ROW(" in plan and "Sort" not in plan, "deep keyset page is not an index range scan"
+        for name, sql in QUERIES.items():
+            print(f"\n== {name}")
+            for variant in VARIANTS:
+                statement = text(sql.format(table=f"{SCHEMA}.{variant}"))
+                plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {statement.text}"), samples[0]).scalars().all()
+                timings = []
+                for params in samples:
+                    begin = time.perf_counter()
+                    conn.execute(statement, params).all()
+                    timings.append(time.perf_counter() - begin)
+                timings.sort()
+                print(
+                    f"{variant:<12} p50={statistics.median(timings) * 1000:8.2f}ms "
+                    f"p99={timings[int(0.99 * (len(timings) - 1))] * 1000:8.2f}ms  plan: {plan[0].strip()}"
+                )
+                for line in plan[1:4]:
+                    print(f"{'':<14}{line}")
+
+if __name__ == "__main__":
+    main()
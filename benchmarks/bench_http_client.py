@@ -0,0 +1,152 @@
+"""
+Connection reuse for outbound Agentive calls, against a local stub of agentivehub.com.
+
+Sends --calls send-message requests three ways and counts the TCP connections the stub
+accepted:
+
+    requests     requests.post per call without a Session (the old integration)
+    per-call     a fresh httpx.AsyncClient per call
+    pooled       the Agentive route handlers on app.http_client's shared pool
+
+By default the stub serves HTTPS with a throwaway self-signed certificate (made with the
+openssl CLI), so every new connection also pays for a TLS handshake:
+
+    python benchmarks/bench_http_client.py --calls 500 --concurrency 20
+    python benchmarks/bench_http_client.py --no-tls
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("AGENTIVE_API_KEY", "bench")
+
+import httpx
+import requests
+import uvicorn
+from fastapi import FastAPI, Request
+
+def create_stub(connections):
+    app = FastAPI()
+
+    # A connection is identified by the client's (host, port); keep-alive reuses it
+    @app.middleware("http")
+    async def count_connections(request: Request, call_next):
+        connections.add(request.scope["client"])
+        return await call_next(request)
+
+    @app.post("/api/chat/session")
+    async def create_session():
+        return {"session_id": "bench-session"}
+
+    @app.post("/api/chat")
+    async def chat(body: dict):
+        return {"response": f"echo: {body['messages'][-1]['content']}"}
+
+    return app
+
+def self_signed_cert(directory):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+def start_stub(connections, port, cert=None, key=None):
+    config = uvicorn.Config(create_stub(connections), host="127.0.0.1", port=port, log_level="warning", ssl_certfile=cert, ssl_keyfile=key)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return server
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def payload(index):
+    return {"api_key": "bench", "session_id": "bench-session", "type": "custom_code", "messages": [{"role": "user", "content": f"hello {index}"}]}
+
+async def run_requests(base_url, index):
+    # The old handlers were sync; run each call on a worker thread like FastAPI's threadpool did
+    await asyncio.to_thread(lambda: requests.post(f"{base_url}/chat", json=payload(index)).raise_for_status())
+
+async def run_per_call(base_url, index):
+    async with httpx.AsyncClient() as client:
+        (await client.post(f"{base_url}/chat", json=payload(index))).raise_for_status()
+
+async def run_pooled(base_url, index):
+    from app import agentive_integration
+    await agentive_integration.send_chat_message("bench-session", f"hello {index}")
+
+MODES = {"requests": run_requests, "per-call": run_per_call, "pooled": run_pooled}
+
+async def run_mode(mode, args, base_url, connections):
+    connections.clear()
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index):
+        async with semaphore:
+            started = time.perf_counter()
+            await MODES[mode](base_url, index)
+            latencies.append(time.perf_counter() - started)
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.calls)))
+    elapsed = time.perf_counter() - begin
+    latencies.sort()
+    print(
+        f"{mode:<9} calls={args.calls:>5} connections={len(connections):>5} throughput={args.calls / elapsed:7.1f}/s  "
+        f"p50={statistics.median(latencies) * 1000:7.2f}ms p99={latencies[int(0.99 * (len(latencies) - 1))] * 1000:7.2f}ms"
+    )
+
+async def main_async(args, base_url, connections):
+    from app.http_client import http_clients
+
+    # The integration logs every response at INFO
+    logging.disable(logging.INFO)
+    for mode in args.mode or list(MODES):
+        await run_mode(mode, args, base_url, connections)
+    await http_clients.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--no-tls", action="store_true")
+    parser.add_argument("--mode", choices=list(MODES), action="append")
+    args = parser.parse_args()
+
+    connections = set()
+    port = free_port()
+    cert = key = None
+    if not args.no_tls:
+        cert, key = self_signed_cert(tempfile.mkdtemp())
+        # Trust the throwaway certificate in requests and httpx
+        os.environ["REQUESTS_CA_BUNDLE"] = os.environ["SSL_CERT_FILE"] = cert
+    scheme = "http" if args.no_tls else "https"
+    base_url = f"{scheme}://127.0.0.1:{port}/api"
+    os.environ["AGENTIVE_BASE_URL"] = base_url
+
+    server = start_stub(connections, port, cert, key)
+    try:
+        asyncio.run(main_async(args, base_url, connections))
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-message cost of language detection: plain `langdetect.detect` (what every entry
+point used to call, up to three times per message) versus `app.language.language_of`.
+
+The workload mixes greetings, repeated questions and unique questions in EN and PT,
+and also reports how often each detector disagrees with itself across runs.
+
+    python benchmarks/bench_language_detection.py --messages 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import langdetect
+
+from app import language
+
+GREETINGS = ["Hello!", "hi", "Oi", "Olá", "bom dia", "thanks", "Obrigado!", "ok"]
+QUESTIONS = [
+    "How much does the monthly plan cost?",
+    "Can I schedule a demo for my team next week?",
+    "Does Medusa integrate with Webflow and Instagram?",
+    "Quanto custa o plano mensal?",
+    "Posso agendar uma demonstração para a minha equipe?",
+    "Vocês têm integração com o Instagram?",
+]
+
+def workload(count, rng):
+    messages = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.3:
+            messages.append(rng.choice(GREETINGS))
+        elif roll < 0.7:
+            messages.append(rng.choice(QUESTIONS))
+        else:
+            messages.append(f"{rng.choice(QUESTIONS)} (pedido #{i})")
+    return messages
+
+def run(label, detect, messages, calls_per_message):
+    timings = []
+    for message in messages:
+        start = time.perf_counter()
+        for _ in range(calls_per_message):
+            try:
+                detect(message)
+            except langdetect.LangDetectException:
+                pass
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"{label:<34} mean={statistics.mean(timings) * 1000:7.3f}ms p50={statistics.median(timings) * 1000:7.3f}ms "
+        f"p99={timings[int(0.99 * (len(timings) - 1))] * 1000:7.3f}ms"
+    )
+
+def unstable(detect, messages, repeats=5):
+    return sum(1 for message in set(messages) if len({detect(message) for _ in range(repeats)}) > 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    messages = workload(args.messages, random.Random(7))
+    langdetect.detect("warm up the default profiles")
+    language.init_language_detection()
+
+    run("langdetect.detect x3 (before)", langdetect.detect, messages, 3)
+    run("langdetect.detect x1", langdetect.detect, messages, 1)
+    run("language_of x1 (after)", language.language_of, messages, 1)
+    print(f"language_of cache: {language.stats()}")
+
+    sample = GREETINGS + QUESTIONS
+    print(f"unstable across 5 runs: langdetect={unstable(langdetect.detect, sample)} language_of={unstable(language.language_of, sample)} of {len(sample)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Lead keyword matching over synthetic chat messages: the old per-keyword substring scan
+plus un-compiled regexes versus the folded Aho-Corasick automaton in app.keyword_matcher
+(pure-Python and, when installed, the pyahocorasick extension).
+
+    python benchmarks/bench_lead_keywords.py --messages 1000000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.lead_detection import EMAIL_REGEX, ENGLISH_KEYWORDS, ENGLISH_SUFFIXES, PHONE_REGEX, PORTUGUESE_KEYWORDS, PORTUGUESE_SUFFIXES, lead_signals
+from app.keyword_matcher import KeywordAutomaton, ahocorasick
+
+FILLER_EN = "hello I was wondering whether your team could help us with the website and the social media accounts".split()
+FILLER_PT = "olá gostaria de saber se a equipe pode ajudar com o site e as redes sociais da empresa".split()
+
+def synthetic_messages(count, rng):
+    keywords = ENGLISH_KEYWORDS + PORTUGUESE_KEYWORDS
+    messages = []
+    for _ in range(count):
+        words = rng.sample(FILLER_EN if rng.random() < 0.5 else FILLER_PT, rng.randint(6, 14))
+        roll = rng.random()
+        if roll < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        elif roll < 0.25:
+            words.append("mail me at jane.doe@example.com")
+        elif roll < 0.3:
+            words.append("+5511987654321")
+        messages.append(" ".join(words))
+    return messages
+
+def old_detect(message, keywords):
+    lowered = message.lower()
+    return any(word in lowered for word in keywords) or bool(re.search(EMAIL_REGEX.pattern, message)) or bool(re.search(PHONE_REGEX.pattern, message))
+
+def new_detect(automaton):
+    def detect(message, languages):
+        return lead_signals(message, languages[0], automaton).is_lead
+    return detect
+
+def timed(label, fn, messages, arg_for):
+    start = time.perf_counter()
+    leads = sum(1 for i, message in enumerate(messages) if fn(message, arg_for(i)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:7.2f}s  {elapsed / len(messages) * 1e6:6.2f}us/message  leads={leads:,}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    messages = synthetic_messages(args.messages, rng)
+    langs = ["pt" if rng.random() < 0.5 else "en" for _ in messages]
+
+    timed("substring scan (before)", old_detect, messages,
+          lambda i: PORTUGUESE_KEYWORDS if langs[i] == "pt" else ENGLISH_KEYWORDS)
+    by_language = {"en": ENGLISH_KEYWORDS, "pt": PORTUGUESE_KEYWORDS}
+    suffixes = {"en": ENGLISH_SUFFIXES, "pt": PORTUGUESE_SUFFIXES}
+    timed("automaton, pure Python", new_detect(KeywordAutomaton(by_language, use_extension=False, suffixes_by_language=suffixes)), messages,
+          lambda i: (langs[i],))
+    if ahocorasick is not None:
+        timed("automaton, pyahocorasick", new_detect(KeywordAutomaton(by_language, suffixes_by_language=suffixes)), messages, lambda i: (langs[i],))
+    else:
+        print("pyahocorasick not installed; skipping the extension backend")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Prompt size and LLM latency over a long single-user conversation.
+
+Sends --turns messages from one user through the streaming chat pipeline, against the
+fake Assistants server in-process (prompt usage is whitespace tokens of the instructions
+plus the messages a run sees; each prompt token adds --prompt-token-ms of latency), in
+three modes:
+
+    full     every past turn is sent on every run (no window, no summary)
+    window   the token-budgeted history window, older turns trimmed
+    summary  the window plus the background summarizer folding older turns into a summary
+
+    python benchmarks/bench_long_conversation.py --turns 300 --prompt-token-ms 0.5
+
+Runs on a throwaway SQLite file; no OpenAI key or Postgres needed.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.sqlite3')}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("AGENTIVE_API_KEY", "bench")
+os.environ.setdefault("ASSISTANT_ID", "bench")
+
+import httpx
+import openai
+
+from app import chat_pipeline, history, llm_client
+from app.database import Base, engine
+from app.message_metrics import MessageMetrics
+from app.models import Chatbots
+from app.summarizer import conversation_summarizer
+from fake_llm_server import create_app
+
+CHECKPOINTS = (10, 25, 50, 100, 200, 300, 500, 1000)
+
+MESSAGES = [
+    "Hi, I'm looking for a plan for my team of {n} people",
+    "Can you compare the monthly and yearly prices again for option {n}?",
+    "We mostly need integrations with WhatsApp and our CRM, ticket {n}",
+    "What would onboarding look like if we start in week {n}?",
+]
+
+async def run_mode(mode, args):
+    history.conversation_history._cache.clear()
+    if mode == "full":
+        history.conversation_history.max_turns = 10 ** 9
+        history.HISTORY_TOKEN_BUDGET = 10 ** 9
+    else:
+        history.conversation_history.max_turns = history.HISTORY_MAX_TURNS
+        history.HISTORY_TOKEN_BUDGET = args.budget
+    if mode == "summary":
+        await conversation_summarizer.start()
+
+    user_id = f"bench-{mode}"
+    samples = []
+    for turn in range(1, args.turns + 1):
+        message = MESSAGES[turn % len(MESSAGES)].format(n=turn)
+        metrics = MessageMetrics()
+        chunks = [delta async for delta in chat_pipeline.stream_chat_reply(1, message, user_id, "en", metrics)]
+        await chat_pipeline.save_conversation(None, 1, message, "".join(chunks).strip(), "Web", user_id)
+        samples.append((metrics.prompt_tokens, metrics.llm_ms))
+
+    await conversation_summarizer.stop()
+    cells = []
+    for checkpoint in CHECKPOINTS:
+        if checkpoint > args.turns:
+            break
+        window = samples[max(0, checkpoint - 5):checkpoint]
+        cells.append(f"@{checkpoint}: {statistics.mean(t for t, _ in window):6.0f} tok {statistics.mean(ms for _, ms in window):6.1f}ms")
+    total = sum(t for t, _ in samples)
+    print(f"{mode:<8} total={total:>9} prompt tokens  " + "  ".join(cells))
+
+async def main_async(args):
+    fake = create_app(args.latency, token_delay=0, prompt_token_ms=args.prompt_token_ms)
+    llm_client._async_client = openai.AsyncOpenAI(
+        api_key="bench", base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake), base_url="http://fake/v1"),
+    )
+    for mode in args.mode or ["full", "window", "summary"]:
+        await run_mode(mode, args)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.01, help="Base seconds per fake run")
+    parser.add_argument("--prompt-token-ms", type=float, default=0.5)
+    parser.add_argument("--budget", type=int, default=history.HISTORY_TOKEN_BUDGET, help="History token budget")
+    parser.add_argument("--mode", choices=["full", "window", "summary"], action="append")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Chatbots.__table__.insert(), [{"id": 1, "name": "bench", "model": "", "prompt": "", "knowledge_base": "", "tools": ""}])
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
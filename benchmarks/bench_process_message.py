@@ -0,0 +1,104 @@
+"""
+Throughput benchmark for POST /chatbots/{id}/process_message against a stubbed slow LLM.
+
+Compares the async pipeline with the old blocking handler shape (sync `def` on the
+AnyIO threadpool) using the same simulated LLM latency. Runs fully in-process on an
+in-memory SQLite database, no OpenAI key or Postgres needed:
+
+    python benchmarks/bench_process_message.py --requests 2000 --concurrency 1000 --latency 1.0
+
+Requires the benchmark extras: httpx and aiosqlite.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("AGENTIVE_API_KEY", "bench")
+os.environ.setdefault("ASSISTANT_ID", "bench")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import chat_pipeline
+from app.api import websockets
+from app.database import Base, get_async_db
+from app.models import Chatbots
+
+
+def build_app(latency: float) -> FastAPI:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    async def slow_llm(system_instruction, user_message, thread_id=None, metrics=None, run_options=None, history=None):
+        await asyncio.sleep(latency)
+        return f"echo: {user_message}"
+
+    chat_pipeline.generate_reply = slow_llm
+
+    app = FastAPI()
+    app.include_router(websockets.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    # Old handler shape: a sync def blocking a threadpool worker for the whole LLM call
+    @app.post("/blocking/{id}/process_message")
+    def blocking_process_message(id: int, message: websockets.ChatbotMessage):
+        time.sleep(latency)
+        return {"chatbot_id": id, "user_message": message.user_message, "bot_response": "echo"}
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            db.add(Chatbots(id=1, name="bench", model="gpt-4", prompt="", knowledge_base="", tools=""))
+            await db.commit()
+
+    app.state.setup = setup
+    app.state.engine = engine
+    return app
+
+
+async def drive(app: FastAPI, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            async with semaphore:
+                response = await client.post(path, json={"user_message": f"Hello {i}"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=1.0, help="Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    app = build_app(args.latency)
+    await app.state.setup()
+
+    for label, path in (("blocking (threadpool)", "/blocking/1/process_message"), ("async pipeline", "/chatbots/1/process_message")):
+        elapsed = await drive(app, path, args.requests, args.concurrency)
+        print(f"{label:>22}: {args.requests} requests in {elapsed:6.2f}s -> {args.requests / elapsed:8.1f} req/s")
+
+    await app.state.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Circuit breaker and bulkhead around the OpenAI provider, against the fault-injecting fake
+Assistants server in-process.
+
+Sends chat messages through the pipeline at --concurrency for three phases of
+--phase-seconds each: healthy, faulty (every run fails with a 500, or with --fault slow
+takes --slow-seconds longer), and recovered. Per phase it reports replies, 503s (or
+fallbacks), 500s and latency, and the circuit transitions seen:
+
+    python benchmarks/bench_resilience.py --fault errors
+    python benchmarks/bench_resilience.py --fault slow --slow-seconds 5
+    python benchmarks/bench_resilience.py --fault slow --breaker off
+
+With --breaker off the circuit never opens, so a failing provider keeps taking (and
+timing out) every request. Runs on a throwaway SQLite file; no OpenAI key needed.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.sqlite3')}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("AGENTIVE_API_KEY", "bench")
+os.environ.setdefault("ASSISTANT_ID", "bench")
+# Short windows so a whole run fits in a few seconds
+os.environ.setdefault("BREAKER_WINDOW_SECONDS", "2")
+os.environ.setdefault("BREAKER_OPEN_SECONDS", "1")
+os.environ.setdefault("RESILIENCE_TIMEOUT_SECONDS_OPENAI", "2")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fault", choices=["errors", "slow"], default="errors")
+    parser.add_argument("--slow-seconds", type=float, default=5.0, help="Injected latency with --fault slow")
+    parser.add_argument("--phase-seconds", type=float, default=4.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per healthy fake run")
+    parser.add_argument("--breaker", choices=["on", "off"], default="on")
+    return parser.parse_args()
+
+ARGS = parse_args()
+if ARGS.breaker == "off":
+    os.environ["BREAKER_MIN_CALLS"] = str(10 ** 9)
+
+import httpx
+import openai
+from fastapi import HTTPException
+
+from app import chat_pipeline, llm_client, resilience
+from app.database import Base, engine
+from app.models import Chatbots
+from fake_llm_server import create_app
+
+async def run_phase(name, fake, faults, sequence):
+    fake.state.faults.update(faults)
+    guard = resilience.guard_for("openai")
+    transitions_before = guard.breaker.transitions
+    outcomes = {"ok": 0, "unavailable": 0, "error": 0}
+    latencies = []
+    deadline = time.monotonic() + ARGS.phase_seconds
+
+    async def user():
+        while time.monotonic() < deadline:
+            index = next(sequence)
+            started = time.perf_counter()
+            try:
+                reply = await chat_pipeline.generate_chat_reply(1, f"bench message {index}", None, "en")
+                outcomes["unavailable" if reply == guard.fallback and guard.fallback else "ok"] += 1
+            except HTTPException as e:
+                outcomes["unavailable" if e.status_code == 503 else "error"] += 1
+                if e.status_code == 503:
+                    # Like a client honouring Retry-After, but shortened to keep the phase busy
+                    await asyncio.sleep(0.05)
+            latencies.append(time.perf_counter() - started)
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(ARGS.concurrency)))
+    elapsed = time.perf_counter() - begin
+    latencies.sort()
+    total = len(latencies)
+    print(
+        f"{name:<9} requests={total:>5} ok={outcomes['ok']:>5} 503={outcomes['unavailable']:>5} 500={outcomes['error']:>5}  "
+        f"throughput={total / elapsed:7.1f}/s p50={statistics.median(latencies) * 1000:8.1f}ms "
+        f"p99={latencies[int(0.99 * (total - 1))] * 1000:8.1f}ms  "
+        f"circuit={guard.breaker.state} transitions={guard.breaker.transitions - transitions_before}"
+    )
+
+async def main_async():
+    fake = create_app(ARGS.latency, token_delay=0)
+    # The SDK's own retries would hide the injected 500s from the breaker's accounting
+    llm_client._async_client = openai.AsyncOpenAI(
+        api_key="bench", base_url="http://fake/v1", max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake), base_url="http://fake/v1", timeout=60),
+    )
+    fault = {"error_rate": 1.0, "extra_latency": 0.0} if ARGS.fault == "errors" else {"error_rate": 0.0, "extra_latency": ARGS.slow_seconds}
+    sequence = iter(range(10 ** 9))
+    await run_phase("healthy", fake, {"error_rate": 0.0, "extra_latency": 0.0}, sequence)
+    await run_phase("faulty", fake, fault, sequence)
+    await run_phase("recovered", fake, {"error_rate": 0.0, "extra_latency": 0.0}, sequence)
+
+def main():
+    # Every failed call is logged at ERROR/WARNING; keep the report readable
+    logging.disable(logging.CRITICAL)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Chatbots.__table__.insert(), [{"id": 1, "name": "bench", "model": "", "prompt": "", "knowledge_base": "", "tools": ""}])
+    print(f"fault={ARGS.fault} breaker={ARGS.breaker} concurrency={ARGS.concurrency} phase={ARGS.phase_seconds}s")
+    asyncio.run(main_async())
+
+if __name__ == "__main__":
+    main()
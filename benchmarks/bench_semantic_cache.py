@@ -0,0 +1,116 @@
+"""
+Lookup latency of the semantic cache index at 100k and 1M cached entries.
+
+Fills a SemanticIndex with synthetic questions (embedded in bulk with the cheap
+HashingEmbedder, so the numbers are the index's own cost), then times single-message
+lookups: embedding the query plus the matrix-vector search.
+
+    python benchmarks/bench_semantic_cache.py --sizes 100000 1000000 --queries 500
+
+With --calibrate it instead scores labelled question pairs (paraphrases, and questions
+that differ in meaning) with the configured embedder, and reports which pairs the
+cache would treat as the same question at the threshold in use. Extend PAIRS with real
+questions from the bot before trusting a threshold:
+
+    python benchmarks/bench_semantic_cache.py --calibrate
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.semantic_cache import SEMANTIC_CACHE_CANDIDATES, HashingEmbedder, SemanticCache, SemanticIndex
+
+TOPICS = ["payroll", "invoicing", "onboarding", "CRM sync", "lead scoring", "reporting", "email campaigns", "inventory"]
+VERBS = ["automate", "speed up", "monitor", "fix", "schedule", "integrate", "audit"]
+TAILS = ["in Medusa", "for my team", "with Webflow", "on Instagram", "every month", "without code"]
+
+# (question, question, same meaning?)
+PAIRS = [
+    ("How do I automate payroll in Medusa?", "How do I automate payroll processing in Medusa?", True),
+    ("automate payroll", "automate payroll processing", True),
+    ("How much does the Pro plan cost?", "What is the price of the Pro plan?", True),
+    ("Can I connect Medusa to WhatsApp?", "Is there a WhatsApp integration?", True),
+    ("how do i reset my password", "How do I reset my password?", True),
+    ("Como automatizar a folha de pagamento?", "Como automatizo a folha de pagamento?", True),
+    ("Can I schedule a demo for next week?", "Can I cancel a demo for next week?", False),
+    ("Does Medusa integrate with SAP?", "Does Medusa integrate with Oracle?", False),
+    ("What does the plan cost for 10 users?", "What does the plan cost for 500 users?", False),
+    ("How do I add a user to my team?", "How do I remove a user from my team?", False),
+    ("Is the yearly plan refundable?", "Is the monthly plan refundable?", False),
+]
+
+
+def calibrate():
+    cache = SemanticCache(enabled_chatbots="*")
+    embedder = asyncio.run(cache.load())
+    if embedder is None:
+        sys.exit("No embedder: install sentence-transformers or set SEMANTIC_CACHE_EMBEDDER")
+    same_question = getattr(embedder, "same_question", None)
+    print(f"embedder={type(embedder).__name__} threshold={cache.threshold}")
+    wrong = 0
+    for first, second, same in PAIRS:
+        vectors = embedder.embed([first, second])
+        similarity = float(vectors[0] @ vectors[1])
+        hit = similarity >= cache.threshold and (same_question is None or same_question(second, first))
+        wrong += hit != same
+        verdict = "ok   " if hit == same else ("FALSE HIT " if hit else "missed")
+        print(f"{verdict:<10} {similarity:.3f} {'same' if same else 'diff'}  {first!r} / {second!r}")
+    print(f"{wrong} of {len(PAIRS)} pairs judged wrongly; false hits serve a wrong answer, misses only cost an LLM call")
+
+
+def synthetic_questions(count, rng):
+    return [
+        f"How do I {rng.choice(VERBS)} {rng.choice(TOPICS)} {rng.choice(TAILS)} #{i}"
+        for i in range(count)
+    ]
+
+
+def build_index(embedder, size, rng, batch=50000):
+    index = SemanticIndex(embedder.dim, max_entries=size, initial_capacity=size)
+    start = time.perf_counter()
+    for offset in range(0, size, batch):
+        questions = synthetic_questions(min(batch, size - offset), rng)
+        index.add_many(embedder.embed(questions), questions, questions)
+    return index, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--calibrate", action="store_true")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibrate()
+        return
+
+    rng = random.Random(7)
+    embedder = HashingEmbedder(args.dim)
+    queries = [f"How do I {rng.choice(VERBS)} {rng.choice(TOPICS)} {rng.choice(TAILS)}?" for _ in range(args.queries)]
+
+    for size in args.sizes:
+        index, build_seconds = build_index(embedder, size, rng)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(embedder.embed([query])[0], SEMANTIC_CACHE_CANDIDATES)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(
+            f"entries={size:>9,} dim={args.dim} index={index._vectors.nbytes / 2**20:7.1f} MiB build={build_seconds:6.1f}s "
+            f"lookup p50={statistics.median(timings) * 1000:6.2f}ms "
+            f"p99={timings[int(0.99 * (len(timings) - 1))] * 1000:6.2f}ms"
+        )
+        del index
+
+
+if __name__ == "__main__":
+    main()
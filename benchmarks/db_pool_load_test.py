@@ -0,0 +1,132 @@
+"""
+Connection-pool load test: an open-loop request stream against a sync endpoint that holds
+a pooled connection for --query-ms, comparing SQLAlchemy's default pool (5 + 10 overflow,
+30s timeout) with the sync engine's pool as configured from the DB_* environment variables
+(5 + 5 by default, DB_POOL_SIZE_SYNC / DB_MAX_OVERFLOW_SYNC to change it).
+
+Requests are sent in process through httpx's ASGI transport, so sync endpoints run on the
+same 40-thread pool they use under uvicorn. At 200 RPS and 100ms queries about 20
+connections are busy at any time, more than the sync pool is sized for (it only serves
+admin and dashboard routes): use this to size DB_POOL_SIZE_SYNC for such a load, within the
+per-process connection budget described in app/database.py. The configured pool's short
+DB_POOL_TIMEOUT turns an undersized pool into fast errors instead of 30s queues.
+
+    python benchmarks/db_pool_load_test.py --rps 200 --seconds 20 --query-ms 100
+    python benchmarks/db_pool_load_test.py --url postgresql://localhost/medusa_bench --profile configured
+
+Without --url (or BENCH_DATABASE_URL) it runs against a throwaway SQLite file, with the
+query delay emulated by a registered sleep function.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import database
+
+PROFILES = {
+    "default": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30},
+    "configured": database.pool_options("sync"),
+}
+
+def build_engine(url, profile):
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False}, **PROFILES[profile])
+
+        @event.listens_for(engine, "connect")
+        def register_sleep(dbapi_connection, _):
+            dbapi_connection.create_function("pg_sleep", 1, time.sleep)
+
+        return engine
+    return create_engine(url, **PROFILES[profile])
+
+def create_app(engine, query_seconds, waits):
+    SessionLocal = sessionmaker(bind=engine)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    # Same shape as the repo's sync endpoints: a threadpool worker holding a session for the query
+    @app.get("/work")
+    def work(db: Session = Depends(get_db)):
+        started = time.perf_counter()
+        db.connection()
+        waits.append(time.perf_counter() - started)
+        db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": query_seconds})
+        return {"ok": True}
+
+    return app
+
+def percentile(values, fraction):
+    return values[int(fraction * (len(values) - 1))] if values else 0.0
+
+async def run_profile(args, profile):
+    engine = build_engine(args.url, profile)
+    waits = []
+    app = create_app(engine, args.query_ms / 1000, waits)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    latencies, failures = [], 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one():
+            nonlocal failures
+            started = time.perf_counter()
+            response = await client.get("/work")
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+        # Open loop: requests are issued on schedule whether or not earlier ones have finished
+        tasks = []
+        begin = time.perf_counter()
+        for index in range(int(args.rps * args.seconds)):
+            delay = begin + index / args.rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one()))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - begin
+
+    engine.dispose()
+    latencies.sort()
+    waits.sort()
+    print(
+        f"{profile:<11} {PROFILES[profile]['pool_size']:>3}+{PROFILES[profile]['max_overflow']:<3} "
+        f"ok={len(latencies):>6} failed={failures:>5} throughput={len(latencies) / elapsed:7.1f}/s  "
+        f"latency p50={statistics.median(latencies) * 1000 if latencies else 0:8.1f}ms p99={percentile(latencies, 0.99) * 1000:8.1f}ms  "
+        f"checkout wait p99={percentile(waits, 0.99) * 1000:8.1f}ms max={(waits[-1] if waits else 0) * 1000:8.1f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--rps", type=float, default=200)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--query-ms", type=float, default=100)
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+    if not args.url:
+        args.url = f"sqlite:///{tempfile.mktemp(suffix='.sqlite3')}"
+
+    for profile in args.profile or ["default", "configured"]:
+        asyncio.run(run_profile(args, profile))
+
+if __name__ == "__main__":
+    main()
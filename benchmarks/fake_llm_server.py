@@ -0,0 +1,205 @@
+"""
+Local stand-in for the OpenAI Assistants Threads endpoints used by Medusa.
+
+Every run takes --latency seconds to "generate" its reply (polled runs report
+`in_progress` until then), so load tests can exercise
+the real AsyncOpenAI client end to end without an API key. Streaming runs
+(`stream: true`) emit the first token after --latency seconds and one more word every
+--token-delay seconds. Runs honour `truncation_strategy`, report whitespace token usage for
+the instructions and the messages they see, and take --prompt-token-ms longer per prompt
+token; /v1/chat/completions (conversation summaries) echoes the tail of its input.
+
+Faults can be injected to exercise the circuit breaker: a share of runs and completions
+(--error-rate) fail with a 500, and every one of them takes --extra-latency seconds
+longer. Both can be changed while the server runs with POST /fault
+{"error_rate": 0.5, "extra_latency": 0}:
+
+    python benchmarks/fake_llm_server.py --port 8100 --latency 1.5 --token-delay 0.05
+    python benchmarks/fake_llm_server.py --port 8100 --error-rate 0.3
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_ids = itertools.count(1)
+
+
+def create_app(latency: float, token_delay: float = 0.05, prompt_token_ms: float = 0.0, error_rate: float = 0.0, extra_latency: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    threads = {}
+    runs = {}
+    cancelled = set()
+    # Mutable so /fault (or an in-process benchmark through app.state.faults) can change them mid-run
+    faults = app.state.faults = {"error_rate": error_rate, "extra_latency": extra_latency}
+
+    def injected_error():
+        if random.random() >= faults["error_rate"]:
+            return None
+        return JSONResponse({"error": {"message": "Injected fault", "type": "server_error", "param": None, "code": None}}, status_code=500)
+
+    @app.post("/fault")
+    async def set_fault(body: dict):
+        faults.update({key: float(value) for key, value in body.items() if key in faults})
+        return faults
+
+    def new_id(prefix):
+        return f"{prefix}_{next(_ids)}"
+
+    def run_object(thread_id, run_id, status, usage=None):
+        return {
+            "id": run_id,
+            "object": "thread.run",
+            "thread_id": thread_id,
+            "assistant_id": "asst_fake",
+            "status": status,
+            "created_at": int(time.time()),
+            "usage": usage,
+        }
+
+    def usage_for(prompt, reply):
+        # Rough whitespace token counts, enough to exercise the usage bookkeeping
+        prompt_tokens, completion_tokens = len(prompt.split()), len(reply.split())
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def message_object(thread_id, run_id, role, text):
+        return {
+            "id": new_id("msg"),
+            "object": "thread.message",
+            "thread_id": thread_id,
+            "run_id": run_id,
+            "role": role,
+            "created_at": int(time.time()),
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+
+    @app.post("/v1/threads")
+    async def create_thread(request: Request):
+        body = await request.json() if await request.body() else {}
+        thread_id = new_id("thread")
+        threads[thread_id] = [message_object(thread_id, None, m["role"], m["content"]) for m in body.get("messages", [])]
+        return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}}
+
+    @app.post("/v1/threads/{thread_id}/runs")
+    async def create_run(thread_id: str, request: Request):
+        body = await request.json()
+        error = injected_error()
+        if error is not None:
+            await asyncio.sleep(faults["extra_latency"])
+            return error
+        run_id = new_id("run")
+        history = threads.setdefault(thread_id, [])
+        for message in body.get("additional_messages") or []:
+            history.append(message_object(thread_id, run_id, message["role"], message["content"]))
+
+        last_user = history[-1]["content"][0]["text"]["value"] if history else ""
+        reply = f"Medusa says: {last_user}"
+
+        visible = history
+        truncation = body.get("truncation_strategy") or {}
+        if truncation.get("type") == "last_messages":
+            visible = history[-truncation["last_messages"]:]
+        prompt = " ".join([body.get("additional_instructions") or ""] + [m["content"][0]["text"]["value"] for m in visible])
+        usage = usage_for(prompt, reply)
+        run_latency = latency + faults["extra_latency"] + usage["prompt_tokens"] * prompt_token_ms / 1000
+
+        if body.get("stream"):
+            return StreamingResponse(stream_run(thread_id, run_id, reply, usage, run_latency), media_type="text/event-stream")
+
+        # Non-streaming runs come back queued and complete `latency` seconds later, like the real API
+        runs[run_id] = (time.monotonic() + run_latency, thread_id, reply, usage)
+        return run_object(thread_id, run_id, "queued")
+
+    def finish_run(run_id):
+        done_at, thread_id, reply, usage = runs[run_id]
+        if time.monotonic() < done_at:
+            return False
+        if reply is not None:
+            threads[thread_id].append(message_object(thread_id, run_id, "assistant", reply))
+            runs[run_id] = (done_at, thread_id, None, usage)
+        return True
+
+    async def stream_run(thread_id, run_id, reply, usage, run_latency):
+        def sse(event, data):
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+        message_id = new_id("msg")
+        yield sse("thread.run.created", run_object(thread_id, run_id, "queued"))
+        await asyncio.sleep(run_latency)
+        for index, word in enumerate(reply.split(" ")):
+            if index:
+                await asyncio.sleep(token_delay)
+            delta = {"content": [{"index": 0, "type": "text", "text": {"value": word if index == 0 else f" {word}"}}]}
+            yield sse("thread.message.delta", {"id": message_id, "object": "thread.message.delta", "delta": delta})
+        threads[thread_id].append(message_object(thread_id, run_id, "assistant", reply))
+        yield sse("thread.run.completed", run_object(thread_id, run_id, "completed", usage))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    @app.post("/v1/threads/{thread_id}/runs/{run_id}/cancel")
+    async def cancel_run(thread_id: str, run_id: str):
+        cancelled.add(run_id)
+        return run_object(thread_id, run_id, "cancelled")
+
+    @app.get("/v1/threads/{thread_id}/runs/{run_id}")
+    async def retrieve_run(thread_id: str, run_id: str):
+        if run_id in cancelled:
+            return run_object(thread_id, run_id, "cancelled")
+        if finish_run(run_id):
+            return run_object(thread_id, run_id, "completed", runs[run_id][3])
+        return run_object(thread_id, run_id, "in_progress")
+
+    @app.get("/v1/threads/{thread_id}/messages")
+    async def list_messages(thread_id: str, run_id: str = None, order: str = "desc", limit: int = 20):
+        data = [m for m in threads.get(thread_id, []) if run_id is None or m["run_id"] == run_id]
+        if order == "desc":
+            data = list(reversed(data))
+        data = data[:limit]
+        return {
+            "object": "list",
+            "data": data,
+            "first_id": data[0]["id"] if data else None,
+            "last_id": data[-1]["id"] if data else None,
+            "has_more": False,
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completion(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency + faults["extra_latency"])
+        error = injected_error()
+        if error is not None:
+            return error
+        words = body["messages"][-1]["content"].split()
+        text = " ".join(words[-((body.get("max_tokens") or 100) // 2):])
+        return {
+            "id": new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": usage_for(" ".join(words), text),
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds each run takes to complete")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds between streamed words")
+    parser.add_argument("--prompt-token-ms", type=float, default=0.0, help="Extra milliseconds per prompt token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of runs that fail with a 500")
+    parser.add_argument("--extra-latency", type=float, default=0.0, help="Injected seconds added to every run")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.token_delay, args.prompt_token_ms, args.error_rate, args.extra_latency), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,157 @@
+"""
+WebSocket load test for /chatbots/ws/chatbot/{user_id}.
+
+Starts the fake LLM server and a Medusa worker serving the WebSocket router (both as
+subprocesses), opens --sockets concurrent connections, sends --messages messages on
+each and reports per-message latency percentiles (plus time-to-first-token with --stream):
+
+    python benchmarks/ws_load_test.py --sockets 1000 --messages 5 --latency 1.0
+    python benchmarks/ws_load_test.py --sockets 1000 --messages 5 --latency 1.0 --stream
+
+Point --url at an already running deployment to skip the local servers. Requires the
+`websockets` client package. Raise `ulimit -n` above 2x --sockets when running locally.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+
+
+def create_ws_app():
+    """Uvicorn factory: a Medusa worker exposing only the chat WebSocket router."""
+    sys.path.insert(0, REPO_ROOT)
+    from fastapi import FastAPI
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app import chatbot_config, history, thread_sessions
+    from app.api import websockets
+    from app.database import Base
+    from app.models import Chatbots
+
+    # Thread sessions and the load-test chatbot live in a throwaway SQLite file instead of Postgres
+    db_path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"medusa_ws_load_{os.getpid()}.sqlite3")
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(Chatbots.__table__.insert(), [{"id": 1, "name": "load-test", "model": "", "prompt": "", "knowledge_base": "", "tools": ""}])
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"timeout": 60})
+    thread_sessions.AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    chatbot_config.AsyncSessionLocal = thread_sessions.AsyncSessionLocal
+    history.AsyncSessionLocal = thread_sessions.AsyncSessionLocal
+
+    app = FastAPI()
+    app.include_router(websockets.router)
+    return app
+
+
+def start_servers(args):
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "load-test")
+    env.setdefault("AGENTIVE_API_KEY", "load-test")
+    env.setdefault("ASSISTANT_ID", "load-test")
+    env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+
+    llm = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_llm_server.py"), "--port", str(args.llm_port), "--latency", str(args.latency)],
+        env=env,
+    )
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "--app-dir", BENCH_DIR, "ws_load_test:create_ws_app",
+         "--port", str(args.app_port), "--log-level", "warning"],
+        env=env,
+        cwd=REPO_ROOT,
+    )
+    return [llm, worker]
+
+
+async def wait_for_port(port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+async def run_socket(url, user_id, messages, stream, latencies, first_tokens, errors):
+    import websockets
+
+    async with websockets.connect(f"{url}/{user_id}", open_timeout=60, max_queue=None) as ws:
+        for i in range(messages):
+            start = time.perf_counter()
+            await ws.send(json.dumps({"chatbot_id": 1, "user_message": f"Hello number {i} from {user_id}", "stream": stream}))
+            first_token = None
+            while True:
+                reply = json.loads(await ws.recv())
+                if "delta" in reply:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    continue
+                break
+            if "error" in reply:
+                errors.append(reply["error"])
+                continue
+            latencies.append(time.perf_counter() - start)
+            first_tokens.append(first_token if first_token is not None else latencies[-1])
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=5, help="Messages sent sequentially on each socket")
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake LLM latency per run in seconds")
+    parser.add_argument("--stream", action="store_true", help="Ask for token streaming and report time-to-first-token")
+    parser.add_argument("--url", default=None, help="Base WebSocket URL, e.g. ws://host/chatbots/ws/chatbot")
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--app-port", type=int, default=8101)
+    args = parser.parse_args()
+
+    processes = []
+    url = args.url
+    if url is None:
+        processes = start_servers(args)
+        await wait_for_port(args.llm_port)
+        await wait_for_port(args.app_port)
+        url = f"ws://127.0.0.1:{args.app_port}/chatbots/ws/chatbot"
+
+    latencies, first_tokens, errors = [], [], []
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_socket(url, f"load-{n}", args.messages, args.stream, latencies, first_tokens, errors)
+            for n in range(args.sockets)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    print(f"sockets={args.sockets} messages/socket={args.messages} llm_latency={args.latency:.2f}s wall={elapsed:.2f}s")
+    print(f"replies={len(latencies)} errors={len(errors)} throughput={len(latencies) / elapsed:.1f} msg/s")
+    if latencies:
+        print(
+            f"latency p50={percentile(latencies, 50) * 1000:.0f}ms "
+            f"p99={percentile(latencies, 99) * 1000:.0f}ms "
+            f"max={max(latencies) * 1000:.0f}ms mean={statistics.mean(latencies) * 1000:.0f}ms"
+        )
+        print(f"first token p50={percentile(first_tokens, 50) * 1000:.0f}ms p99={percentile(first_tokens, 99) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
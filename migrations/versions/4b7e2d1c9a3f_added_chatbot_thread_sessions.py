@@ -0,0 +1,35 @@
+"""Added chatbot thread sessions
+
+Revision ID: 4b7e2d1c9a3f
+Revises: 28839c93b9f3
+Create Date: 2026-10-18 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2d1c9a3f'
+down_revision: Union[str, None] = '28839c93b9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chatbot_thread_sessions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('chatbot_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('thread_id', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['chatbot_id'], ['chatbots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chatbot_id', 'user_id', name='uq_chatbot_thread_sessions_chatbot_user')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chatbot_thread_sessions')
@@ -0,0 +1,36 @@
+"""Added conversation and lead indexes
+
+Revision ID: 7c1e5a2b9d40
+Revises: 4b7e2d1c9a3f
+Create Date: 2026-10-18 14:03:27.561902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a2b9d40'
+down_revision: Union[str, None] = '4b7e2d1c9a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ✅ CONCURRENTLY keeps the tables writable while the indexes build (needs to run outside a transaction)
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chatbot_conversations_chatbot_id_timestamp "
+            "ON chatbot_conversations (chatbot_id, timestamp DESC NULLS LAST, id DESC)"
+        )
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chatbot_leads_chatbot_id ON chatbot_leads (chatbot_id)")
+        # Redundant with the primary key index
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chatbot_conversations_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chatbot_conversations_id ON chatbot_conversations (id)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chatbot_leads_chatbot_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chatbot_conversations_chatbot_id_timestamp")
@@ -0,0 +1,116 @@
+"""Partition chatbot_conversations by month (optional)
+
+Only runs when requested, because it rewrites the whole table:
+
+    alembic -x partition_conversations=true upgrade head
+
+Without the flag the revision is recorded and nothing changes; app.partitions keeps
+creating future monthly partitions once the table is partitioned.
+
+Revision ID: 9e4f6b3a1c57
+Revises: 7c1e5a2b9d40
+Create Date: 2026-10-18 14:31:09.284417
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4f6b3a1c57'
+down_revision: Union[str, None] = '7c1e5a2b9d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _requested() -> bool:
+    return context.get_x_argument(as_dictionary=True).get("partition_conversations", "").lower() in ("1", "true", "yes")
+
+
+def _is_partitioned(conn) -> bool:
+    return bool(conn.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'chatbot_conversations' AND pg_table_is_visible(c.oid))"
+    )).scalar())
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not _requested() or _is_partitioned(conn):
+        return
+
+    op.execute("ALTER TABLE chatbot_conversations RENAME TO chatbot_conversations_unpartitioned")
+    op.execute("ALTER INDEX chatbot_conversations_pkey RENAME TO chatbot_conversations_unpartitioned_pkey")
+    op.execute(
+        "ALTER INDEX IF EXISTS ix_chatbot_conversations_chatbot_id_timestamp "
+        "RENAME TO ix_chatbot_conversations_unpartitioned_chatbot_id_timestamp"
+    )
+
+    # The primary key of a partitioned table must include the (nullable) timestamp, so id gets a plain index instead
+    op.execute(
+        "CREATE TABLE chatbot_conversations (LIKE chatbot_conversations_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (\"timestamp\")"
+    )
+    op.execute(
+        "ALTER TABLE chatbot_conversations ADD CONSTRAINT chatbot_conversations_chatbot_id_fkey "
+        "FOREIGN KEY (chatbot_id) REFERENCES chatbots (id)"
+    )
+    # Rows with a NULL or out-of-range timestamp land here
+    op.execute("CREATE TABLE chatbot_conversations_default PARTITION OF chatbot_conversations DEFAULT")
+
+    oldest = conn.execute(sa.text('SELECT min("timestamp") FROM chatbot_conversations_unpartitioned')).scalar()
+    this_month = datetime.datetime.utcnow().date().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE chatbot_conversations_p{month:%Y%m} PARTITION OF chatbot_conversations "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute("INSERT INTO chatbot_conversations SELECT * FROM chatbot_conversations_unpartitioned")
+    op.execute("ALTER SEQUENCE chatbot_conversations_id_seq OWNED BY chatbot_conversations.id")
+    op.execute("DROP TABLE chatbot_conversations_unpartitioned")
+
+    op.execute("CREATE INDEX ix_chatbot_conversations_id ON chatbot_conversations (id)")
+    op.execute(
+        "CREATE INDEX ix_chatbot_conversations_chatbot_id_timestamp "
+        "ON chatbot_conversations (chatbot_id, \"timestamp\" DESC NULLS LAST, id DESC)"
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if not _is_partitioned(conn):
+        return
+
+    op.execute("ALTER TABLE chatbot_conversations RENAME TO chatbot_conversations_partitioned")
+    op.execute("ALTER INDEX ix_chatbot_conversations_id RENAME TO ix_chatbot_conversations_partitioned_id")
+    op.execute(
+        "ALTER INDEX ix_chatbot_conversations_chatbot_id_timestamp "
+        "RENAME TO ix_chatbot_conversations_partitioned_chatbot_id_timestamp"
+    )
+
+    op.execute("CREATE TABLE chatbot_conversations (LIKE chatbot_conversations_partitioned INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE chatbot_conversations ADD CONSTRAINT chatbot_conversations_pkey PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE chatbot_conversations ADD CONSTRAINT chatbot_conversations_chatbot_id_fkey "
+        "FOREIGN KEY (chatbot_id) REFERENCES chatbots (id)"
+    )
+    op.execute("INSERT INTO chatbot_conversations SELECT * FROM chatbot_conversations_partitioned")
+    op.execute("ALTER SEQUENCE chatbot_conversations_id_seq OWNED BY chatbot_conversations.id")
+    op.execute("DROP TABLE chatbot_conversations_partitioned CASCADE")
+
+    op.execute(
+        "CREATE INDEX ix_chatbot_conversations_chatbot_id_timestamp "
+        "ON chatbot_conversations (chatbot_id, \"timestamp\" DESC NULLS LAST, id DESC)"
+    )
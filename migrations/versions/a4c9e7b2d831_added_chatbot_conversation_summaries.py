@@ -0,0 +1,36 @@
+"""Added chatbot conversation summaries
+
+Revision ID: a4c9e7b2d831
+Revises: f2b6d9e4a718
+Create Date: 2026-10-18 18:02:31.447219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e7b2d831'
+down_revision: Union[str, None] = 'f2b6d9e4a718'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chatbot_conversation_summaries',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('chatbot_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('through_conversation_id', sa.Integer(), nullable=False),
+    sa.Column('turns_summarized', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['chatbot_id'], ['chatbots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chatbot_id', 'user_id', name='uq_chatbot_conversation_summaries_chatbot_user')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chatbot_conversation_summaries')
@@ -0,0 +1,37 @@
+"""Added chatbot analytics rollups
+
+Revision ID: b5e8c2d4f613
+Revises: 9e4f6b3a1c57
+Create Date: 2026-10-18 15:12:54.730118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8c2d4f613'
+down_revision: Union[str, None] = '9e4f6b3a1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chatbot_analytics_rollups',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('chatbot_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('messages_processed', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('leads_detected', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('response_time_ms_total', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('response_time_samples', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['chatbot_id'], ['chatbots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chatbot_id', 'bucket_start', name='uq_chatbot_analytics_rollups_chatbot_bucket')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chatbot_analytics_rollups')
@@ -0,0 +1,40 @@
+"""Added message timings and token usage to analytics rollups
+
+Revision ID: d3a7f1c8e265
+Revises: b5e8c2d4f613
+Create Date: 2026-10-18 16:40:12.318904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7f1c8e265'
+down_revision: Union[str, None] = 'b5e8c2d4f613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    ('language_ms_total', sa.BigInteger()),
+    ('language_samples', sa.Integer()),
+    ('llm_ms_total', sa.BigInteger()),
+    ('llm_samples', sa.Integer()),
+    ('first_token_ms_total', sa.BigInteger()),
+    ('first_token_samples', sa.Integer()),
+    ('db_write_ms_total', sa.BigInteger()),
+    ('db_write_samples', sa.Integer()),
+    ('prompt_tokens', sa.BigInteger()),
+    ('completion_tokens', sa.BigInteger()),
+)
+
+
+def upgrade() -> None:
+    for name, type_ in COLUMNS:
+        op.add_column('chatbot_analytics_rollups', sa.Column(name, type_, server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    for name, _ in reversed(COLUMNS):
+        op.drop_column('chatbot_analytics_rollups', name)
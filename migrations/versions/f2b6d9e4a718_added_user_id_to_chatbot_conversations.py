@@ -0,0 +1,43 @@
+"""Added user_id to chatbot_conversations
+
+Revision ID: f2b6d9e4a718
+Revises: d3a7f1c8e265
+Create Date: 2026-10-18 17:12:44.908135
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d9e4a718'
+down_revision: Union[str, None] = 'd3a7f1c8e265'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_partitioned(conn) -> bool:
+    return bool(conn.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'chatbot_conversations' AND pg_table_is_visible(c.oid))"
+    )).scalar())
+
+
+def upgrade() -> None:
+    # A nullable column without a default is a catalog-only change, even on a large table
+    op.add_column('chatbot_conversations', sa.Column('user_id', sa.String(), nullable=True))
+
+    columns = "ON chatbot_conversations (chatbot_id, user_id, id DESC) WHERE user_id IS NOT NULL"
+    if _is_partitioned(op.get_bind()):
+        # CONCURRENTLY is not supported on a partitioned parent; no existing row has a user_id, so the build is quick
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_chatbot_conversations_chatbot_id_user_id {columns}")
+        return
+    # ✅ CONCURRENTLY keeps the table writable while the index builds (needs to run outside a transaction)
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chatbot_conversations_chatbot_id_user_id {columns}")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_chatbot_conversations_chatbot_id_user_id")
+    op.drop_column('chatbot_conversations', 'user_id')
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ✅ Settings are read at import time: point the app at a throwaway SQLite file before any app import
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mktemp(suffix='.sqlite3')}"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("AGENTIVE_API_KEY", "test")
+os.environ.setdefault("ASSISTANT_ID", "test")
+
+from app import models  # noqa: E402,F401  (registers every table on Base.metadata)
+from app.database import Base, engine  # noqa: E402
+from app.models import Chatbots  # noqa: E402
+
+@pytest.fixture
+def db_engine():
+    """Fresh tables with one chatbot (id=1) for every test."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Chatbots.__table__.insert(), [{"id": 1, "name": "test", "model": "", "prompt": "", "knowledge_base": "", "tools": ""}])
+    yield engine
+    Base.metadata.drop_all(bind=engine)
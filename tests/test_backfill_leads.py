@@ -0,0 +1,84 @@
+import datetime
+
+from sqlalchemy import insert, select
+
+from app.backfill_leads import BACKFILL_LEAD_SOURCE, backfill
+from app.models import ChatbotConversations, ChatbotLeads
+
+def add_conversations(engine, *messages):
+    with engine.begin() as conn:
+        conn.execute(insert(ChatbotConversations), [
+            {"chatbot_id": 1, "user_message": message, "bot_response": "ok", "platform": "Web", "timestamp": timestamp}
+            for message, timestamp in messages
+        ])
+
+def leads(engine):
+    with engine.connect() as conn:
+        return sorted(conn.execute(select(ChatbotLeads.lead_source, ChatbotLeads.message)).all())
+
+def test_backfill_skips_messages_that_already_have_a_lead(db_engine):
+    add_conversations(
+        db_engine,
+        ("I want a demo", datetime.datetime(2024, 1, 1)),
+        ("I want a demo", datetime.datetime(2024, 1, 2)),
+        ("hello there", datetime.datetime(2024, 1, 3)),
+        ("what is the pricing?", datetime.datetime(2024, 1, 4)),
+    )
+    with db_engine.begin() as conn:
+        conn.execute(insert(ChatbotLeads), [{"chatbot_id": 1, "user_id": "u1", "user_name": "Ana", "lead_source": "Chatbot", "message": "what is the pricing?"}])
+
+    summary = backfill(bind=db_engine)
+
+    assert summary["leads_detected"] == 3
+    assert summary["leads_written"] == 1
+    assert leads(db_engine) == [(BACKFILL_LEAD_SOURCE, "I want a demo"), ("Chatbot", "what is the pricing?")]
+    # Running it again writes nothing new
+    assert backfill(bind=db_engine)["leads_written"] == 0
+
+def test_replace_since_keeps_older_backfilled_leads(db_engine):
+    add_conversations(
+        db_engine,
+        ("I want a demo", datetime.datetime(2024, 1, 1)),
+        ("how much is the yearly plan", datetime.datetime(2024, 6, 1)),
+    )
+    backfill(bind=db_engine)
+    assert len(leads(db_engine)) == 2
+
+    summary = backfill(since=datetime.date(2024, 3, 1), replace=True, bind=db_engine)
+
+    assert summary["conversations_scanned"] == 1
+    assert leads(db_engine) == [(BACKFILL_LEAD_SOURCE, "I want a demo"), (BACKFILL_LEAD_SOURCE, "how much is the yearly plan")]
+
+def test_replace_leaves_live_leads_alone(db_engine):
+    add_conversations(db_engine, ("I want a demo", datetime.datetime(2024, 6, 1)))
+    with db_engine.begin() as conn:
+        conn.execute(insert(ChatbotLeads), [{"chatbot_id": 1, "user_id": "u1", "user_name": "Ana", "lead_source": "Chatbot", "message": "I want a demo"}])
+
+    backfill(replace=True, bind=db_engine)
+
+    assert leads(db_engine) == [("Chatbot", "I want a demo")]
+
+def test_dry_run_writes_nothing(db_engine):
+    add_conversations(db_engine, ("I want a demo", datetime.datetime(2024, 6, 1)))
+
+    summary = backfill(dry_run=True, bind=db_engine)
+
+    assert summary["leads_detected"] == 1
+    assert summary["leads_written"] == 0
+    assert leads(db_engine) == []
+
+def test_repeated_messages_across_batches_are_written_once(db_engine):
+    add_conversations(db_engine, *[
+        ("I want a demo" if index % 2 == 0 else f"hello {index}", datetime.datetime(2024, 1, 1 + index))
+        for index in range(9)
+    ])
+
+    with db_engine.connect() as conn:
+        # Like PostgreSQL, let the batch writes commit while the streaming read is open
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    summary = backfill(batch_size=2, bind=db_engine)
+
+    assert summary["leads_detected"] == 5
+    assert summary["leads_written"] == 1
+    assert leads(db_engine) == [(BACKFILL_LEAD_SOURCE, "I want a demo")]
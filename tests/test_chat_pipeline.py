@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app import chat_pipeline, thread_sessions
+from app.database import async_engine
+from app.history import HistoryBuilder
+from app.models import ChatbotConversations
+from app.response_cache import ResponseCache
+from app.thread_sessions import ThreadSessionRegistry
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(scenario())
+
+@pytest.fixture
+def llm(db_engine, monkeypatch):
+    """Fresh caches, and a fake LLM that numbers its replies."""
+    calls = []
+
+    async def fake_generate_reply(instructions, user_message, thread_id=None, metrics=None, run_options=None, history=None):
+        calls.append(user_message)
+        return f"reply {len(calls)}"
+
+    async def fake_create_thread():
+        return f"thread_{len(calls)}"
+
+    monkeypatch.setattr(chat_pipeline, "generate_reply", fake_generate_reply)
+    monkeypatch.setattr(chat_pipeline, "response_cache", ResponseCache(enabled_chatbots="*", redis_url=None))
+    monkeypatch.setattr(chat_pipeline, "conversation_history", HistoryBuilder())
+    monkeypatch.setattr(thread_sessions, "thread_sessions", ThreadSessionRegistry())
+    monkeypatch.setattr(thread_sessions, "create_thread", fake_create_thread)
+    return calls
+
+def ask(*turns):
+    async def scenario():
+        return [await chat_pipeline.generate_chat_reply(1, message, user_id, "en") for message, user_id in turns]
+    return run(scenario())
+
+def test_anonymous_repeats_are_served_from_the_cache(llm):
+    assert ask(("What are your opening hours?", None), ("what are your opening hours", None)) == ["reply 1", "reply 1"]
+    assert len(llm) == 1
+
+def test_cache_hit_becomes_part_of_the_signed_in_session(llm):
+    replies = ask(
+        ("What are your opening hours?", None),
+        # No earlier turns yet: the anonymous reply fits
+        ("What are your opening hours?", "u1"),
+        # Now the cached turn is this session's context, so "yes" style follow-ups and repeats go to the LLM
+        ("What are your opening hours?", "u1"),
+    )
+    assert replies == ["reply 1", "reply 1", "reply 2"]
+    assert llm == ["What are your opening hours?", "What are your opening hours?"]
+
+def test_sessions_with_history_neither_use_nor_fill_the_cache(llm, db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(insert(ChatbotConversations), [{
+            "chatbot_id": 1, "user_id": "u2", "user_message": "I run a bakery", "bot_response": "Nice!",
+            "platform": "Web", "timestamp": datetime.datetime(2024, 1, 1),
+        }])
+
+    replies = ask(
+        ("Which plan fits me?", None),
+        ("Which plan fits me?", "u2"),
+        # u2's personalized answer was not cached for everyone else
+        ("Which plan fits me?", None),
+    )
+    assert replies == ["reply 1", "reply 2", "reply 1"]
+    assert len(llm) == 2
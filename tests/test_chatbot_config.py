@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from app import chatbot_config
+from app.chatbot_config import ChatbotConfig, ChatbotConfigCache, parse_model, parse_tools
+from app.database import SessionLocal, async_engine
+from app.models import Chatbots
+
+@pytest.mark.parametrize("raw, expected", [
+    ("gpt-4o", "gpt-4o"),
+    (" GPT-4o-mini ", "gpt-4o-mini"),
+    ("gpt 4 turbo", "gpt-4-turbo"),
+    ("o3-mini", "o3-mini"),
+    # Legacy dashboard names
+    ("GPT-3.5", "gpt-3.5-turbo"),
+    ("ChatGPT", "gpt-3.5-turbo"),
+])
+def test_parse_model_accepts_assistants_models(raw, expected):
+    assert parse_model(raw) == expected
+
+@pytest.mark.parametrize("raw", [None, "", "   ", "GPT-3", "gpt-3.5-turbo-instruct", "text-davinci-003", "claude-3", "llama3"])
+def test_parse_model_keeps_the_assistant_model_for_anything_else(raw):
+    assert parse_model(raw) is None
+
+@pytest.mark.parametrize("raw, expected", [
+    ("", ()),
+    ("code_interpreter", ({"type": "code_interpreter"},)),
+    ("code_interpreter, file_search", ({"type": "code_interpreter"}, {"type": "file_search"})),
+    ('["file_search"]', ({"type": "file_search"},)),
+    ('[{"type": "file_search", "file_search": {"max_num_results": 5}}]', ({"type": "file_search", "file_search": {"max_num_results": 5}},)),
+    ('{"type": "code_interpreter"}', ({"type": "code_interpreter"},)),
+])
+def test_parse_tools_normalizes_supported_tools(raw, expected):
+    assert tuple(json.loads(tool) for tool in parse_tools(raw)) == expected
+
+@pytest.mark.parametrize("raw", [
+    # Nothing answers requires_action, so function tools would leave runs stuck
+    '[{"type": "function", "function": {"name": "lookup"}}]',
+    "function",
+    "web_browsing, retrieval",
+    "[1, null]",
+])
+def test_parse_tools_drops_what_the_assistants_api_would_reject(raw):
+    assert parse_tools(raw) == ()
+
+def test_run_options_only_override_what_the_bot_configures():
+    config = ChatbotConfig(1, "bot", parse_model("gpt-4o"), None, parse_tools("file_search, function"))
+    assert config.run_options() == {"model": "gpt-4o", "tools": [{"type": "file_search"}]}
+    assert ChatbotConfig(2, "bot", parse_model("GPT-3"), None, ()).run_options() == {}
+
+def test_config_cache_reloads_after_an_orm_update(db_engine, monkeypatch):
+    cache = ChatbotConfigCache()
+    # The mapper events invalidate whichever cache the module exposes
+    monkeypatch.setattr(chatbot_config, "chatbot_configs", cache)
+
+    async def get():
+        try:
+            return await cache.get(1)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(get()).model is None
+    asyncio.run(get())
+    assert cache.loads == 1
+
+    with SessionLocal() as db:
+        db.get(Chatbots, 1).model = "gpt-4o"
+        db.commit()
+
+    assert asyncio.run(get()).model == "gpt-4o"
+    assert cache.loads == 2
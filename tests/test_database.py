@@ -0,0 +1,73 @@
+from app import database
+from app.database import ReplicaRouter, engine_options, pool_options
+
+def test_each_engine_kind_has_its_own_pool(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE_ASYNC", "25")
+    async_options = engine_options("postgresql+asyncpg://db/medusa", "async")
+    sync_options = engine_options("postgresql://db/medusa", "sync")
+    assert (async_options["pool_size"], async_options["max_overflow"]) == (25, 10)
+    assert (sync_options["pool_size"], sync_options["max_overflow"]) == (5, 5)
+    assert pool_options("replica")["pool_size"] == 5
+
+def test_sqlite_keeps_sqlalchemy_defaults():
+    assert engine_options("sqlite:///local.db", "sync") == {}
+
+class FakeEngine:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def router_with_lags(monkeypatch, lags, max_lag=5, check_seconds=10):
+    """A router over fake replicas whose measured lag is read from `lags` (mutable)."""
+    clock = Clock()
+    monkeypatch.setattr(database.time, "monotonic", clock)
+    replicas = [FakeEngine(name) for name in lags]
+    router = ReplicaRouter(FakeEngine("primary"), replicas, max_lag=max_lag, check_seconds=check_seconds)
+    measured = []
+
+    def measure_lag(replica):
+        measured.append(replica.name)
+        return lags[replica.name]
+    monkeypatch.setattr(router, "measure_lag", measure_lag)
+    return router, clock, measured
+
+def test_reads_rotate_over_replicas_within_the_lag_limit(monkeypatch):
+    router, _, _ = router_with_lags(monkeypatch, {"r1": 0.5, "r2": 1.0})
+    assert [router.read_engine().name for _ in range(4)] == ["r1", "r2", "r1", "r2"]
+    assert router.stats()["replica_reads"] == 4
+
+def test_lagging_replicas_are_skipped_and_all_lagging_falls_back_to_the_primary(monkeypatch):
+    lags = {"r1": 30.0, "r2": 1.0}
+    router, clock, _ = router_with_lags(monkeypatch, lags)
+    assert {router.read_engine().name for _ in range(4)} == {"r2"}
+
+    lags["r2"] = float("inf")  # unreachable
+    clock.now += 10
+    assert router.read_engine().name == "primary"
+    assert router.stats()["primary_fallbacks"] == 1
+
+def test_lag_is_measured_once_per_check_interval(monkeypatch):
+    lags = {"r1": 30.0}
+    router, clock, measured = router_with_lags(monkeypatch, lags, check_seconds=10)
+    assert router.read_engine().name == "primary"
+    lags["r1"] = 0.0
+    clock.now += 5
+    # Still the stale reading: no query per request
+    assert router.read_engine().name == "primary"
+    clock.now += 5
+    assert router.read_engine().name == "r1"
+    assert measured == ["r1", "r1"]
+
+def test_without_replicas_reads_use_the_primary_and_count_no_fallback():
+    router = ReplicaRouter(FakeEngine("primary"), [])
+    assert router.read_engine().name == "primary"
+    assert router.stats()["primary_fallbacks"] == 0
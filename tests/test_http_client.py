@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import http_client
+from app.http_client import HttpClientPool, backoff_seconds
+
+def pool_with(responses, monkeypatch):
+    """A pool whose "svc" client answers from `responses` (status codes or exceptions), in order."""
+    sleeps = []
+
+    async def no_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(http_client.asyncio, "sleep", no_sleep)
+
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        outcome = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return httpx.Response(status, headers=headers, request=request)
+
+    pool = HttpClientPool()
+    pool._clients["svc"] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return pool, calls, sleeps
+
+def send(pool, method="POST", **kwargs):
+    async def scenario():
+        try:
+            return await pool.request("svc", "op", method, "https://svc.test/api", **kwargs)
+        finally:
+            await pool.aclose()
+    return asyncio.run(scenario())
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_refused_requests_are_retried_for_any_method(monkeypatch, status):
+    pool, calls, _ = pool_with([status, 200], monkeypatch)
+    assert send(pool, "POST").status_code == 200
+    assert calls == ["POST", "POST"]
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_gateway_errors_are_only_retried_when_idempotent(monkeypatch, status):
+    pool, calls, _ = pool_with([status, 200], monkeypatch)
+    assert send(pool, "POST").status_code == status
+    assert len(calls) == 1
+
+    pool, calls, _ = pool_with([status, 200], monkeypatch)
+    assert send(pool, "POST", idempotent=True).status_code == 200
+    assert len(calls) == 2
+
+def test_read_errors_are_only_retried_when_idempotent(monkeypatch):
+    pool, calls, _ = pool_with([httpx.ReadError("reset"), 200], monkeypatch)
+    with pytest.raises(httpx.ReadError):
+        send(pool, "POST")
+    assert len(calls) == 1
+
+    pool, calls, _ = pool_with([httpx.ReadError("reset"), 200], monkeypatch)
+    assert send(pool, "GET", idempotent=True).status_code == 200
+    assert len(calls) == 2
+
+def test_connect_errors_are_retried_until_the_budget_runs_out(monkeypatch):
+    pool, calls, _ = pool_with([httpx.ConnectError("refused")], monkeypatch)
+    with pytest.raises(httpx.ConnectError):
+        send(pool, "POST", retries=2)
+    assert len(calls) == 3
+    assert pool.stats()["retries"] == {"svc": 2}
+
+def test_last_response_is_returned_once_retries_are_exhausted(monkeypatch):
+    pool, calls, sleeps = pool_with([(503, {"Retry-After": "2"})], monkeypatch)
+    assert send(pool, "POST", retries=1).status_code == 503
+    assert len(calls) == 2
+    assert sleeps == [2.0]
+
+def test_client_errors_are_never_retried(monkeypatch):
+    pool, calls, _ = pool_with([400, 200], monkeypatch)
+    assert send(pool, "GET", idempotent=True).status_code == 400
+    assert len(calls) == 1
+
+def test_backoff_is_jittered_and_capped():
+    assert backoff_seconds(0, "3") == 3.0
+    assert backoff_seconds(0, "3600") == http_client.HTTP_RETRY_MAX_BACKOFF_SECONDS
+    assert all(0 <= backoff_seconds(10) <= http_client.HTTP_RETRY_MAX_BACKOFF_SECONDS for _ in range(100))
+    # An HTTP-date Retry-After falls back to jittered backoff
+    assert 0 <= backoff_seconds(1, "Wed, 21 Oct 2015 07:28:00 GMT") <= 2 * http_client.HTTP_RETRY_BACKOFF_SECONDS
@@ -0,0 +1,23 @@
+import random
+
+from app.keyword_matcher import KeywordAutomaton
+
+def pure_automaton():
+    return KeywordAutomaton({"en": ["order", "free trial", "how much?"], "pt": ["orçamento", "quanto custa?"]}, use_extension=False)
+
+def test_finds_folded_keywords_in_match_order():
+    automaton = pure_automaton()
+    assert automaton.find("Quanto custa? Quero um ORCAMENTO") == ["quanto custa?", "orçamento"]
+    assert automaton.find("Is there a free trial? How much?", ("en",)) == ["free trial", "how much?"]
+    assert automaton.find("Quanto custa?", ("en",)) == []
+
+def test_keywords_glued_to_other_letters_do_not_match():
+    assert pure_automaton().find("the border is closed") == []
+
+def test_transition_cache_only_grows_with_the_keyword_alphabet():
+    automaton = pure_automaton()
+    rng = random.Random(3)
+    text = "".join(chr(rng.randrange(0x100, 0x30000)) for _ in range(20000)) + " order"
+    assert automaton.find(text) == ["order"]
+    alphabet = automaton._alphabet
+    assert all(set(edges) <= alphabet for edges in automaton._delta)
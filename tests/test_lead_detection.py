@@ -0,0 +1,35 @@
+import pytest
+
+from app.lead_detection import lead_signals
+
+@pytest.mark.parametrize("message", [
+    "I'd like to see your orders page",
+    "Can we book some demos for the sales team?",
+    "I subscribed last week but never got access",
+    "We are ordering for 20 seats",
+    "Send me the quotes",
+    "Who are your partners? I'm a buyer for a retail chain",
+])
+def test_inflected_english_keywords_are_leads(message):
+    assert lead_signals(message, "en").keywords
+
+@pytest.mark.parametrize("message", [
+    "Vocês fazem orçamentos para empresas?",
+    "Quais são as ofertas deste mês?",
+    "Preciso de um ORCAMENTO",
+])
+def test_inflected_and_unaccented_portuguese_keywords_are_leads(message):
+    assert lead_signals(message, "pt").keywords
+
+@pytest.mark.parametrize("message", [
+    "The border closes at night",
+    "Democracy is a long word",
+    "Reorders happen automatically",
+])
+def test_keywords_inside_other_words_are_not_leads(message):
+    assert not lead_signals(message, "en").is_lead
+
+def test_contact_details_are_leads_without_keywords():
+    assert lead_signals("write to jane.doe@example.com", "en").has_email
+    assert lead_signals("ligue +5511987654321", "pt").has_phone
+    assert not lead_signals("thanks, that helped", "en").is_lead
@@ -0,0 +1,89 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert, text
+
+from app.api.chatbot_routes import get_chatbot_conversations
+from app.database import SessionLocal, engine
+from app.models import ChatbotConversations
+from app.pagination import conversation_page, decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    timestamp = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", encode_cursor(None, 1)[:-3]])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def insert_conversations(db_engine, timestamps):
+    with db_engine.begin() as conn:
+        conn.execute(insert(ChatbotConversations), [
+            {"id": index + 1, "chatbot_id": 1, "user_message": f"m{index + 1}", "bot_response": "ok", "platform": "Web", "timestamp": timestamp}
+            for index, timestamp in enumerate(timestamps)
+        ])
+
+def test_pages_cover_every_row_once_newest_first(db_engine):
+    base = datetime.datetime(2024, 1, 1)
+    timestamps = [
+        base + datetime.timedelta(minutes=5),
+        # Ties on timestamp are broken by id
+        base + datetime.timedelta(minutes=3),
+        base + datetime.timedelta(minutes=3),
+        base + datetime.timedelta(minutes=3),
+        base,
+        # Legacy rows without a timestamp come last
+        None,
+        None,
+    ]
+    insert_conversations(db_engine, timestamps)
+
+    seen = []
+    cursor = None
+    with SessionLocal() as db:
+        for _ in range(10):
+            page = get_chatbot_conversations(1, limit=2, cursor=cursor, db=db)
+            seen.extend(row["id"] for row in page["conversations"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    assert seen == [1, 4, 3, 2, 5, 7, 6]
+
+def test_deep_cursors_bound_an_index_range_scan(db_engine):
+    base = datetime.datetime(2024, 1, 1)
+    insert_conversations(db_engine, [base + datetime.timedelta(minutes=i) for i in range(50)] + [None] * 5)
+    with db_engine.begin() as conn:
+        # The PostgreSQL-only index from the model, which SQLite can build without NULLS LAST
+        conn.execute(text("CREATE INDEX ix_test_keyset ON chatbot_conversations (chatbot_id, timestamp DESC, id DESC)"))
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with SessionLocal() as db:
+            dated = conversation_page(db, 1, 3, (base + datetime.timedelta(minutes=5), 6))
+            undated = conversation_page(db, 1, 3, (None, 54))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert [row.id for row in dated] == [5, 4, 3, 2]
+    assert [row.id for row in undated] == [53, 52, 51]
+    assert len(statements) == 2
+    with db_engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = " ".join(row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+            # Both phases seek into the index past the cursor rather than scanning the chatbot's rows
+            assert "ix_test_keyset (chatbot_id=? AND timestamp" in plan, plan
+
+def test_unknown_chatbot_is_a_404(db_engine):
+    with SessionLocal() as db:
+        with pytest.raises(HTTPException) as error:
+            get_chatbot_conversations(99, limit=10, cursor=None, db=db)
+    assert error.value.status_code == 404
@@ -0,0 +1,220 @@
+import asyncio
+
+import pytest
+
+from app import resilience
+from app.resilience import Bulkhead, CircuitBreaker, ProviderGuard, ProviderUnavailable
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+def breaker(min_calls=4, failure_ratio=0.5, slow_call_seconds=10.0, slow_call_ratio=0.8, open_seconds=30.0, half_open_calls=2, window_seconds=60.0):
+    breaker = CircuitBreaker("test")
+    breaker.min_calls = min_calls
+    breaker.failure_ratio = failure_ratio
+    breaker.slow_call_seconds = slow_call_seconds
+    breaker.slow_call_ratio = slow_call_ratio
+    breaker.open_seconds = open_seconds
+    breaker.half_open_calls = half_open_calls
+    breaker.window_seconds = window_seconds
+    return breaker
+
+def call(breaker, failed=False, seconds=0.1):
+    breaker.allow()
+    breaker.record(failed, seconds)
+
+def test_stays_closed_below_min_calls(clock):
+    circuit = breaker(min_calls=4)
+    for _ in range(3):
+        call(circuit, failed=True)
+    assert circuit.state == "closed"
+
+def test_opens_on_failure_ratio_and_refuses_calls(clock):
+    circuit = breaker(min_calls=4, failure_ratio=0.5, open_seconds=30)
+    call(circuit)
+    call(circuit)
+    call(circuit, failed=True)
+    assert circuit.state == "closed"
+    call(circuit, failed=True)
+    assert circuit.state == "open"
+
+    clock.now += 10
+    with pytest.raises(ProviderUnavailable) as refused:
+        circuit.allow()
+    assert refused.value.reason == "circuit open"
+    assert refused.value.retry_after == pytest.approx(20)
+
+def test_opens_on_slow_call_ratio(clock):
+    circuit = breaker(min_calls=4, slow_call_seconds=5, slow_call_ratio=0.75)
+    call(circuit, seconds=1)
+    for _ in range(3):
+        call(circuit, seconds=6)
+    assert circuit.state == "open"
+
+def test_old_outcomes_leave_the_window(clock):
+    circuit = breaker(min_calls=4, window_seconds=30)
+    for _ in range(3):
+        call(circuit, failed=True)
+    clock.now += 31
+    for _ in range(3):
+        call(circuit)
+    assert circuit.state == "closed"
+    assert circuit.stats()["window_failures"] == 0
+
+def open_circuit(circuit):
+    for _ in range(circuit.min_calls):
+        call(circuit, failed=True)
+    assert circuit.state == "open"
+
+def test_half_open_closes_after_successful_trials(clock):
+    circuit = breaker(open_seconds=30, half_open_calls=2)
+    open_circuit(circuit)
+    clock.now += 30
+
+    circuit.allow()
+    assert circuit.state == "half_open"
+    circuit.allow()
+    # Only half_open_calls trials at a time
+    with pytest.raises(ProviderUnavailable):
+        circuit.allow()
+    circuit.record(False, 0.1)
+    circuit.record(False, 0.1)
+    assert circuit.state == "closed"
+
+def test_failed_trial_reopens(clock):
+    circuit = breaker(open_seconds=30)
+    open_circuit(circuit)
+    clock.now += 30
+
+    circuit.allow()
+    circuit.record(True, 0.1)
+    assert circuit.state == "open"
+    with pytest.raises(ProviderUnavailable):
+        circuit.allow()
+
+def test_abandoned_trial_frees_its_slot(clock):
+    circuit = breaker(open_seconds=30, half_open_calls=1)
+    open_circuit(circuit)
+    clock.now += 30
+
+    circuit.allow()
+    circuit.abandon()
+    circuit.allow()
+    circuit.record(False, 0.1)
+    assert circuit.state == "closed"
+
+def test_transitions_are_reported(clock, monkeypatch):
+    transitions = []
+    monkeypatch.setattr(resilience, "record_circuit_transition", lambda service, old, new: transitions.append((old, new)))
+    circuit = breaker(open_seconds=30, half_open_calls=1)
+    open_circuit(circuit)
+    clock.now += 30
+    call(circuit)
+    assert transitions == [("closed", "open"), ("open", "half_open"), ("half_open", "closed")]
+    assert circuit.transitions == 3
+
+def test_bulkhead_refuses_when_full():
+    async def scenario():
+        bulkhead = Bulkhead("test")
+        bulkhead.limit, bulkhead.queue_timeout = 1, 0.05
+        await bulkhead.acquire()
+        with pytest.raises(ProviderUnavailable) as refused:
+            await bulkhead.acquire()
+        assert refused.value.reason == "bulkhead full"
+        bulkhead.release()
+        await bulkhead.acquire()
+        assert bulkhead.in_flight == 1
+    asyncio.run(scenario())
+
+def test_guard_times_out_and_counts_failures():
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        guard = ProviderGuard("test")
+        guard.timeout = 0.05
+        with pytest.raises(ProviderUnavailable) as timed_out:
+            await guard.run(slow)
+        assert timed_out.value.reason == "timeout"
+        with pytest.raises(RuntimeError):
+            await guard.run(failing)
+        assert await guard.run(asyncio.sleep, 0, "ok") == "ok"
+        stats = guard.stats()
+        assert (stats["calls"], stats["failures"], stats["timeouts"], stats["in_flight"]) == (3, 2, 1, 0)
+    asyncio.run(scenario())
+
+def test_guarded_stream_applies_the_timeout_to_the_first_item():
+    async def slow_start():
+        await asyncio.sleep(1)
+        yield "late"
+
+    async def steady():
+        for item in ("a", "b", "c"):
+            await asyncio.sleep(0.03)
+            yield item
+
+    async def scenario():
+        guard = ProviderGuard("test")
+        guard.timeout = 0.05
+        with pytest.raises(ProviderUnavailable):
+            [item async for item in guard.stream(slow_start)]
+        # Later items may take longer than the timeout in total
+        assert [item async for item in guard.stream(steady)] == ["a", "b", "c"]
+        assert guard.bulkhead.in_flight == 0
+    asyncio.run(scenario())
+
+def test_errors_the_predicate_rejects_leave_the_circuit_alone():
+    class ProviderDown(Exception):
+        pass
+
+    async def fails(error):
+        raise error
+
+    async def scenario():
+        guard = ProviderGuard("test", is_failure=lambda error: isinstance(error, ProviderDown))
+        guard.breaker.min_calls = 3
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                await guard.run(fails, ValueError("bad request"))
+        assert guard.breaker.state == "closed"
+        assert guard.breaker.stats()["window_calls"] == 0
+        for _ in range(3):
+            with pytest.raises(ProviderDown):
+                await guard.run(fails, ProviderDown())
+        assert guard.breaker.state == "open"
+        stats = guard.stats()
+        assert (stats["failures"], stats["caller_errors"]) == (3, 5)
+    asyncio.run(scenario())
+
+def test_only_openai_outages_count_as_provider_failures():
+    import httpx
+    import openai
+
+    from app.llm_client import is_provider_failure
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/threads/runs")
+    def status_error(cls, status):
+        return cls("error", response=httpx.Response(status, request=request), body=None)
+
+    assert is_provider_failure(openai.APIConnectionError(request=request))
+    assert is_provider_failure(openai.APITimeoutError(request=request))
+    assert is_provider_failure(status_error(openai.RateLimitError, 429))
+    assert is_provider_failure(status_error(openai.InternalServerError, 500))
+    assert is_provider_failure(TimeoutError("run did not finish"))
+    assert not is_provider_failure(status_error(openai.BadRequestError, 400))
+    assert not is_provider_failure(status_error(openai.NotFoundError, 404))
+    assert not is_provider_failure(status_error(openai.AuthenticationError, 401))
+    assert not is_provider_failure(RuntimeError("Assistant run run_1 requires tool outputs"))
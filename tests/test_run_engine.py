@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.run_engine import RunCompletionEngine
+
+class FakeRuns:
+    """Stands in for client.beta.threads.runs; runs finish after `finish_after` retrieves."""
+
+    def __init__(self, finish_after=None):
+        self.finish_after = finish_after
+        self.retrieves = {}
+        self.cancelled = []
+
+    async def retrieve(self, run_id, thread_id):
+        self.retrieves[run_id] = self.retrieves.get(run_id, 0) + 1
+        if run_id in self.cancelled:
+            return SimpleNamespace(id=run_id, status="cancelled")
+        done = self.finish_after is not None and self.retrieves[run_id] >= self.finish_after
+        return SimpleNamespace(id=run_id, status="completed" if done else "in_progress")
+
+    async def cancel(self, run_id, thread_id):
+        self.cancelled.append(run_id)
+
+def engine_for(runs):
+    client = SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(runs=runs)))
+    return RunCompletionEngine(lambda: client)
+
+def test_wait_returns_completed_run():
+    runs = FakeRuns(finish_after=2)
+    engine = engine_for(runs)
+    run = asyncio.run(engine.wait("thread", "run_1", timeout=5))
+    assert run.status == "completed"
+    assert runs.cancelled == []
+    assert engine.stats()["runs_completed"] == 1
+
+def test_timeout_cancels_the_run():
+    runs = FakeRuns()
+    engine = engine_for(runs)
+    with pytest.raises(TimeoutError):
+        asyncio.run(engine.wait("thread", "run_1", timeout=0.3))
+    assert runs.cancelled == ["run_1"]
+    assert engine.stats()["runs_cancelled"] == 1
+
+def test_cancelled_waiter_cancels_the_run():
+    runs = FakeRuns()
+    engine = engine_for(runs)
+
+    async def scenario():
+        waiter = asyncio.create_task(engine.wait("thread", "run_1", timeout=5))
+        await asyncio.sleep(0.2)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # The cancel call runs in the background
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert runs.cancelled == ["run_1"]
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from app import semantic_cache as semantic_cache_module
+from app.database import async_engine
+from app.semantic_cache import HashingEmbedder, SemanticCache
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(scenario())
+
+class RecordingEmbedder(HashingEmbedder):
+    """Remembers which threads embedded, to check the event loop never does."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def embed(self, texts):
+        self.threads.add(threading.get_ident())
+        return super().embed(texts)
+
+def test_embedding_runs_off_the_event_loop(db_engine, monkeypatch):
+    embedder = RecordingEmbedder()
+    monkeypatch.setattr(semantic_cache_module, "load_embedder", lambda: embedder)
+    cache = SemanticCache(enabled_chatbots="*")
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        await cache.load()
+        await cache.add(1, "How do I reset my password?", "Use the reset link.")
+        reply = await cache.lookup(1, "how do i reset my password")
+        return loop_thread, reply
+
+    loop_thread, reply = run(scenario())
+    assert reply == "Use the reset link."
+    assert embedder.threads and loop_thread not in embedder.threads
+
+def test_lexical_embedder_needs_the_same_content_words(db_engine, monkeypatch):
+    monkeypatch.setattr(semantic_cache_module, "SEMANTIC_CACHE_EMBEDDER", "app.semantic_cache:HashingEmbedder")
+    cache = SemanticCache(enabled_chatbots="*")
+
+    async def scenario():
+        await cache.add(1, "Can I schedule a demo for next week?", "Sure, pick a slot.")
+        return (
+            await cache.lookup(1, "can I schedule a demo for next week"),
+            await cache.lookup(1, "Can I cancel a demo for next week?"),
+        )
+
+    assert run(scenario()) == ("Sure, pick a slot.", None)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_missing_model_package_disables_the_cache(monkeypatch):
+    monkeypatch.setattr(semantic_cache_module, "SEMANTIC_CACHE_EMBEDDER", None)
+    monkeypatch.setattr(semantic_cache_module.importlib.util, "find_spec", lambda name: None)
+    cache = SemanticCache(enabled_chatbots="*")
+    assert cache.enabled_for(1)
+    assert run(cache.lookup(1, "How much does the Pro plan cost?")) is None
+    assert not cache.enabled_for(1)
+    assert cache.stats()["available"] is False
+
+def test_index_overwrites_oldest_entries_once_full():
+    embedder = HashingEmbedder()
+    index = semantic_cache_module.SemanticIndex(embedder.dim, max_entries=2, initial_capacity=1)
+    questions = ["first question", "second question", "third question"]
+    index.add_many(embedder.embed(questions), questions, ["1", "2", "3"])
+    assert len(index) == 2
+    score, question, response = index.search(embedder.embed(["first question"])[0])[0]
+    assert question != "first question"
+    assert np.isclose(index.search(embedder.embed(["third question"])[0])[0][0], 1.0)
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from app.api import webhooks
+from app.database import async_engine
+from app.models import ChatbotConversations
+
+def post_stream(chunks):
+    app = FastAPI()
+    app.include_router(webhooks.router)
+
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def scenario():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post("/webhook/chatbot-sync/stream", params={"chatbot_id": 1}, content=body())
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(scenario())
+
+def line(message, **extra):
+    return json.dumps({"user_message": message, "bot_response": "ok", **extra}).encode("utf-8") + b"\n"
+
+def test_stream_ingests_lines_split_across_chunks(db_engine):
+    body = line("first", timestamp="2024-01-01T10:00:00") + line("second") + line("third", platform="WhatsApp")
+    response = post_stream([body[:7], body[7:40], body[40:]])
+    assert response.status_code == 200
+    assert response.json()["messages_synced"] == 3
+    with db_engine.connect() as conn:
+        rows = conn.execute(select(ChatbotConversations.user_message, ChatbotConversations.timestamp).order_by(ChatbotConversations.id)).all()
+    assert [row.user_message for row in rows] == ["first", "second", "third"]
+    # Filled in by conversation_record, since COPY never runs the model's client-side default
+    assert all(row.timestamp is not None for row in rows)
+
+def test_body_without_newlines_is_refused_once_past_the_line_cap(db_engine, monkeypatch):
+    monkeypatch.setattr(webhooks, "SYNC_MAX_LINE_BYTES", 1024)
+    response = post_stream([line("ok"), b"x" * 600, b"x" * 600, b"x" * 600])
+    assert response.status_code == 413
+    assert "Line 2" in response.json()["detail"]
+    with db_engine.connect() as conn:
+        assert conn.execute(select(ChatbotConversations.id)).all() == []
@@ -0,0 +1,148 @@
+import asyncio
+import glob
+import json
+import os
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app import write_behind
+from app.database import async_engine
+from app.models import ChatbotConversations
+from app.write_behind import ConversationWriter, _Segment
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            # aiosqlite connections belong to this event loop
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+def stored_messages(engine):
+    with engine.connect() as conn:
+        return [row.user_message for row in conn.execute(select(ChatbotConversations.user_message).order_by(ChatbotConversations.id))]
+
+def record(message, bot_response="ok", **extra):
+    return {"chatbot_id": 1, "user_message": message, "bot_response": bot_response, "platform": "Web", "timestamp": "2024-01-01T10:00:00", **extra}
+
+def test_replays_segments_left_by_a_crashed_worker(db_engine, tmp_path):
+    path = tmp_path / "conversations-999-1-1.ndjson"
+    # Spooled before user_id existed, followed by a line torn by the crash
+    path.write_text(json.dumps(record("first")) + "\n" + json.dumps(record("second", user_id="u1")) + "\n" + '{"chatbot_id": 1, "user_mes', encoding="utf-8")
+    writer = ConversationWriter(spool_dir=str(tmp_path), flush_seconds=0.01)
+
+    async def scenario():
+        await writer.start()
+        await asyncio.sleep(0.2)
+        await writer.stop()
+    run(scenario())
+
+    assert writer.replayed == 2
+    assert stored_messages(db_engine) == ["first", "second"]
+    assert not path.exists()
+
+def test_skips_segments_another_live_worker_holds(db_engine, tmp_path):
+    held = _Segment.create(str(tmp_path / "conversations-1-1-1.ndjson"))
+    held.append(json.dumps(record("in flight")) + "\n")
+    writer = ConversationWriter(spool_dir=str(tmp_path), flush_seconds=0.01)
+
+    async def scenario():
+        await writer.start()
+        await writer.stop()
+    run(scenario())
+    held.file.close()
+
+    assert writer.replayed == 0
+    assert stored_messages(db_engine) == []
+
+def test_submitted_records_are_flushed_and_the_spool_emptied(db_engine, tmp_path):
+    writer = ConversationWriter(spool_dir=str(tmp_path), batch_size=10, flush_seconds=0.01)
+
+    async def scenario():
+        await writer.start()
+        for index in range(25):
+            await writer.submit(1, f"message {index}", "ok", user_id="u1")
+        await asyncio.sleep(0.2)
+        await writer.stop()
+    run(scenario())
+
+    assert stored_messages(db_engine) == [f"message {index}" for index in range(25)]
+    assert writer.stats()["rows_flushed"] == 25
+    assert glob.glob(os.path.join(str(tmp_path), "*.ndjson")) == []
+
+def test_rejected_rows_are_isolated_into_a_dead_letter_segment(db_engine, tmp_path):
+    writer = ConversationWriter(spool_dir=str(tmp_path), batch_size=100, flush_seconds=0.01)
+
+    async def scenario():
+        await writer.start()
+        for index in range(20):
+            # bot_response is NOT NULL
+            await writer.submit(1, f"message {index}", None if index in (3, 17) else "ok")
+        await asyncio.sleep(0.3)
+        await writer.stop()
+    run(scenario())
+
+    assert stored_messages(db_engine) == [f"message {index}" for index in range(20) if index not in (3, 17)]
+    assert writer.dead_lettered == 2
+    dead_letters = glob.glob(os.path.join(str(tmp_path), "dead-letter-*.ndjson"))
+    assert len(dead_letters) == 1
+    with open(dead_letters[0], encoding="utf-8") as file:
+        assert [json.loads(line)["user_message"] for line in file] == ["message 3", "message 17"]
+    assert glob.glob(os.path.join(str(tmp_path), "conversations-*.ndjson")) == []
+
+def test_gives_up_on_a_batch_after_the_retry_cap(db_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_RETRIES", 2)
+    writer = ConversationWriter(spool_dir=str(tmp_path), flush_seconds=0.01)
+    attempts = []
+
+    async def failing_insert(records):
+        attempts.append(len(records))
+        raise OperationalError("INSERT", {}, Exception("database is unavailable"))
+    monkeypatch.setattr(writer, "_insert", failing_insert)
+
+    async def scenario():
+        await writer.start()
+        await writer.submit(1, "lost connection", "ok")
+        await asyncio.sleep(0.3)
+        # The queue keeps moving: later records are attempted again
+        await writer.submit(1, "next", "ok")
+        await asyncio.sleep(0.05)
+        await writer.stop()
+    run(scenario())
+
+    assert attempts[:3] == [1, 1, 1]
+    assert writer.dead_lettered >= 1
+    dead_lettered = []
+    for path in glob.glob(os.path.join(str(tmp_path), "dead-letter-*.ndjson")):
+        with open(path, encoding="utf-8") as file:
+            dead_lettered.extend(json.loads(line)["user_message"] for line in file)
+    assert "lost connection" in dead_lettered
+
+def test_spool_appends_run_off_the_event_loop(db_engine, tmp_path, monkeypatch):
+    threads = set()
+    original_append = _Segment.append
+
+    def recording_append(self, line):
+        threads.add(threading.get_ident())
+        original_append(self, line)
+    monkeypatch.setattr(_Segment, "append", recording_append)
+    writer = ConversationWriter(spool_dir=str(tmp_path), flush_seconds=0.01)
+
+    async def scenario():
+        await writer.start()
+        for index in range(5):
+            await writer.submit(1, f"message {index}", "ok")
+        await asyncio.sleep(0.1)
+        await writer.stop()
+        return threading.get_ident()
+    loop_thread = run(scenario())
+
+    assert threads and loop_thread not in threads
+    assert stored_messages(db_engine) == [f"message {index}" for index in range(5)]
+
+def test_default_spool_dir_is_outside_the_source_tree():
+    package_dir = os.path.dirname(os.path.abspath(write_behind.__file__))
+    assert not os.path.abspath(write_behind.WRITE_BEHIND_SPOOL_DIR).startswith(package_dir)